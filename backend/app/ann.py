@@ -0,0 +1,262 @@
+# backend/app/ann.py
+# 근사 최근접 이웃(ANN) 검색 엔진 - 정확 검색, IVF(역파일), 스칼라(int8)/곱(PQ) 양자화.
+# 벡터는 단위 길이로 정규화되어 있다고 보고 내적이 클수록 가깝다.
+# 인덱스 파라미터(nlist, pq_m)는 빌드 때 정하고, 검색 파라미터(nprobe, rerank)는 검색마다 바꿀 수 있다.
+import numpy as np
+
+ANN_KINDS = ("exact", "ivf", "ivf_pq")
+# 거리 계산/인코딩을 이 행 수만큼씩 나눠 임시 메모리를 일정하게 유지
+CHUNK_ROWS = 65536
+
+def top_k(scores, k):
+    # 점수 내림차순 상위 k개 위치 (동점은 앞선 위치 우선)
+    if k >= scores.size:
+        return np.argsort(-scores, kind="stable")
+    # argpartition은 경계 점수와 같은 동점 중 아무거나 고르므로, 경계 동점은 앞선 위치부터 채운다
+    threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    above = np.flatnonzero(scores > threshold)
+    top = np.concatenate([above, np.flatnonzero(scores == threshold)[:k - above.size]])
+    return top[np.argsort(-scores[top], kind="stable")]
+
+def quantize_int8(vectors):
+    # 행마다 대칭 스케일: x ≈ scale * q, q ∈ [-127, 127]
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+def assign_nearest(vectors, centroids):
+    # L2 기준 가장 가까운 중심: argmin |x - c|^2 = argmax (x·c - |c|^2 / 2)
+    half_norms = (centroids ** 2).sum(axis=1) / 2
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), CHUNK_ROWS):
+        chunk = np.asarray(vectors[start:start + CHUNK_ROWS], dtype=np.float32)
+        labels[start:start + len(chunk)] = np.argmax(chunk @ centroids.T - half_norms, axis=1)
+    return labels
+
+def train_kmeans(vectors, n_clusters, iterations=10, sample_size=65536, seed=0):
+    # 표본에서 Lloyd 반복 - 빈 클러스터는 임의의 표본 점으로 다시 시작
+    rng = np.random.default_rng(seed)
+    sample_index = np.sort(rng.choice(len(vectors), min(len(vectors), sample_size), replace=False))
+    sample = np.asarray(vectors[sample_index], dtype=np.float32)
+    n_clusters = min(n_clusters, len(sample))
+    centroids = sample[rng.choice(len(sample), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign_nearest(sample, centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=n_clusters)
+        nonempty = np.flatnonzero(counts)
+        starts = np.searchsorted(labels[order], nonempty)
+        centroids[nonempty] = np.add.reduceat(sample[order], starts, axis=0) / counts[nonempty, None]
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            centroids[empty] = sample[rng.choice(len(sample), empty.size, replace=False)]
+    return centroids
+
+def default_nlist(count):
+    # 흔히 쓰는 4 * sqrt(N) 클러스터
+    return max(1, min(count, int(4 * np.sqrt(count))))
+
+def train_ivf(vectors, nlist, iterations=10, sample_size=65536, seed=0):
+    # 반환: 중심(nlist, d), 리스트별 시작 위치(nlist + 1), 리스트 순서로 정렬한 행 번호
+    centroids = train_kmeans(vectors, nlist, iterations, sample_size, seed)
+    labels = assign_nearest(vectors, centroids)
+    list_ids = np.argsort(labels, kind="stable").astype(np.int32)
+    offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=len(centroids)), out=offsets[1:])
+    return centroids, offsets, list_ids
+
+class VectorScorer:
+    # 원본 행렬(float32) 또는 int8 행렬 + 행별 스케일로 내적 계산
+    def __init__(self, vectors, scales=None):
+        self.vectors = vectors
+        self.scales = scales
+
+    @property
+    def nbytes(self):
+        return int(self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def score_all(self, query):
+        if self.scales is None:
+            return np.asarray(self.vectors @ query)
+        scores = np.empty(len(self.vectors), dtype=np.float32)
+        for start in range(0, len(self.vectors), CHUNK_ROWS):
+            chunk = self.vectors[start:start + CHUNK_ROWS]
+            scores[start:start + len(chunk)] = chunk.astype(np.float32) @ query
+        return scores * self.scales
+
+    def score_many(self, queries):
+        # (행 수, 질의 수) 점수 행렬 - 여러 질의를 행렬 곱 한 번으로 계산
+        if self.scales is None:
+            return np.asarray(self.vectors @ queries.T)
+        scores = np.empty((len(self.vectors), len(queries)), dtype=np.float32)
+        for start in range(0, len(self.vectors), CHUNK_ROWS):
+            chunk = self.vectors[start:start + CHUNK_ROWS]
+            scores[start:start + len(chunk)] = chunk.astype(np.float32) @ queries.T
+        return scores * self.scales[:, None]
+
+    def score_rows(self, query, rows):
+        vectors = np.asarray(self.vectors[rows], dtype=np.float32)
+        scores = vectors @ query
+        if self.scales is not None:
+            scores *= self.scales[rows]
+        return scores
+
+class ProductQuantizer:
+    # 벡터를 m개 부분공간으로 나누고 부분공간마다 256개 코드워드 중 하나(uint8)로 저장
+    def __init__(self, codebooks):
+        self.codebooks = np.asarray(codebooks, dtype=np.float32)
+        self.m, self.ksub, self.dsub = self.codebooks.shape
+
+    @classmethod
+    def train(cls, vectors, m, ksub=256, iterations=10, sample_size=65536, seed=0):
+        dimensions = vectors.shape[1]
+        if dimensions % m:
+            raise ValueError(f"Dimensions {dimensions} are not divisible by pq_m={m}")
+        dsub = dimensions // m
+        rng = np.random.default_rng(seed)
+        sample_index = np.sort(rng.choice(len(vectors), min(len(vectors), sample_size), replace=False))
+        sample = np.asarray(vectors[sample_index], dtype=np.float32)
+        ksub = min(ksub, len(sample))
+        codebooks = np.stack([
+            train_kmeans(sample[:, j * dsub:(j + 1) * dsub], ksub, iterations, sample_size, seed + j)
+            for j in range(m)
+        ])
+        return cls(codebooks)
+
+    def encode(self, vectors):
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for start in range(0, len(vectors), CHUNK_ROWS):
+            chunk = np.asarray(vectors[start:start + CHUNK_ROWS], dtype=np.float32)
+            for j in range(self.m):
+                part = chunk[:, j * self.dsub:(j + 1) * self.dsub]
+                codes[start:start + len(chunk), j] = assign_nearest(part, self.codebooks[j])
+        return codes
+
+    def lookup_table(self, query):
+        # 부분공간별 (질의 조각 · 코드워드) 표 - 점수는 표에서 코드를 찾아 더하기만 하면 된다
+        return np.einsum("mkd,md->mk", self.codebooks, query.reshape(self.m, self.dsub))
+
+class PQScorer:
+    def __init__(self, quantizer, codes):
+        self.quantizer = quantizer
+        self.codes = codes
+
+    @property
+    def nbytes(self):
+        return int(self.codes.nbytes + self.quantizer.codebooks.nbytes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _score(self, table, codes):
+        scores = np.zeros(len(codes), dtype=np.float32)
+        for j in range(self.quantizer.m):
+            scores += table[j][codes[:, j]]
+        return scores
+
+    def score_all(self, query):
+        table = self.quantizer.lookup_table(query)
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), CHUNK_ROWS):
+            chunk = np.asarray(self.codes[start:start + CHUNK_ROWS])
+            scores[start:start + len(chunk)] = self._score(table, chunk)
+        return scores
+
+    def score_rows(self, query, rows):
+        return self._score(self.quantizer.lookup_table(query), np.asarray(self.codes[rows]))
+
+class ExactIndex:
+    # 모든 행과 내적 (mask 밖의 행은 제외)
+    kind = "exact"
+
+    def __init__(self, scorer):
+        self.scorer = scorer
+
+    @property
+    def nbytes(self):
+        return self.scorer.nbytes
+
+    def search(self, query, k, mask=None):
+        scores = self.scorer.score_all(query)
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+            k = min(k, int(mask.sum()))
+        return top_k(scores, k)[:k]
+
+class IVFIndex:
+    # 질의와 가까운 nprobe개 리스트의 행만 점수 계산.
+    # rerank > 0 이면 근사 점수 상위 k * rerank개를 rerank_scorer(원본 벡터)로 다시 정렬
+    def __init__(self, centroids, offsets, list_ids, scorer, nprobe=8, rerank_scorer=None, rerank=0):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.half_norms = (self.centroids ** 2).sum(axis=1) / 2
+        self.offsets = np.asarray(offsets)
+        self.list_ids = list_ids
+        self.scorer = scorer
+        self.nprobe = nprobe
+        self.rerank_scorer = rerank_scorer
+        self.rerank = rerank
+        self.kind = "ivf_pq" if isinstance(scorer, PQScorer) else "ivf"
+
+    @property
+    def nbytes(self):
+        return int(self.scorer.nbytes + self.centroids.nbytes + self.offsets.nbytes + self.list_ids.nbytes)
+
+    def _candidates(self, probes):
+        return np.concatenate([self.list_ids[self.offsets[p]:self.offsets[p + 1]] for p in probes])
+
+    def search(self, query, k, mask=None, nprobe=None, rerank=None):
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        rerank = self.rerank if rerank is None else rerank
+        allowed = len(self.scorer) if mask is None else int(mask.sum())
+        k = min(k, allowed)
+        if k == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        probe_order = top_k(self.centroids @ query - self.half_norms, len(self.centroids))
+        while True:
+            rows = self._candidates(probe_order[:nprobe])
+            if mask is not None:
+                rows = rows[mask[rows]]
+            # 조건이 까다로워 후보가 부족하면 더 많은 리스트를 본다
+            if rows.size >= k or nprobe >= len(self.centroids):
+                break
+            nprobe = min(len(self.centroids), nprobe * 2)
+
+        scores = self.scorer.score_rows(query, rows)
+        if rerank and self.rerank_scorer is not None:
+            shortlist = rows[top_k(scores, k * rerank)[:k * rerank]]
+            return shortlist[top_k(self.rerank_scorer.score_rows(query, shortlist), k)[:k]]
+        return rows[top_k(scores, k)[:k]]
+
+def build_ann_arrays(kind, vectors, nlist=None, pq_m=16, iterations=10, sample_size=65536):
+    # 인덱스를 저장할 배열들 (파일 이름 키 -> 배열)
+    if kind not in ANN_KINDS:
+        raise ValueError(f"Unknown ANN index kind: {kind}")
+    arrays = {}
+    if kind in ("ivf", "ivf_pq"):
+        centroids, offsets, list_ids = train_ivf(
+            vectors, nlist or default_nlist(len(vectors)), iterations, sample_size
+        )
+        arrays.update(ivf_centroids=centroids, ivf_offsets=offsets, ivf_ids=list_ids)
+    if kind == "ivf_pq":
+        quantizer = ProductQuantizer.train(vectors, pq_m, iterations=iterations, sample_size=sample_size)
+        arrays.update(pq_codebooks=quantizer.codebooks, pq_codes=quantizer.encode(vectors))
+    return arrays
+
+def load_ann_index(kind, arrays, scorer, nprobe=8, rerank=0):
+    # scorer: 원본(float32/int8) 행렬 점수 계산기 - exact/ivf의 점수, ivf_pq의 재정렬에 쓴다
+    if kind == "exact":
+        return ExactIndex(scorer)
+    if kind == "ivf":
+        return IVFIndex(arrays["ivf_centroids"], arrays["ivf_offsets"], arrays["ivf_ids"], scorer, nprobe)
+    if kind == "ivf_pq":
+        pq_scorer = PQScorer(ProductQuantizer(arrays["pq_codebooks"]), arrays["pq_codes"])
+        return IVFIndex(
+            arrays["ivf_centroids"], arrays["ivf_offsets"], arrays["ivf_ids"], pq_scorer, nprobe,
+            rerank_scorer=scorer, rerank=rerank
+        )
+    raise ValueError(f"Unknown ANN index kind: {kind}")
@@ -0,0 +1,117 @@
+# backend/app/answer_cache.py
+# 일반 질문 의미 캐시 - 질문 임베딩이 이전에 답한 질문과 충분히 비슷하면 LLM 호출 없이 저장된 답을 돌려준다.
+# 시스템 프롬프트나 모델이 바뀌면 이전 답을 쓰지 않도록 항목마다 프롬프트 키(해시)를 함께 저장한다.
+import hashlib
+import logging
+import threading
+import time
+import numpy as np
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+def prompt_key(system_prompt, *models):
+    return hashlib.sha256("\0".join([system_prompt, *map(str, models)]).encode("utf-8")).hexdigest()[:16]
+
+class SemanticAnswerCache:
+    # 항목은 고정 크기 행렬의 행에 보관 - 조회는 행렬-벡터 곱 한 번이고,
+    # 가득 차면 만료된 행, 없으면 가장 오래 쓰이지 않은 행을 덮어쓴다
+    def __init__(self, max_entries, ttl_seconds, threshold):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._vectors = None
+        self._prompt_codes = np.full(max_entries, -1, dtype=np.int32)
+        self._prompt_index = {}
+        self._expires_at = np.zeros(max_entries)
+        self._last_used = np.zeros(max_entries)
+        self._questions = [None] * max_entries
+        self._answers = [None] * max_entries
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _clear(self):
+        self._vectors = None
+        self._prompt_codes[:] = -1
+        self._expires_at[:] = 0
+        self._questions = [None] * self.max_entries
+        self._answers = [None] * self.max_entries
+
+    def get(self, key, embedding):
+        # (저장된 답, 유사도) 또는 None
+        query = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            code = self._prompt_index.get(key)
+            if self._vectors is None or code is None or self._vectors.shape[1] != query.size:
+                self.stats["misses"] += 1
+                return None
+            live = (self._prompt_codes == code) & (self._expires_at >= now)
+            scores = np.where(live, self._vectors @ query, -np.inf)
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.stats["misses"] += 1
+                return None
+            self._last_used[best] = now
+            self.stats["hits"] += 1
+            return self._answers[best], float(scores[best])
+
+    def set(self, key, embedding, question, answer):
+        vector = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.size:
+                # 임베딩 차원이 바뀌면(모델 변경) 기존 항목은 비교할 수 없다
+                self._clear()
+                self._vectors = np.zeros((self.max_entries, vector.size), dtype=np.float32)
+            expired = self._expires_at < now
+            if expired.any():
+                row = int(np.argmax(expired))
+            else:
+                row = int(np.argmin(self._last_used))
+                self.stats["evictions"] += 1
+            self._vectors[row] = vector
+            self._prompt_codes[row] = self._prompt_index.setdefault(key, len(self._prompt_index))
+            self._expires_at[row] = now + self.ttl_seconds
+            self._last_used[row] = now
+            self._questions[row] = question
+            self._answers[row] = answer
+            self.stats["stores"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def __len__(self):
+        return int((self._expires_at >= time.time()).sum())
+
+    def get_stats(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": self.stats["hits"] / lookups if lookups else None,
+            "entries": len(self),
+            "threshold": self.threshold,
+        }
+
+_answer_cache = None
+
+def get_answer_cache():
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = SemanticAnswerCache(
+            settings.answer_cache_max_entries,
+            settings.answer_cache_ttl_seconds,
+            settings.answer_cache_threshold
+        )
+    return _answer_cache
+
+def get_answer_cache_stats():
+    return _answer_cache.get_stats() if _answer_cache is not None else None
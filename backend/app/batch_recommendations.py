@@ -0,0 +1,132 @@
+# backend/app/batch_recommendations.py
+# 대량 추천 - 여러 취향 프로필/검색 요청을 한 번에 처리한다.
+# 같은 항목은 한 번만 계산하고, 검색 문장은 중복 제거 후 한 번의 배치 임베딩 호출로 임베딩한 뒤
+# 공유 임베딩 행렬에서 질의 묶음을 행렬 곱으로 함께 검색한다.
+import asyncio
+import json
+import logging
+from app.catalog import get_wine_catalog
+from app.config import get_settings
+from app.retrieval import run_blocking, filtered_similarity_search, build_metadata_filter
+from app.telemetry import span, log_event
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+def preferences_search_query(preferences):
+    # 자유 텍스트 요청에 취향 수치를 붙인 검색 문장
+    return f"""{preferences.query}
+        당도: {preferences.preferred_sweetness}
+        산도: {preferences.preferred_acidity}
+        바디: {preferences.preferred_body}
+        타닌: {preferences.preferred_tannin}
+        종류: {', '.join(preferences.preferred_types)}
+        """
+
+def _item_key(item):
+    # 결과에 영향을 주는 필드만으로 만든 키 (클라이언트가 붙인 id 등은 제외)
+    return json.dumps(
+        [
+            item.preferred_sweetness,
+            item.preferred_acidity,
+            item.preferred_body,
+            item.preferred_tannin,
+            item.preferred_types,
+            list(item.price_range),
+            item.query or None,
+        ],
+        ensure_ascii=False
+    )
+
+def structured_recommendation_rows(catalog, item, k):
+    # 임베딩 없이 취향 수치만으로 찾는 추천 - 종류는 채팅과 같은 부분 문자열 일치("레드" -> "레드" 계열 종류),
+    # 맛 수치가 비어 있는(0) 와인은 검색과 마찬가지로 후보에서 뺀다
+    return catalog.nearest_rows(
+        (
+            item.preferred_sweetness,
+            item.preferred_acidity,
+            item.preferred_body,
+            item.preferred_tannin,
+        ),
+        wine_types=catalog.match_wine_types(item.preferred_types) if item.preferred_types else None,
+        price_range=item.price_range,
+        k=k,
+        mask=catalog.valid
+    )
+
+async def _semantic_rows(catalog, items, k):
+    from app.embedding_cache import get_embeddings
+    from app.embedding_matrix import get_embedding_matrix
+
+    # 같은 검색 문장은 한 번만 임베딩 (캐시에 없는 문장만 API로 간다)
+    texts = [preferences_search_query(item) for item in items]
+    unique_texts = list(dict.fromkeys(texts))
+    with span("embed_batch"):
+        vectors = await get_embeddings().aembed_documents(unique_texts)
+    by_text = dict(zip(unique_texts, vectors))
+    queries = [by_text[text] for text in texts]
+
+    matrix = get_embedding_matrix()
+    if matrix is not None:
+        masks = [catalog.filter_mask(price_range=item.price_range) for item in items]
+        with span("matrix_search_batch"):
+            return await run_blocking(matrix.search_many, queries, k, catalog, masks)
+
+    from app.vector_store import get_vector_store
+
+    vector_store = await get_vector_store()
+    results = await asyncio.gather(*(
+        filtered_similarity_search(
+            vector_store,
+            text,
+            k=k,
+            filter=build_metadata_filter(price_range=catalog.effective_price_range(item.price_range)),
+            candidate_count=catalog.count(price_range=item.price_range),
+            embedding=query
+        )
+        for item, text, query in zip(items, texts, queries)
+    ))
+    return [catalog.rows_of(docs) for docs in results]
+
+async def recommend_batch(items, k=4):
+    # 항목 순서대로 추천 와인의 카탈로그 행 번호 목록
+    # 항목은 PreferencesRequest와 같은 필드를 가진 객체 (query가 있으면 의미 검색)
+    catalog = get_wine_catalog()
+    keys = [_item_key(item) for item in items]
+    unique = {}
+    for key, item in zip(keys, items):
+        unique.setdefault(key, item)
+
+    results = {}
+    semantic = []
+    with span("catalog_nearest_batch"):
+        for key, item in unique.items():
+            if item.query:
+                semantic.append((key, item))
+            else:
+                results[key] = structured_recommendation_rows(catalog, item, k)
+    if semantic:
+        rows = await _semantic_rows(catalog, [item for _, item in semantic], k)
+        results.update(zip([key for key, _ in semantic], rows))
+
+    log_event(
+        logger,
+        "batch_recommendation",
+        items=len(items),
+        unique=len(unique),
+        semantic=len(semantic)
+    )
+    return [results[key] for key in keys]
+
+async def iter_batch_recommendations(items, k=4, chunk_size=None):
+    # 청크 단위로 계산해 (항목 번호, 행 번호 목록 또는 예외)를 순서대로 내보낸다
+    chunk_size = chunk_size or settings.batch_chunk_size
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        try:
+            rows = await recommend_batch(chunk, k)
+        except Exception as e:
+            logger.error(f"Error in batch recommendations [{start}:{start + len(chunk)}]: {e}")
+            rows = [e] * len(chunk)
+        for offset, result in enumerate(rows):
+            yield start + offset, result
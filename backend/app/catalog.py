@@ -0,0 +1,202 @@
+# backend/app/catalog.py
+import hashlib
+import logging
+import threading
+import numpy as np
+from app.vector_store import load_wine_data, normalize_wine_frame, make_wine_id, TEXT_COLUMNS
+from app.serialization import JSONFragment, dumps
+
+logger = logging.getLogger(__name__)
+
+TASTE_COLUMNS = ["sweetness", "acidity", "body", "tannin"]
+RECORD_COLUMNS = ["wine_id"] + TEXT_COLUMNS[:6] + ["price"] + TASTE_COLUMNS + TEXT_COLUMNS[6:]
+SORTABLE_COLUMNS = ["price"] + TASTE_COLUMNS + ["name_ko", "name_en"]
+
+class WineRecord(dict):
+    # 모든 요청이 공유하는 읽기 전용 레코드 - 수정이 필요하면 dict(record)로 복사해서 쓴다
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Wine catalog records are read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+class WineCatalog:
+    # 숫자 속성은 NumPy 컬럼으로 보관해 임베딩 호출 없이 벡터 연산으로 필터링/점수 계산
+    # records만 있으면 만들 수 있어 스냅샷에서 pandas 없이 불러올 수 있다
+    # 행 번호가 와인의 정수 ID (같은 카탈로그 버전 안에서 바뀌지 않음)
+    def __init__(self, records, version):
+        self.records = tuple(WineRecord(record) for record in records)
+        self.size = len(self.records)
+        # 와인별 JSON은 로드할 때 한 번만 인코딩하고 응답은 조각을 이어 붙여 만든다
+        self.fragments = tuple(JSONFragment(dumps(record)) for record in self.records)
+        # 카탈로그 내용이 바뀌면 달라지는 지문 (ETag, 커서 검증용)
+        self.version = version
+        self.taste = np.array(
+            [[record[column] for column in TASTE_COLUMNS] for record in records], dtype=np.float32
+        ).reshape(-1, len(TASTE_COLUMNS))
+        self.price = np.array([record["price"] for record in records], dtype=np.float32)
+        # Wine 모델 조건(맛 1~5, 가격 0 이상)을 만족하는 행 - 요청마다 모델로 다시 검증하지 않는다
+        self.valid = ((self.taste >= 1) & (self.taste <= 5)).all(axis=1) & (self.price >= 0)
+        self.valid_count = int(self.valid.sum())
+        # 와인 종류는 정수 코드로 저장해 isin 비교를 정수 연산으로 처리 (처음 나온 순서대로 코드 부여)
+        self.wine_type_index = {}
+        for record in records:
+            self.wine_type_index.setdefault(record["wine_type"], len(self.wine_type_index))
+        self.wine_type_codes = np.array(
+            [self.wine_type_index[record["wine_type"]] for record in records], dtype=np.int16
+        )
+        self.index_by_wine_id = {record["wine_id"]: i for i, record in enumerate(records)}
+        self.index_by_name = {record["name_ko"]: i for i, record in enumerate(records)}
+        self._sort_columns = {
+            column: np.array([record[column] for record in records]) for column in SORTABLE_COLUMNS
+        }
+        self._sort_orders = {}
+
+    @classmethod
+    def from_frame(cls, df):
+        import pandas as pd
+
+        df = normalize_wine_frame(df).drop_duplicates(subset="name_ko").reset_index(drop=True)
+        df["wine_id"] = [
+            make_wine_id(detail_url, name_ko, name_en)
+            for detail_url, name_ko, name_en in zip(df["detail_url"], df["name_ko"], df["name_en"])
+        ]
+        version = hashlib.sha1(
+            pd.util.hash_pandas_object(df[RECORD_COLUMNS], index=False).to_numpy().tobytes()
+        ).hexdigest()[:16]
+        return cls(df[RECORD_COLUMNS].to_dict("records"), version)
+
+    def __len__(self):
+        return self.size
+
+    def index_of(self, metadata):
+        # 벡터 스토어 문서 메타데이터 -> 카탈로그 행 번호 (wine_id가 없던 예전 인덱스는 이름으로)
+        index = self.index_by_wine_id.get(metadata.get("wine_id"))
+        if index is None:
+            index = self.index_by_name.get(metadata.get("name_ko"))
+        return index
+
+    def rows_of(self, docs):
+        # 검색 결과 문서 -> 중복 없는 카탈로그 행 번호 (카탈로그에 없는 문서는 건너뜀)
+        rows = (self.index_of(doc.metadata) for doc in docs)
+        return list(dict.fromkeys(i for i in rows if i is not None))
+
+    def wine_ids(self, rows):
+        return [self.records[i]["wine_id"] for i in rows]
+
+    def rows_of_wine_ids(self, wine_ids):
+        # 캐시 등에 저장해 둔 wine_id -> 현재 카탈로그 행 번호 (다시 로드돼 사라진 와인은 건너뜀)
+        return [i for i in (self.index_by_wine_id.get(wine_id) for wine_id in wine_ids) if i is not None]
+
+    def fragments_of(self, rows):
+        return [self.fragments[i] for i in rows]
+
+    def match_wine_types(self, preferred_types):
+        # "레드" -> 카탈로그에 있는 와인 종류 중 해당 문자열을 포함하는 종류들
+        return [
+            wine_type for wine_type in self.wine_type_index
+            if any(preferred in wine_type for preferred in preferred_types)
+        ]
+
+    def count(self, wine_types=None, price_range=None):
+        return int(self.filter_mask(wine_types, price_range).sum())
+
+    def effective_price_range(self, price_range):
+        # 카탈로그의 모든 가격을 포함하는 범위는 조건이 아니므로 None
+        # (Chroma 가격 필터는 일치하는 문서가 많을수록 느려서, 걸러내는 게 없으면 아예 넘기지 않는다)
+        if price_range is None or not self.size:
+            return price_range
+        min_price, max_price = price_range
+        if min_price <= self.price.min() and max_price >= self.price.max():
+            return None
+        return price_range
+
+    def filter_mask(self, wine_types=None, price_range=None):
+        mask = np.ones(self.size, dtype=bool)
+        if wine_types is not None:
+            allowed = np.zeros(len(self.wine_type_index), dtype=bool)
+            for wine_type in wine_types:
+                code = self.wine_type_index.get(wine_type)
+                if code is not None:
+                    allowed[code] = True
+            mask &= allowed[self.wine_type_codes]
+        if price_range is not None:
+            min_price, max_price = price_range
+            mask &= (self.price >= min_price) & (self.price <= max_price)
+        return mask
+
+    def nearest_rows(self, taste, wine_types=None, price_range=None, k=4, mask=None, boost=None):
+        # taste: (당도, 산도, 바디, 타닌) - 유클리드 거리가 가까운 순으로 k개의 행 번호
+        # mask로 후보를 더 좁히고, boost(예: 패싯 일치 개수)가 높은 와인을 먼저 정렬
+        candidate_mask = self.filter_mask(wine_types, price_range)
+        if mask is not None:
+            candidate_mask &= mask
+        candidates = np.flatnonzero(candidate_mask)
+        if candidates.size == 0:
+            return []
+
+        target = np.asarray(taste, dtype=np.float32)
+        distances = np.square(self.taste[candidates] - target).sum(axis=1)
+        if boost is not None:
+            # 일치 개수 차이가 거리보다 우선하도록 최대 거리(4 x 4^2)보다 큰 값으로 가중
+            distances = distances - boost[candidates].astype(np.float32) * 100.0
+
+        k = min(k, candidates.size)
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.lexsort((candidates[top], distances[top]))]
+        return candidates[top].tolist()
+
+    def sort_order(self, column=None, descending=False):
+        # 정렬 순서는 컬럼/방향별로 한 번만 계산해 재사용 - 목록은 검색과 같은 유효한 와인만 (valid_count개)
+        key = (column, descending)
+        order = self._sort_orders.get(key)
+        if order is None:
+            if column is None:
+                order = np.arange(self.size)
+            else:
+                order = np.argsort(self._sort_columns[column], kind="stable")
+            if descending:
+                order = order[::-1]
+            order = order[self.valid[order]]
+            self._sort_orders[key] = order
+        return order
+
+    def page(self, offset, limit, sort=None, descending=False, fields=None):
+        # 필드를 고르지 않으면 미리 인코딩한 JSON 조각을 돌려준다
+        indices = self.sort_order(sort, descending)[offset:offset + limit]
+        if fields:
+            return [{field: self.records[i][field] for field in fields} for i in indices]
+        return [self.fragments[i] for i in indices]
+
+_catalog = None
+# warm_up 스레드와 다른 호출이 동시에 만들지 않도록 (만든 뒤에는 잠금 없이 읽는다)
+_catalog_lock = threading.Lock()
+
+def get_wine_catalog():
+    global _catalog
+    if _catalog is not None:
+        return _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            # 스냅샷이 현재 CSV와 같으면 CSV 파싱 없이 스냅샷의 레코드를 그대로 쓴다
+            from app.snapshot import load_snapshot_catalog
+
+            snapshot = load_snapshot_catalog()
+            if snapshot is not None:
+                catalog = WineCatalog(snapshot["records"], snapshot["version"])
+            else:
+                catalog = WineCatalog.from_frame(load_wine_data())
+            logger.info(f"Loaded wine catalog with {len(catalog)} wines")
+            _catalog = catalog
+    return _catalog
+
+def reload_wine_catalog():
+    # CSV가 갱신된 뒤 호출 - 새 카탈로그를 만든 다음 참조만 교체
+    global _catalog
+    catalog = WineCatalog.from_frame(load_wine_data())
+    with _catalog_lock:
+        _catalog = catalog
+    logger.info(f"Reloaded wine catalog with {len(catalog)} wines")
+    return catalog
@@ -3,6 +3,76 @@ from functools import lru_cache
 
 class Settings(BaseSettings):
     openai_api_key: str
+    # OpenAI 호환 API 주소 (로컬 가짜 서버로 테스트할 때 지정)
+    openai_base_url: str | None = None
+    # 벡터 스토어 디렉터리 (기본값: backend/data/vector_store)
+    vector_store_dir: str | None = None
+    # 빌드 때 만든 인덱스 스냅샷 디렉터리 (기본값: backend/data/snapshot)
+    snapshot_dir: str | None = None
+    # 워커 간 공유하는 mmap 임베딩 행렬 (dtype: "float32" 또는 "int8")
+    embedding_matrix_enabled: bool = True
+    embedding_matrix_dir: str | None = None
+    embedding_matrix_dtype: str = "float32"
+    # 임베딩 행렬 검색 인덱스 (kind: "exact", "ivf", "ivf_pq")
+    # nlist/pq_m은 내보낼 때 정해지고(nlist 0이면 4 * sqrt(N)), nprobe/rerank는 워커마다 바꿀 수 있다
+    ann_index: str = "exact"
+    ann_nlist: int = 0
+    ann_pq_m: int = 16
+    ann_nprobe: int = 8
+    ann_rerank: int = 4
+
+    # 검색(임베딩 + Chroma 쿼리) 동시 실행 제한
+    retrieval_max_concurrency: int = 4
+    # 클라이언트 연결 끊김 확인 주기 (초)
+    disconnect_poll_interval: float = 0.1
+    # 필터 검색 시 중복 제거를 대비한 초기 over-fetch 배수
+    retrieval_overfetch_factor: int = 2
+
+    # 임베딩 전에 tiktoken으로 입력 길이를 확인해 나눌지 (인코딩 파일을 내려받을 수 없는 오프라인 벤치마크에서는 끈다)
+    openai_embedding_check_ctx_length: bool = True
+
+    # 임베딩 캐시 (SQLite 파일 경로, 메모리 LRU 크기)
+    embedding_cache_path: str | None = None
+    embedding_cache_memory_size: int = 4096
+
+    # 적재 파이프라인 (CSV 청크 행 수, 스토어 업서트 배치 크기)
+    ingest_chunk_size: int = 1000
+    ingest_batch_size: int = 256
+
+    # 인덱스 빌드 (동시 임베딩 배치 수, 분당 토큰 예산, 재시도 횟수)
+    index_build_workers: int = 4
+    index_build_tokens_per_minute: int = 1000000
+    index_build_max_retries: int = 5
+
+    # 추천 응답 캐시 (backend: "memory" 또는 워커 간 공유용 "sqlite")
+    response_cache_enabled: bool = True
+    response_cache_backend: str = "memory"
+    response_cache_path: str | None = None
+    response_cache_ttl_seconds: int = 300
+    response_cache_max_entries: int = 1024
+
+    # 일반 질문 의미 캐시 (임베딩 코사인 유사도 기준, TTL, 최대 항목 수)
+    answer_cache_enabled: bool = True
+    answer_cache_threshold: float = 0.95
+    answer_cache_ttl_seconds: int = 86400
+    answer_cache_max_entries: int = 1024
+
+    # 채팅 LLM 프롬프트 토큰 예산 (시스템 프롬프트 + 직전 추천 와인 정보 + 사용자 메시지)
+    chat_prompt_max_tokens: int = 1500
+
+    # 대량 추천 (요청당 최대 항목 수, 한 번에 임베딩/검색할 항목 수)
+    batch_max_items: int = 10000
+    batch_chunk_size: int = 256
+
+    # 사용자 프로필 저장소 (SQLite 경로, 선호 벡터에서 시음 기록 비중, 검색 벡터에 더할 선호 벡터 가중치)
+    user_profile_path: str | None = None
+    user_profile_history_weight: float = 0.5
+    user_profile_query_weight: float = 0.5
+
+    # 로깅 (레벨, JSON 출력 여부, 요청 경로 로그 샘플링 비율)
+    log_level: str = "INFO"
+    log_json: bool = True
+    log_sample_rate: float = 0.1
     
     class Config:
         env_file = ".env"
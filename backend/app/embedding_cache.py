@@ -0,0 +1,184 @@
+# backend/app/embedding_cache.py
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from app.config import get_settings
+from app.retrieval import run_blocking
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent / "data" / "embedding_cache.sqlite3"
+
+class CachedEmbeddings(Embeddings):
+    # 모델 이름 + 텍스트 해시를 키로 임베딩을 메모리 LRU와 SQLite에 보관
+    # async 경로는 메모리 LRU만 이벤트 루프에서 보고, SQLite 조회/저장은 run_blocking 스레드에서 한다
+    def __init__(self, embeddings, db_path=DEFAULT_CACHE_PATH, memory_size=4096):
+        self.embeddings = embeddings
+        self.model_name = getattr(embeddings, "model", type(embeddings).__name__)
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        # 메모리 LRU와 SQLite 연결은 잠금을 따로 둔다 - 루프에서 LRU를 볼 때 스레드의 SQLite 작업을 기다리지 않도록
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _lookup_memory(self, keys):
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                    self.stats["memory_hits"] += 1
+                else:
+                    missing.append(key)
+        return found, missing
+
+    def _lookup_disk(self, keys):
+        # SQLite 변수 개수 제한을 넘지 않도록 나눠서 조회
+        found = {}
+        with self._db_lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        with self._lock:
+            for key, vector in found.items():
+                self._remember(key, vector)
+            self.stats["disk_hits"] += len(found)
+        return found
+
+    def _store(self, items):
+        with self._db_lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items]
+            )
+            self._conn.commit()
+        with self._lock:
+            for key, vector in items:
+                self._remember(key, vector)
+            self.stats["misses"] += len(items)
+
+    def _missing(self, keys, texts, found):
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        return missing
+
+    def _split(self, texts):
+        keys = [self._key(text) for text in texts]
+        found, missing_keys = self._lookup_memory(keys)
+        if missing_keys:
+            found.update(self._lookup_disk(missing_keys))
+        return keys, found, self._missing(keys, texts, found)
+
+    async def _asplit(self, texts):
+        keys = [self._key(text) for text in texts]
+        found, missing_keys = self._lookup_memory(keys)
+        if missing_keys:
+            found.update(await run_blocking(self._lookup_disk, missing_keys))
+        return keys, found, self._missing(keys, texts, found)
+
+    def embed_documents(self, texts):
+        keys, found, missing = self._split(texts)
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            self._store(new_items)
+            found.update(new_items)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text):
+        keys, found, missing = self._split([text])
+        if missing:
+            new_items = [(keys[0], self.embeddings.embed_query(text))]
+            self._store(new_items)
+            found.update(new_items)
+        return found[keys[0]]
+
+    async def aembed_documents(self, texts):
+        keys, found, missing = await self._asplit(texts)
+        if missing:
+            vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            await run_blocking(self._store, new_items)
+            found.update(new_items)
+        return [found[key] for key in keys]
+
+    async def aembed_query(self, text):
+        keys, found, missing = await self._asplit([text])
+        if missing:
+            new_items = [(keys[0], await self.embeddings.aembed_query(text))]
+            await run_blocking(self._store, new_items)
+            found.update(new_items)
+        return found[keys[0]]
+
+    def get_stats(self):
+        lookups = sum(self.stats.values())
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        return {
+            **self.stats,
+            "hit_rate": hits / lookups if lookups else None,
+            "memory_entries": len(self._memory),
+            "model": self.model_name,
+        }
+
+    def close(self):
+        with self._db_lock:
+            self._conn.close()
+
+_embeddings = None
+
+def get_embeddings():
+    # 문서 적재와 쿼리 임베딩이 모두 같은 캐시를 거치도록 프로세스당 하나만 생성
+    global _embeddings
+    if _embeddings is None:
+        from langchain_openai import OpenAIEmbeddings
+
+        if not settings.openai_api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment variables")
+        _embeddings = CachedEmbeddings(
+            OpenAIEmbeddings(
+                openai_api_key=settings.openai_api_key,
+                openai_api_base=settings.openai_base_url,
+                check_embedding_ctx_length=settings.openai_embedding_check_ctx_length
+            ),
+            db_path=settings.embedding_cache_path or DEFAULT_CACHE_PATH,
+            memory_size=settings.embedding_cache_memory_size
+        )
+    return _embeddings
+
+def get_embedding_cache_stats():
+    return _embeddings.get_stats() if _embeddings is not None else None
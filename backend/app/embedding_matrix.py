@@ -0,0 +1,336 @@
+# backend/app/embedding_matrix.py
+# 벡터 스토어의 임베딩을 .npy 행렬로 내보내고 워커마다 mmap으로 열어 검색한다.
+# 파일은 한 번 쓰면 바뀌지 않으므로 같은 호스트의 모든 워커가 페이지 캐시를 공유하고,
+# 인덱스가 다시 빌드되면 새 파일을 쓴 뒤 current.json만 교체한다.
+# 검색 방식(정확/IVF/IVF-PQ, app.ann)은 내보낼 때 ann_index 설정으로 정해져 current.json에 기록된다.
+#
+# 사용법 (backend 디렉터리에서): python -m app.embedding_matrix export
+import fcntl
+import json
+import logging
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+from app.ann import ExactIndex, VectorScorer, build_ann_arrays, load_ann_index, quantize_int8, top_k
+from app.config import get_settings
+from app.vector_store import VECTOR_STORE_DIR
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+EMBEDDING_MATRIX_DIR = (
+    Path(settings.embedding_matrix_dir) if settings.embedding_matrix_dir
+    else VECTOR_STORE_DIR.parent / "embedding_matrix"
+)
+POINTER_FILE = "current.json"
+LOCK_FILE = ".export.lock"
+# Chroma에서 임베딩을 읽어 올 때 한 번에 가져올 행 수
+EXPORT_BATCH_SIZE = 5000
+# 여러 질의를 함께 검색할 때 한 번에 곱할 질의 수 (점수 행렬 메모리 제한)
+SEARCH_QUERY_BLOCK = 64
+
+def _save_array(path, array):
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+def _read_pointer(directory=EMBEDDING_MATRIX_DIR):
+    try:
+        with open(Path(directory) / POINTER_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+@contextmanager
+def _export_lock(output_dir):
+    # 여러 워커가 동시에 시작해 내보내도 한 번에 하나만 - 다른 쪽의 정리 단계가 새 파일을 지우지 않도록
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_dir / LOCK_FILE, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def export_embedding_matrix(vector_store, output_dir=EMBEDDING_MATRIX_DIR):
+    with _export_lock(output_dir):
+        return _export_embedding_matrix(vector_store, Path(output_dir))
+
+def copy_embedding_matrix(source_dir, target_dir=EMBEDDING_MATRIX_DIR):
+    # 현재 버전 파일을 복사한 뒤 current.json을 마지막에 교체 (스냅샷에 넣거나 스냅샷에서 설치할 때)
+    pointer = _read_pointer(source_dir)
+    if pointer is None:
+        return None
+    target_dir = Path(target_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    for name in [*pointer["files"].values(), POINTER_FILE]:
+        tmp_path = target_dir / (name + ".tmp")
+        shutil.copyfile(Path(source_dir) / name, tmp_path)
+        os.replace(tmp_path, target_dir / name)
+    return pointer
+
+def ensure_embedding_matrix(vector_store=None, output_dir=EMBEDDING_MATRIX_DIR):
+    # 내보낸 행렬이 없을 때만 만든다 - 스냅샷에 들어 있으면 검증 후 설치, 아니면 스토어에서 내보내기
+    # (새로 배포해 스토어를 만들거나 설치한 워커도 Chroma 대신 행렬로 검색하게 된다)
+    # 스토어 없이 부르면 스냅샷 설치만 시도한다
+    from app.snapshot import install_snapshot_matrix
+
+    if not settings.embedding_matrix_enabled:
+        return None
+    output_dir = Path(output_dir)
+    with _export_lock(output_dir):
+        if _read_pointer(output_dir) is not None:
+            return None
+        pointer = install_snapshot_matrix(output_dir)
+        if pointer is None and vector_store is not None:
+            pointer = _export_embedding_matrix(vector_store, output_dir)
+        return pointer
+
+def _export_embedding_matrix(vector_store, output_dir):
+    from app.indexing import get_index_version
+
+    start = time.perf_counter()
+
+    collection = vector_store._collection
+    total = collection.count()
+    vectors = None
+    wine_ids = []
+    names = []
+    for offset in range(0, total, EXPORT_BATCH_SIZE):
+        batch = collection.get(include=["embeddings", "metadatas"], limit=EXPORT_BATCH_SIZE, offset=offset)
+        embeddings = np.asarray(batch["embeddings"], dtype=np.float32)
+        if vectors is None:
+            vectors = np.empty((total, embeddings.shape[1]), dtype=np.float32)
+        vectors[offset:offset + len(embeddings)] = embeddings
+        for doc_id, metadata in zip(batch["ids"], batch["metadatas"]):
+            wine_ids.append((metadata or {}).get("wine_id", doc_id))
+            names.append((metadata or {}).get("name_ko", ""))
+    if vectors is None:
+        raise ValueError("Vector store is empty, nothing to export")
+    vectors = vectors[:len(wine_ids)]
+
+    # 단위 벡터로 정규화해 내적이 코사인 유사도가 되게 한다
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors /= norms
+    quantized, scales = quantize_int8(vectors)
+
+    version = f"v{get_index_version()}-{int(time.time() * 1000)}"
+    files = {
+        "float32": f"vectors-{version}.f32.npy",
+        "int8": f"vectors-{version}.i8.npy",
+        "scales": f"scales-{version}.npy",
+        "metadata": f"metadata-{version}.json",
+    }
+    _save_array(output_dir / files["float32"], vectors)
+    _save_array(output_dir / files["int8"], quantized)
+    _save_array(output_dir / files["scales"], scales)
+
+    ann_start = time.perf_counter()
+    ann_arrays = build_ann_arrays(
+        settings.ann_index, vectors, nlist=settings.ann_nlist or None, pq_m=settings.ann_pq_m
+    )
+    ann = {"kind": settings.ann_index}
+    for name, array in ann_arrays.items():
+        files[f"ann_{name}"] = f"ann-{version}.{name}.npy"
+        _save_array(output_dir / files[f"ann_{name}"], array)
+    if "ivf_centroids" in ann_arrays:
+        ann["nlist"] = len(ann_arrays["ivf_centroids"])
+    if "pq_codebooks" in ann_arrays:
+        ann["pq_m"] = len(ann_arrays["pq_codebooks"])
+    ann["build_seconds"] = round(time.perf_counter() - ann_start, 3)
+    with open(output_dir / files["metadata"], "w", encoding="utf-8") as f:
+        json.dump({"wine_id": wine_ids, "name_ko": names}, f, ensure_ascii=False)
+
+    previous = _read_pointer(output_dir)
+    pointer = {
+        "version": version,
+        "created_at": time.time(),
+        "count": len(wine_ids),
+        "dimensions": int(vectors.shape[1]),
+        "ann": ann,
+        "files": files,
+    }
+    tmp_path = output_dir / (POINTER_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(pointer, f, indent=2)
+    os.replace(tmp_path, output_dir / POINTER_FILE)
+
+    # 직전 버전은 아직 교체 전인 워커를 위해 남기고 그보다 오래된 파일만 삭제
+    keep = set(files.values()) | set((previous or {}).get("files", {}).values()) | {POINTER_FILE}
+    for path in output_dir.iterdir():
+        if path.is_file() and path.name not in keep and not path.name.startswith(".") and not path.name.endswith(".tmp"):
+            path.unlink()
+
+    logger.info(
+        f"Exported embedding matrix {version}: {pointer['count']} x {pointer['dimensions']} ({ann['kind']}) "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    return pointer
+
+class EmbeddingMatrix:
+    # mmap으로 연 임베딩 행렬 - 내보낼 때 만든 ANN 인덱스(없으면 정확한 검색)로 검색
+    def __init__(self, directory, pointer, dtype="float32", nprobe=8, rerank=0):
+        directory = Path(directory)
+        files = pointer["files"]
+        self.version = pointer["version"]
+        self.dtype = dtype
+        if dtype == "int8":
+            self.vectors = np.load(directory / files["int8"], mmap_mode="r")
+            self.scales = np.load(directory / files["scales"], mmap_mode="r")
+        else:
+            self.vectors = np.load(directory / files["float32"], mmap_mode="r")
+            self.scales = None
+        # 예전 형식(ann 없음)은 정확한 검색
+        self.ann = pointer.get("ann") or {"kind": "exact"}
+        ann_arrays = {
+            key[len("ann_"):]: np.load(directory / name, mmap_mode="r")
+            for key, name in files.items() if key.startswith("ann_")
+        }
+        self.index = load_ann_index(
+            self.ann["kind"], ann_arrays, VectorScorer(self.vectors, self.scales), nprobe=nprobe, rerank=rerank
+        )
+        with open(directory / files["metadata"], encoding="utf-8") as f:
+            metadata = json.load(f)
+        self.wine_ids = metadata["wine_id"]
+        self.names = metadata["name_ko"]
+        self._catalog_rows = (None, None)
+        self._rows_by_wine_id = None
+
+    def __len__(self):
+        return len(self.wine_ids)
+
+    def catalog_rows(self, catalog):
+        # 행렬 행 -> 카탈로그 행 번호 (카탈로그에 없는 와인은 -1), 카탈로그 버전별로 한 번만 계산
+        version, rows = self._catalog_rows
+        if version != catalog.version:
+            rows = np.array([
+                -1 if index is None else index
+                for index in (
+                    catalog.index_of({"wine_id": wine_id, "name_ko": name})
+                    for wine_id, name in zip(self.wine_ids, self.names)
+                )
+            ], dtype=np.int64)
+            self._catalog_rows = (catalog.version, rows)
+        return rows
+
+    def vectors_of(self, wine_ids):
+        # wine_id -> 단위 벡터 (와인 문서가 여러 개면 평균), 행렬에 없는 와인은 빠진다
+        if self._rows_by_wine_id is None:
+            rows_by_wine_id = {}
+            for row, wine_id in enumerate(self.wine_ids):
+                rows_by_wine_id.setdefault(wine_id, []).append(row)
+            self._rows_by_wine_id = rows_by_wine_id
+        vectors = {}
+        for wine_id in wine_ids:
+            rows = self._rows_by_wine_id.get(wine_id)
+            if not rows:
+                continue
+            vector = np.asarray(self.vectors[rows], dtype=np.float32)
+            if self.scales is not None:
+                vector = vector * self.scales[rows][:, None]
+            vector = vector.mean(axis=0)
+            vectors[wine_id] = vector / (np.linalg.norm(vector) or 1.0)
+        return vectors
+
+    def _valid_rows(self, catalog, mask):
+        rows = self.catalog_rows(catalog)
+        valid = rows >= 0
+        if mask is not None:
+            valid &= mask[np.maximum(rows, 0)]
+        return rows, valid
+
+    @staticmethod
+    def _top_unique(rows, valid, k, top_fn):
+        # 같은 카탈로그 행에 여러 벡터가 대응할 수 있어 여유 있게 뽑아 중복 제거
+        total = int(valid.sum())
+        if total == 0:
+            return []
+        fetch = min(total, k * settings.retrieval_overfetch_factor)
+        while True:
+            result = list(dict.fromkeys(rows[top_fn(fetch)].tolist()))[:k]
+            if len(result) >= k or fetch >= total:
+                return result
+            fetch = min(total, fetch * 2)
+
+    def search(self, query, k, catalog, mask=None):
+        # mask: 카탈로그 행 기준 조건 - 조건을 만족하는 와인 중 유사도 상위 k개의 카탈로그 행 번호
+        rows, valid = self._valid_rows(catalog, mask)
+        query = np.asarray(query, dtype=np.float32)
+        return self._top_unique(rows, valid, k, lambda fetch: self.index.search(query, fetch, valid))
+
+    def search_many(self, queries, k, catalog, masks=None):
+        # 여러 질의를 함께 검색 - 정확한 검색이면 질의 블록마다 행렬 곱 한 번으로 점수를 계산
+        queries = np.asarray(queries, dtype=np.float32)
+        masks = masks if masks is not None else [None] * len(queries)
+        if not isinstance(self.index, ExactIndex):
+            return [self.search(query, k, catalog, mask) for query, mask in zip(queries, masks)]
+
+        results = []
+        for start in range(0, len(queries), SEARCH_QUERY_BLOCK):
+            scores = self.index.scorer.score_many(queries[start:start + SEARCH_QUERY_BLOCK])
+            for column, mask in enumerate(masks[start:start + SEARCH_QUERY_BLOCK]):
+                rows, valid = self._valid_rows(catalog, mask)
+                column_scores = np.where(valid, scores[:, column], -np.inf)
+                results.append(self._top_unique(rows, valid, k, lambda fetch: top_k(column_scores, fetch)[:fetch]))
+        return results
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "dtype": self.dtype,
+            "count": len(self),
+            "dimensions": int(self.vectors.shape[1]),
+            "ann": {**self.ann, "nprobe": getattr(self.index, "nprobe", None)},
+            "bytes": self.index.nbytes,
+        }
+
+_matrix = None
+_pointer_mtime = None
+
+def get_embedding_matrix():
+    # current.json이 바뀐 경우에만 다시 열고, 내보낸 행렬이 없으면 None (Chroma로 검색)
+    global _matrix, _pointer_mtime
+    if not settings.embedding_matrix_enabled:
+        return None
+    try:
+        mtime = (EMBEDDING_MATRIX_DIR / POINTER_FILE).stat().st_mtime_ns
+    except FileNotFoundError:
+        return _matrix
+    if mtime != _pointer_mtime:
+        try:
+            pointer = _read_pointer(EMBEDDING_MATRIX_DIR)
+            if _matrix is None or pointer["version"] != _matrix.version:
+                _matrix = EmbeddingMatrix(
+                    EMBEDDING_MATRIX_DIR, pointer, dtype=settings.embedding_matrix_dtype,
+                    nprobe=settings.ann_nprobe, rerank=settings.ann_rerank
+                )
+                logger.info(
+                    f"Mapped embedding matrix {_matrix.version} "
+                    f"({_matrix.dtype}, {_matrix.ann['kind']}, {len(_matrix)} rows)"
+                )
+            _pointer_mtime = mtime
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # 내보내기 도중이면 다음 호출에서 다시 시도하고 그동안 기존 행렬을 쓴다
+            logger.warning(f"Could not map embedding matrix: {e}")
+    return _matrix
+
+def get_embedding_matrix_stats():
+    return _matrix.stats() if _matrix is not None else None
+
+if __name__ == "__main__":
+    import argparse
+    from app.vector_store import _open_vector_store
+
+    parser = argparse.ArgumentParser(description="Export the vector store embeddings as a shared memory-mapped matrix")
+    parser.add_argument("command", choices=["export"])
+    parser.add_argument("--output", type=Path, default=EMBEDDING_MATRIX_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(export_embedding_matrix(_open_vector_store(), args.output), indent=2))
@@ -0,0 +1,162 @@
+# backend/app/facet_index.py
+import logging
+import re
+import threading
+from functools import reduce
+import numpy as np
+from app.catalog import get_wine_catalog
+
+logger = logging.getLogger(__name__)
+
+# 쉼표로 여러 값이 들어 있는 필드와 단일 값 필드
+MULTI_VALUE_FIELDS = ["food_matching", "aroma"]
+SINGLE_VALUE_FIELDS = ["country", "region"]
+FACET_FIELDS = MULTI_VALUE_FIELDS + SINGLE_VALUE_FIELDS
+MISSING_VALUES = {"", "정보없음"}
+# 메시지에서 값을 찾을 때 한 글자 별칭(예: 아로마 "배")은 오탐이 많아 제외
+MIN_ALIAS_LENGTH = 2
+
+_ALIAS_PATTERN = re.compile(r"^(?P<local>[^(]+)\((?P<english>[^)]+)\)$")
+
+def split_values(field, value):
+    if field in MULTI_VALUE_FIELDS:
+        values = [v.strip() for v in value.split(",")]
+    else:
+        values = [value.strip()]
+    return [v for v in dict.fromkeys(values) if v not in MISSING_VALUES]
+
+def value_aliases(value):
+    # "프랑스(France)" -> 프랑스, france, 프랑스(france)
+    aliases = {value.lower()}
+    match = _ALIAS_PATTERN.match(value)
+    if match:
+        aliases.add(match.group("local").strip().lower())
+        aliases.add(match.group("english").strip().lower())
+    return {alias for alias in aliases if len(alias) >= MIN_ALIAS_LENGTH}
+
+class FacetField:
+    def __init__(self, name, records):
+        self.name = name
+        self.values = []
+        self.value_index = {}
+        doc_lists = []
+        flat_codes = []
+        flat_docs = []
+        for doc_id, record in enumerate(records):
+            for value in split_values(name, record[name]):
+                code = self.value_index.get(value)
+                if code is None:
+                    code = len(self.values)
+                    self.value_index[value] = code
+                    self.values.append(value)
+                    doc_lists.append([])
+                doc_lists[code].append(doc_id)
+                flat_codes.append(code)
+                flat_docs.append(doc_id)
+
+        # 값별 정렬된 와인 ID 배열 (교집합/합집합은 정렬 배열 연산)
+        self.postings = [np.array(ids, dtype=np.int32) for ids in doc_lists]
+        # 패싯 개수 계산용 (와인, 값) 쌍 - bincount 한 번으로 모든 값의 개수를 센다
+        self.flat_codes = np.array(flat_codes, dtype=np.int32)
+        self.flat_docs = np.array(flat_docs, dtype=np.int32)
+        self.aliases = [
+            (alias, code) for code, value in enumerate(self.values) for alias in value_aliases(value)
+        ]
+
+    def ids_for(self, values, match_all=False):
+        postings = [self.postings[self.value_index[v]] for v in values if v in self.value_index]
+        if not postings:
+            return np.zeros(0, dtype=np.int32)
+        if match_all:
+            if len(postings) < len(values):
+                return np.zeros(0, dtype=np.int32)
+            return reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True), postings)
+        return reduce(np.union1d, postings)
+
+    def counts(self, mask=None, limit=None):
+        codes = self.flat_codes if mask is None else self.flat_codes[mask[self.flat_docs]]
+        counts = np.bincount(codes, minlength=len(self.values))
+        order = np.lexsort((np.arange(len(self.values)), -counts))
+        order = order[counts[order] > 0]
+        if limit:
+            order = order[:limit]
+        return [{"value": self.values[code], "count": int(counts[code])} for code in order]
+
+    def match_text(self, text):
+        text = text.lower()
+        return list(dict.fromkeys(self.values[code] for alias, code in self.aliases if alias in text))
+
+class FacetIndex:
+    # 음식 페어링/아로마/국가/지역 값별 역색인 - 임베딩 없이 조건 검색과 패싯 집계
+    def __init__(self, catalog):
+        self.version = catalog.version
+        self.size = len(catalog)
+        self.fields = {name: FacetField(name, catalog.records) for name in FACET_FIELDS}
+
+    def select(self, filters, match_all=False):
+        # 필드 안에서는 OR(match_all이면 AND), 필드 사이는 AND
+        result = None
+        for field, values in filters.items():
+            if not values:
+                continue
+            ids = self.fields[field].ids_for(values, match_all=match_all)
+            result = ids if result is None else np.intersect1d(result, ids, assume_unique=True)
+        if result is None:
+            return np.arange(self.size, dtype=np.int32)
+        return result
+
+    def mask(self, ids):
+        mask = np.zeros(self.size, dtype=bool)
+        mask[ids] = True
+        return mask
+
+    def match_count(self, filters):
+        # 와인별로 요청한 값과 몇 개가 일치하는지 (정렬 가중치용)
+        counts = np.zeros(self.size, dtype=np.int32)
+        for field, values in filters.items():
+            for value in values:
+                code = self.fields[field].value_index.get(value)
+                if code is not None:
+                    counts[self.fields[field].postings[code]] += 1
+        return counts
+
+    def facet_counts(self, ids=None, fields=None, limit=None):
+        mask = self.mask(ids) if ids is not None else None
+        return {
+            name: self.fields[name].counts(mask, limit=limit)
+            for name in (fields or FACET_FIELDS)
+        }
+
+    def extract(self, text, fields=("food_matching", "country", "region")):
+        # "스테이크에 어울리는", "프랑스 보르도 레드" -> 메시지에 나온 패싯 값
+        filters = {}
+        for name in fields:
+            values = self.fields[name].match_text(text)
+            if values:
+                filters[name] = values
+        return filters
+
+    def strip_values(self, text, fields=("food_matching", "country", "region")):
+        # 메시지에서 패싯 값(별칭)을 지운 나머지 - 패싯 말고 다른 조건("화이트", "가벼운")이 있는지 보는 용도
+        text = text.lower()
+        aliases = {alias for name in fields for alias, _ in self.fields[name].aliases if alias in text}
+        # "보르도 블랑" 같은 긴 별칭을 먼저 지워 짧은 별칭이 일부만 지우지 않게 한다
+        for alias in sorted(aliases, key=len, reverse=True):
+            text = text.replace(alias, " ")
+        return text
+
+_facet_index = None
+_facet_index_lock = threading.Lock()
+
+def get_facet_index():
+    # 카탈로그가 다시 로드되면 색인도 새로 만든다 (동시에 호출돼도 한 번만)
+    global _facet_index
+    catalog = get_wine_catalog()
+    index = _facet_index
+    if index is not None and index.version == catalog.version:
+        return index
+    with _facet_index_lock:
+        if _facet_index is None or _facet_index.version != catalog.version:
+            _facet_index = FacetIndex(catalog)
+            logger.info(f"Built facet index over {', '.join(FACET_FIELDS)}")
+        return _facet_index
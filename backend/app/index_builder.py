@@ -0,0 +1,129 @@
+# backend/app/index_builder.py
+# 중단 후 재실행은 sync_vector_store의 content_hash 비교가 이미 업서트된 문서를 건너뛰므로 별도 체크포인트가 없다
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from app.config import get_settings
+from app.vector_store import iter_batches, upsert_embedded_documents
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+def estimate_tokens(texts):
+    # 한글은 대략 글자당 1토큰 - 예산 계산용 보수적 추정치
+    return sum(len(text) for text in texts)
+
+class TokenBudget:
+    # 분당 토큰 예산을 토큰 버킷으로 관리 (여러 워커 스레드가 공유)
+    def __init__(self, tokens_per_minute):
+        self.capacity = float(tokens_per_minute)
+        self.rate = self.capacity / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens):
+        # 한 배치가 예산보다 크면 버킷이 가득 찰 때까지만 기다린다
+        tokens = min(float(tokens), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.available >= tokens:
+                    self.available -= tokens
+                    return
+                wait_seconds = (tokens - self.available) / self.rate
+            time.sleep(wait_seconds)
+
+class IndexBuilder:
+    # 문서를 배치로 나눠 여러 배치를 동시에 임베딩하고, 완료된 배치부터 업서트
+    def __init__(
+        self,
+        vector_store,
+        embeddings=None,
+        workers=None,
+        batch_size=None,
+        tokens_per_minute=None,
+        max_retries=None,
+    ):
+        self.vector_store = vector_store
+        self.embeddings = embeddings or vector_store.embeddings
+        self.workers = workers or settings.index_build_workers
+        self.batch_size = batch_size or settings.ingest_batch_size
+        self.budget = TokenBudget(tokens_per_minute or settings.index_build_tokens_per_minute)
+        self.max_retries = settings.index_build_max_retries if max_retries is None else max_retries
+        self.stats = {"batches": 0, "documents": 0, "retries": 0}
+        # 재시도 횟수는 워커 스레드들이 동시에 올린다 (batches/documents는 호출 스레드만 쓴다)
+        self._lock = threading.Lock()
+
+    def _embed_batch(self, batch):
+        texts = [doc.page_content for doc in batch]
+        self.budget.acquire(estimate_tokens(texts))
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.embeddings.embed_documents(texts)
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                with self._lock:
+                    self.stats["retries"] += 1
+                delay = self._retry_delay(e, attempt)
+                logger.warning(f"Embedding batch failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    @staticmethod
+    def _retry_delay(error, attempt):
+        # 429 응답의 Retry-After가 있으면 따르고, 없으면 지수 백오프 + 지터
+        response = getattr(error, "response", None)
+        retry_after = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+        try:
+            if retry_after is not None:
+                return float(retry_after)
+        except ValueError:
+            pass
+        return min(60.0, 2 ** attempt) * (0.5 + random.random() / 2)
+
+    def _write_batch(self, batch, vectors):
+        start = time.perf_counter()
+        upsert_embedded_documents(self.vector_store, batch, vectors)
+        self.stats["batches"] += 1
+        self.stats["documents"] += len(batch)
+        logger.info(
+            f"Indexed batch {self.stats['batches']}: {len(batch)} documents "
+            f"(upsert {time.perf_counter() - start:.2f}s, total {self.stats['documents']})"
+        )
+
+    def build(self, documents):
+        start = time.perf_counter()
+
+        def pending_documents():
+            seen = set()
+            for doc in documents:
+                wine_id = doc.metadata["wine_id"]
+                if wine_id in seen:
+                    continue
+                seen.add(wine_id)
+                yield doc
+
+        batches = iter_batches(pending_documents(), self.batch_size)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="index-build") as executor:
+            in_flight = {}
+            for batch in batches:
+                in_flight[executor.submit(self._embed_batch, batch)] = batch
+                # 동시에 대기하는 배치 수를 제한해 메모리를 일정하게 유지
+                if len(in_flight) >= self.workers * 2:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        self._write_batch(in_flight.pop(future), future.result())
+            for future in list(in_flight):
+                self._write_batch(in_flight.pop(future), future.result())
+
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"Index build finished: {self.stats['documents']} documents in {self.stats['batches']} batches, "
+            f"{self.stats['retries']} retries in {elapsed:.2f}s"
+        )
+        return {**self.stats, "seconds": elapsed}
@@ -0,0 +1,136 @@
+# backend/app/indexing.py
+import json
+import logging
+import threading
+import time
+from app.vector_store import (
+    VECTOR_STORE_DIR,
+    iter_wine_documents,
+    stream_wine_documents,
+)
+from app.index_builder import IndexBuilder
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_PATH = VECTOR_STORE_DIR / "manifest.json"
+
+# 동기화는 한 번에 하나만 실행
+_sync_lock = threading.Lock()
+
+def read_manifest():
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+_version_cache = {"mtime": None, "version": 0}
+
+def get_index_version():
+    # 요청마다 호출되므로 manifest 파일이 바뀐 경우에만 다시 읽는다
+    try:
+        mtime = MANIFEST_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+    if mtime != _version_cache["mtime"]:
+        manifest = read_manifest()
+        _version_cache["version"] = manifest["version"] if manifest else 0
+        _version_cache["mtime"] = mtime
+    return _version_cache["version"]
+
+def _write_manifest(manifest):
+    # 임시 파일에 쓴 뒤 교체해 다른 워커가 반쯤 쓰인 파일을 읽지 않게 한다
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = MANIFEST_PATH.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    tmp_path.replace(MANIFEST_PATH)
+
+def sync_vector_store(vector_store, df=None, builder=None):
+    # CSV와 인덱싱된 문서를 wine_id + content_hash로 비교해 바뀐 행만 반영
+    with _sync_lock:
+        start = time.perf_counter()
+
+        existing = vector_store.get(include=["metadatas"])
+        indexed = {
+            doc_id: (metadata or {}).get("content_hash")
+            for doc_id, metadata in zip(existing["ids"], existing["metadatas"])
+        }
+
+        # CSV는 청크 단위로 스트리밍 - 메모리에는 ID/해시만 유지
+        documents = iter_wine_documents(df) if df is not None else stream_wine_documents()
+        seen = set()
+        counts = {"added": 0, "updated": 0}
+
+        def changed_documents():
+            for doc in documents:
+                wine_id = doc.metadata["wine_id"]
+                # 같은 wine_id가 여러 행이면 첫 행 기준
+                if wine_id in seen:
+                    continue
+                seen.add(wine_id)
+                if indexed.get(wine_id) == doc.metadata["content_hash"]:
+                    continue
+                counts["updated" if wine_id in indexed else "added"] += 1
+                yield doc
+
+        # 바뀐 문서만 병렬 배치 임베딩 엔진으로 업서트
+        builder = builder or IndexBuilder(vector_store)
+        build_stats = builder.build(changed_documents())
+
+        removed = [doc_id for doc_id in indexed if doc_id not in seen]
+        if removed:
+            vector_store.delete(ids=removed)
+
+        changed = counts["added"] + counts["updated"]
+        previous = read_manifest()
+        version = (previous["version"] if previous else 0)
+        if changed or removed or previous is None:
+            version += 1
+
+        summary = {
+            "version": version,
+            "synced_at": time.time(),
+            "count": len(seen),
+            "added": counts["added"],
+            "updated": counts["updated"],
+            "deleted": len(removed),
+            "unchanged": len(seen) - changed,
+            "embedding_retries": build_stats["retries"],
+            "seconds": time.perf_counter() - start,
+        }
+        _write_manifest(summary)
+        logger.info(
+            f"Vector store sync v{version}: {summary['added']} added, "
+            f"{summary['updated']} updated, {summary['deleted']} deleted "
+            f"in {summary['seconds']:.2f}s"
+        )
+        return summary
+
+if __name__ == "__main__":
+    # 사용법: python -m app.indexing [--workers N] [--batch-size N] [--tokens-per-minute N]
+    # (backend 디렉터리에서 실행)
+    import argparse
+    from app.vector_store import _open_vector_store
+
+    parser = argparse.ArgumentParser(description="Incrementally sync the wine vector store")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--tokens-per-minute", type=int, default=None)
+    args = parser.parse_args()
+
+    from app.config import get_settings
+    from app.embedding_matrix import export_embedding_matrix
+
+    logging.basicConfig(level=logging.INFO)
+    vector_store = _open_vector_store()
+    result = sync_vector_store(vector_store, builder=IndexBuilder(
+        vector_store,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        tokens_per_minute=args.tokens_per_minute
+    ))
+    if get_settings().embedding_matrix_enabled:
+        # /index/sync와 같이 행렬도 다시 내보내고 포인터를 교체 - 워커는 Chroma가 아니라 행렬에서 검색한다
+        result["embedding_matrix"] = export_embedding_matrix(vector_store)["version"]
+    print(json.dumps(result, ensure_ascii=False, indent=2))
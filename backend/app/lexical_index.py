@@ -0,0 +1,120 @@
+# backend/app/lexical_index.py
+import logging
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+import numpy as np
+from app.catalog import get_wine_catalog
+
+logger = logging.getLogger(__name__)
+
+LEXICAL_FIELDS = ["name_ko", "name_en", "winery"]
+# 자동완성 노드마다 보관할 최대 와인 수
+TRIE_NODE_LIMIT = 20
+# Reciprocal Rank Fusion 상수
+RRF_K = 60
+
+_TOKEN_PATTERN = re.compile(r"[^\w]+")
+
+def normalize_text(text):
+    # 대소문자/전각 문자 통일 후 구두점 제거
+    return _TOKEN_PATTERN.sub(" ", unicodedata.normalize("NFKC", text).lower()).strip()
+
+def char_ngrams(text, n=2):
+    # 공백을 뺀 문자 n-gram (한글은 형태소 분석 없이 바이그램이 잘 맞는다)
+    compact = text.replace(" ", "")
+    if len(compact) < n:
+        return {compact} if compact else set()
+    return {compact[i:i + n] for i in range(len(compact) - n + 1)}
+
+class PrefixTrie:
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, key, doc_id):
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+            ids = node.setdefault("\0", [])
+            if len(ids) < TRIE_NODE_LIMIT and doc_id not in ids:
+                ids.append(doc_id)
+
+    def lookup(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        return node.get("\0", [])
+
+class LexicalIndex:
+    # 이름/와이너리에 대한 문자 n-gram 역색인 + 자동완성용 접두사 트라이
+    def __init__(self, catalog):
+        self.version = catalog.version
+        self.size = len(catalog)
+        self.exact = defaultdict(list)
+        self.trie = PrefixTrie()
+        postings = defaultdict(list)
+
+        for doc_id, record in enumerate(catalog.records):
+            grams = set()
+            for field in LEXICAL_FIELDS:
+                # name_ko에는 "한글 이름\n영문 이름"이 함께 들어 있어 줄 단위로 나눈다
+                for value in record[field].split("\n"):
+                    normalized = normalize_text(value)
+                    if not normalized:
+                        continue
+                    self.exact[normalized.replace(" ", "")].append(doc_id)
+                    # 단어 시작 위치마다 넣어 "마고"로 "샤또 마고"도 찾을 수 있게 한다
+                    words = normalized.split(" ")
+                    for i in range(len(words)):
+                        self.trie.insert("".join(words[i:]), doc_id)
+                    grams |= char_ngrams(normalized)
+            for gram in grams:
+                postings[gram].append(doc_id)
+
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def exact_match(self, query):
+        return list(dict.fromkeys(self.exact.get(normalize_text(query).replace(" ", ""), [])))
+
+    def prefix_match(self, query, limit=10):
+        return self.trie.lookup(normalize_text(query).replace(" ", ""))[:limit]
+
+    def search(self, query, limit=10, min_overlap=0.5):
+        # 쿼리 n-gram이 많이 겹치는 순으로 정렬 (겹침 비율이 min_overlap 미만이면 제외)
+        grams = char_ngrams(normalize_text(query))
+        hits = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not hits:
+            return []
+        counts = np.bincount(np.concatenate(hits), minlength=self.size)
+        threshold = max(1, int(np.ceil(len(grams) * min_overlap)))
+        candidates = np.flatnonzero(counts >= threshold)
+        if candidates.size == 0:
+            return []
+        order = np.lexsort((candidates, -counts[candidates]))
+        return candidates[order][:limit].tolist()
+
+def reciprocal_rank_fusion(*rankings, k=RRF_K):
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda doc_id: -scores[doc_id])
+
+_lexical_index = None
+_lexical_index_lock = threading.Lock()
+
+def get_lexical_index():
+    # 카탈로그가 다시 로드되면 색인도 새로 만든다 (동시에 호출돼도 한 번만)
+    global _lexical_index
+    catalog = get_wine_catalog()
+    index = _lexical_index
+    if index is not None and index.version == catalog.version:
+        return index
+    with _lexical_index_lock:
+        if _lexical_index is None or _lexical_index.version != catalog.version:
+            _lexical_index = LexicalIndex(catalog)
+            logger.info(f"Built lexical index with {len(_lexical_index.postings)} n-grams")
+        return _lexical_index
@@ -0,0 +1,25 @@
+# backend/app/llm.py
+import logging
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+CHAT_MODEL = "gpt-3.5-turbo"
+
+# 요청마다 클라이언트를 만들지 않고 커넥션 풀을 가진 하나의 클라이언트를 공유
+_chat_model = None
+
+def get_chat_model():
+    global _chat_model
+    if _chat_model is None:
+        from langchain_openai import ChatOpenAI
+
+        logger.info("Initializing ChatOpenAI...")
+        _chat_model = ChatOpenAI(
+            temperature=0.7,
+            openai_api_key=settings.openai_api_key,
+            openai_api_base=settings.openai_base_url,
+            model=CHAT_MODEL
+        )
+    return _chat_model
@@ -1,10 +1,24 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from fastapi import FastAPI, Response, HTTPException, Depends
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import chat, recommendations
-from app.vector_store import get_vector_store
+from app.routers import chat, recommendations, index, wine, users
+from app.vector_store import open_vector_store, close_vector_store, get_vector_store_stats
+from app.retrieval import ClientDisconnectedError, shutdown_retrieval
+from app.catalog import get_wine_catalog
+from app.lexical_index import get_lexical_index
+from app.facet_index import get_facet_index
+from app.recommendation.engine import get_wine_recommender
+from app.response_cache import get_response_cache_stats
+from app.answer_cache import get_answer_cache_stats
+from app.telemetry import TimingMiddleware, configure_logging, shutdown_logging, render_metrics
+from app.indexing import get_index_version
+from app.snapshot import read_snapshot_manifest
+from app.embedding_matrix import get_embedding_matrix, ensure_embedding_matrix, get_embedding_matrix_stats
 import logging
 
-logging.basicConfig(level=logging.DEBUG)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Wine LLM API")
@@ -15,21 +29,132 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(TimingMiddleware)
 
-@app.on_event("startup")
-async def startup_event():
-    logger.info("Starting up...")
+# /health/ready 응답용 - 카탈로그/색인과 검색 인덱스("embedding_matrix" 또는 "chroma") 로드 상태
+# prompt_tokens: 채팅 프롬프트 토큰을 "exact"(tiktoken)로 세는지 "estimate"(근사치)로 세는지 (불러오는 중이면 None)
+_readiness = {"catalog": False, "dense_index": None, "seconds": None, "error": None, "prompt_tokens": None}
+
+async def load_prompt_encoding():
+    # 검색 인덱스 로드와 따로 진행 - 인덱스를 못 열어도, 인덱스 로드가 오래 걸려도 채팅은 정확한 토큰 수를 쓴다
+    try:
+        exact = await asyncio.to_thread(chat.prompt_builder.load)
+    except Exception as e:
+        exact = False
+        logger.error(f"Error loading prompt token encoding: {e}")
+    _readiness["prompt_tokens"] = "exact" if exact else "estimate"
+
+async def warm_up():
+    start = time.perf_counter()
     try:
-        await get_vector_store()
-        logger.info("Vector store initialized successfully")
+        # 카탈로그와 색인은 스냅샷이 있으면 CSV 파싱 없이 만들어진다
+        app.state.wine_catalog = await asyncio.to_thread(get_wine_catalog)
+        await asyncio.to_thread(get_lexical_index)
+        await asyncio.to_thread(get_facet_index)
+        await asyncio.to_thread(get_wine_recommender)
+        _readiness["catalog"] = True
+        if await asyncio.to_thread(get_embedding_matrix) is None:
+            # 행렬이 아직 없으면 스냅샷의 행렬을 먼저 설치하고, 그래도 없으면 스토어를 연다
+            # (스토어를 새로 만들거나 열 때 행렬이 없으면 그 자리에서 내보낸다)
+            await asyncio.to_thread(ensure_embedding_matrix)
+        if await asyncio.to_thread(get_embedding_matrix) is None:
+            app.state.vector_store = await open_vector_store()
+        if await asyncio.to_thread(get_embedding_matrix) is not None:
+            # 공유 임베딩 행렬이 있으면 워커마다 Chroma를 열어 두지 않는다 (/index/sync 때만 연다)
+            from app.embedding_cache import get_embeddings
+
+            await close_vector_store()
+            app.state.vector_store = None
+            await asyncio.to_thread(get_embeddings)
+            _readiness["dense_index"] = "embedding_matrix"
+        else:
+            # 행렬을 쓰지 않으면 벡터 스토어를 여기서 한 번만 열고 모든 요청이 공유
+            _readiness["dense_index"] = "chroma"
+        _readiness["seconds"] = time.perf_counter() - start
+        logger.info(f"Search index ({_readiness['dense_index']}) ready in {_readiness['seconds']:.2f}s")
     except Exception as e:
+        _readiness["error"] = str(e)
         logger.error(f"Error initializing vector store: {e}")
-        raise
 
-app.include_router(chat.router)
-app.include_router(recommendations.router)
+async def require_catalog_ready():
+    # 카탈로그/색인은 warm_up이 스레드에서 만든다 - 그 전에는 요청 안에서 이벤트 루프를 막으며 만들지 않고 503
+    if not _readiness["catalog"]:
+        raise HTTPException(
+            status_code=503,
+            detail="Wine catalog is still loading" if _readiness["error"] is None else _readiness["error"],
+            headers={"Retry-After": "1"}
+        )
+
+@app.on_event("startup")
+async def startup_event():
+    logger.info("Starting up...")
+    # 인덱스 로드는 백그라운드에서 진행 - 프로세스는 바로 살아 있고(/health/live),
+    # 로드가 끝나면 /health/ready가 200을 반환한다
+    app.state.warm_up_task = asyncio.create_task(warm_up())
+    # 프롬프트 토큰 인코딩은 준비 상태와 무관 - 불러오기 전까지 채팅 요청은 근사치로 센다
+    app.state.prompt_encoding_task = asyncio.create_task(load_prompt_encoding())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    logger.info("Shutting down...")
+    app.state.warm_up_task.cancel()
+    app.state.prompt_encoding_task.cancel()
+    shutdown_retrieval()
+    await close_vector_store()
+    app.state.vector_store = None
+    shutdown_logging()
+
+@app.exception_handler(ClientDisconnectedError)
+async def client_disconnected_handler(request, exc):
+    # 클라이언트가 이미 떠났으므로 본문 없이 종료 (nginx 관례의 499)
+    return Response(status_code=499)
+
+for router in (chat.router, recommendations.router, index.router, wine.router, users.router):
+    app.include_router(router, dependencies=[Depends(require_catalog_ready)])
 
 @app.get("/")
 async def root():
-    return {"message": "Wine LLM API is running"} 
\ No newline at end of file
+    return {"message": "Wine LLM API is running"}
+
+@app.get("/health/live")
+async def health_live():
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+async def health_ready():
+    ready = _readiness["catalog"] and _readiness["dense_index"] is not None
+    snapshot = read_snapshot_manifest()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "starting" if _readiness["error"] is None else "failed",
+            **_readiness,
+            "index_version": get_index_version(),
+            "snapshot_id": snapshot["snapshot_id"] if snapshot else None,
+        }
+    )
+
+@app.get("/stats")
+async def stats():
+    # 임베딩 모듈(langchain)은 벡터 스토어를 열 때 처음 import 된다
+    from app.embedding_cache import get_embedding_cache_stats
+
+    return {
+        "vector_store": get_vector_store_stats(),
+        "embedding_cache": get_embedding_cache_stats(),
+        "embedding_matrix": get_embedding_matrix_stats(),
+        # SQLite 백엔드는 항목 수를 세는 쿼리가 블로킹이라 스레드에서
+        "response_cache": await asyncio.to_thread(get_response_cache_stats),
+        "answer_cache": get_answer_cache_stats(),
+        "single_flight": {
+            "chat": chat.recommendation_flight.stats,
+            "recommendations": recommendations.recommendation_flight.stats
+        }
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # Prometheus 텍스트 형식 (워커 프로세스별 값)
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,143 @@
+# backend/app/prompt_builder.py
+# 채팅 LLM 프롬프트 조립 - 시스템 프롬프트는 요청마다 바이트 단위로 같은 첫 메시지로 두어
+# 제공자 쪽 접두부 캐시가 적용되게 하고, 요청마다 달라지는 직전 추천 와인 정보는 별도 메시지로 붙인다.
+# 토큰 수는 로컬에서 세고, 와인 정보가 예산을 넘으면 요약 형식으로 줄인 뒤 그래도 넘치는 와인은 뺀다.
+import logging
+import time
+from app.telemetry import PROMPT_TOKENS
+
+logger = logging.getLogger(__name__)
+
+# 채팅 형식에서 메시지마다 붙는 토큰과 답변 시작 토큰 (OpenAI 채팅 모델 기준)
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+# 요약 형식에서 음식 페어링 최대 글자 수
+COMPACT_FOOD_CHARS = 40
+
+CONTEXT_HEADER = "직전에 추천한 와인 정보:\n"
+CONTEXT_FOOTER = (
+    "\n\n사용자의 질문이 이전에 추천한 와인에 대한 것이라면, "
+    "해당 와인의 특성을 고려하여 구체적으로 답변해주세요."
+)
+
+class TokenCounter:
+    # 인코딩이 없으면(로드 전, tiktoken 미설치, 인코딩 파일을 못 받은 경우 등) 근사치로 센다
+    def __init__(self, encoding=None):
+        self._encoding = encoding
+
+    @classmethod
+    def for_model(cls, model):
+        # 처음 실행하면 BPE 파일을 내려받을 수 있어 요청 경로가 아닌 곳에서만 호출한다
+        try:
+            import tiktoken
+
+            return cls(tiktoken.encoding_for_model(model))
+        except Exception as e:
+            logger.warning(f"tiktoken encoding unavailable for {model}, estimating token counts: {e}")
+            return cls()
+
+    @property
+    def exact(self):
+        return self._encoding is not None
+
+    def count(self, text):
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        # 근사: ASCII는 4글자에 1토큰, 한글 등 나머지 글자는 글자당 1토큰
+        ascii_chars = len(text.encode("ascii", "ignore"))
+        return (ascii_chars + 3) // 4 + len(text) - ascii_chars
+
+def full_wine_context(wine):
+    return (
+        f"와인 이름: {wine.get('name_ko')}\n"
+        f"특징:\n"
+        f"- 당도: {wine.get('sweetness')}/5\n"
+        f"- 산도: {wine.get('acidity')}/5\n"
+        f"- 바디: {wine.get('body')}/5\n"
+        f"- 타닌: {wine.get('tannin')}/5\n"
+        f"음식 페어링: {wine.get('food_matching')}"
+    )
+
+def _one_line(value):
+    return " ".join(str(value or "").split())
+
+def compact_wine_context(wine):
+    food = _one_line(wine.get("food_matching"))
+    if len(food) > COMPACT_FOOD_CHARS:
+        food = food[:COMPACT_FOOD_CHARS] + "…"
+    return (
+        f"- {_one_line(wine.get('name_ko'))} (당도 {wine.get('sweetness')}, 산도 {wine.get('acidity')}, "
+        f"바디 {wine.get('body')}, 타닌 {wine.get('tannin')} /5) 페어링: {food}"
+    )
+
+class PromptBuilder:
+    def __init__(self, system_prompt, model, max_tokens):
+        self.system_prompt = system_prompt
+        self.model = model
+        self.max_tokens = max_tokens
+        # (토큰 계산기, 시스템 프롬프트 토큰 수) - load() 전에는 근사치로 센다
+        self._state = self._make_state(TokenCounter())
+
+    def _make_state(self, counter):
+        return counter, counter.count(self.system_prompt) + MESSAGE_OVERHEAD_TOKENS
+
+    def load(self):
+        # warm_up에서 스레드로 호출 - 인코딩을 불러온 뒤 계산기와 시스템 프롬프트 토큰 수를 함께 교체
+        self._state = self._make_state(TokenCounter.for_model(self.model))
+        return self._state[0].exact
+
+    @staticmethod
+    def _fit_wines(counter, wines, budget):
+        # 예산 안에 들어가는 만큼만 형식을 만들어 보므로 와인 목록이 길어도 비용은 예산에 비례한다
+        fixed = counter.count(CONTEXT_HEADER + CONTEXT_FOOTER) + MESSAGE_OVERHEAD_TOKENS
+        for compacted, formatter, separator in (
+            (False, full_wine_context, "\n\n"),
+            (True, compact_wine_context, "\n"),
+        ):
+            separator_tokens = counter.count(separator)
+            entries = []
+            used = fixed
+            for wine in wines:
+                entry = formatter(wine)
+                tokens = counter.count(entry) + (separator_tokens if entries else 0)
+                if used + tokens > budget:
+                    break
+                entries.append(entry)
+                used += tokens
+            if len(entries) == len(wines) or compacted:
+                if not entries:
+                    return None, 0, compacted
+                return CONTEXT_HEADER + separator.join(entries) + CONTEXT_FOOTER, len(entries), compacted
+
+    def build(self, message, wines=None):
+        # 반환: (메시지 목록, 보고용 수치)
+        from langchain_core.messages import SystemMessage, HumanMessage
+
+        start = time.perf_counter()
+        counter, system_tokens = self._state
+        message_tokens = counter.count(message) + MESSAGE_OVERHEAD_TOKENS
+        budget = self.max_tokens - system_tokens - message_tokens - REPLY_PRIMING_TOKENS
+
+        messages = [SystemMessage(content=self.system_prompt)]
+        context, included, compacted = None, 0, False
+        if wines:
+            context, included, compacted = self._fit_wines(counter, wines, budget)
+        context_tokens = 0
+        if context is not None:
+            context_tokens = counter.count(context) + MESSAGE_OVERHEAD_TOKENS
+            messages.append(SystemMessage(content=context))
+        messages.append(HumanMessage(content=message))
+
+        prompt_tokens = system_tokens + context_tokens + message_tokens + REPLY_PRIMING_TOKENS
+        PROMPT_TOKENS.observe(prompt_tokens, model=self.model)
+        return messages, {
+            "prompt_tokens": prompt_tokens,
+            "system_tokens": system_tokens,
+            "context_tokens": context_tokens,
+            "message_tokens": message_tokens,
+            "wines": len(wines or ()),
+            "wines_in_context": included,
+            "compacted": compacted,
+            "exact_count": counter.exact,
+            "build_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
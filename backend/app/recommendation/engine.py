@@ -1,72 +1,176 @@
-from sklearn.metrics.pairwise import cosine_similarity
+# backend/app/recommendation/engine.py
+# 취향 프로필 점수 추천 - 당도/산도/바디/타닌/가격 거리에 선호 음식 가산점을 더해 카탈로그 전체를 한 번에 채점한다.
+# 선호 음식/기피 특성까지 반영하는 유일한 추천 경로로 /recommendations/profile 에서 쓴다.
+import logging
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
 import numpy as np
+from app.catalog import get_wine_catalog
 from app.models.user_preferences import TasteProfile
 
+logger = logging.getLogger(__name__)
+
 class WineRecommender:
-    def __init__(self, wine_data):
-        self.wine_data = wine_data
-        
+    # 특성별 가중치 설정 (가격은 상대적으로 낮은 가중치)
+    FEATURE_WEIGHTS = np.array([1.0, 1.0, 1.0, 1.0, 0.5], dtype=np.float32)
+    # 특성별 값 범위 (당도/산도/바디/타닌 1-5, 가격은 0-1로 정규화)
+    FEATURE_RANGES = np.array([4.0, 4.0, 4.0, 4.0, 1.0], dtype=np.float32)
+    FOOD_BONUS = 0.1
+    # 배치 점수 계산 시 한 번에 처리할 프로필 수 (프로필 x 와인 x 특성 메모리 제한)
+    BATCH_CHUNK_SIZE = 256
+    # 용어별 부분 문자열 마스크 캐시 크기 (용어는 사용자 입력이라 최근 것만 남긴다)
+    TERM_MASK_CACHE_SIZE = 1024
+
+    def __init__(self, wine_data, version=None):
+        self.wine_data = list(wine_data)
+        self.version = version
+        self.max_price = max((w.price or 0 for w in self.wine_data), default=0) or 1
+
+        # 와인 특성은 한 번만 float32 행렬로 만들어 둔다
+        self.features = np.array(
+            [self.create_wine_vector(wine) for wine in self.wine_data],
+            dtype=np.float32
+        ).reshape(len(self.wine_data), len(self.FEATURE_WEIGHTS))
+        self.prices = np.array([w.price or 0 for w in self.wine_data], dtype=np.float32)
+        self.wine_types = np.array([w.wine_type for w in self.wine_data], dtype=object)
+        self.food_matching = np.array(
+            [self._as_text(getattr(w, "food_matching", "")) for w in self.wine_data],
+            dtype=str
+        )
+        self.characteristics = np.array(
+            [self._as_text(getattr(w, "characteristics", "")) for w in self.wine_data],
+            dtype=str
+        )
+        self._type_masks = {t: self.wine_types == t for t in set(self.wine_types)}
+        self._term_masks = OrderedDict()
+        self._term_masks_lock = threading.Lock()
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        # 카탈로그 행 순서 그대로 - 결과 행 번호를 catalog.fragments_of에 바로 넘길 수 있다
+        # 카탈로그에는 characteristics가 없으므로 기피 특성은 향(aroma)에서 찾는다
+        return cls(
+            (SimpleNamespace(**record, characteristics=record.get("aroma")) for record in catalog.records),
+            version=catalog.version
+        )
+
+    @staticmethod
+    def _as_text(value):
+        if isinstance(value, (list, tuple, set)):
+            return "\n".join(str(v) for v in value)
+        return value or ""
+
     def create_wine_vector(self, wine):
         return np.array([
             wine.sweetness,
             wine.acidity,
             wine.body,
             wine.tannin,
-            wine.price / 1000000  # 정규화
+            (wine.price or 0) / self.max_price  # 정규화
         ])
-    
-    def get_recommendations(self, taste_profile: TasteProfile, n_recommendations=2):
-        # 특성별 가중치 설정
-        weights = {
-            'sweetness': 1.0,
-            'acidity': 1.0,
-            'body': 1.0,
-            'tannin': 1.0,
-            'price': 0.5  # 가격은 상대적으로 낮은 가중치
-        }
-        
-        # 사용자 벡터 생성
-        user_vector = np.array([
+
+    def create_user_vector(self, taste_profile: TasteProfile):
+        return np.array([
             taste_profile.preferred_sweetness or 3,
             taste_profile.preferred_acidity or 3,
             taste_profile.preferred_body or 3,
             taste_profile.preferred_tannin or 3,
-            (sum(taste_profile.price_range) / 2) / max(w.price for w in self.wine_data)  # 상대적 가격 정규화
-        ])
-        
-        similarities = []
-        for wine in self.wine_data:
-            # 기본 필터링
-            if wine.wine_type not in taste_profile.preferred_types:
-                continue
-            if wine.price < taste_profile.price_range[0] or wine.price > taste_profile.price_range[1]:
-                continue
-                
-            # 기피 특성 확인
-            if any(char in wine.characteristics for char in taste_profile.disliked_characteristics):
-                continue
-                
-            # 음식 페어링 보너스
-            food_bonus = 0.1 if any(food in wine.food_matching for food in taste_profile.preferred_foods) else 0
-            
-            # 와인 벡터 생성
-            wine_vector = self.create_wine_vector(wine)
-            
-            # 가중치가 적용된 유사도 계산
-            weighted_similarity = sum(
-                w * cosine_similarity(
-                    user_vector[i].reshape(1, -1), 
-                    wine_vector[i].reshape(1, -1)
-                )[0][0] 
-                for i, w in enumerate(weights.values())
-            ) / sum(weights.values())
-            
-            # 음식 페어링 보너스 적용
-            final_score = weighted_similarity * (1 + food_bonus)
-            
-            similarities.append((wine, final_score))
-        
-        # 점수 기준으로 정렬
-        recommendations = sorted(similarities, key=lambda x: x[1], reverse=True)
-        
-        return recommendations[:n_recommendations] 
\ No newline at end of file
+            (sum(taste_profile.price_range) / 2) / self.max_price  # 상대적 가격 정규화
+        ], dtype=np.float32)
+
+    @staticmethod
+    def _clean_terms(terms):
+        # 빈 문자열/공백은 모든 와인에 걸리므로 버린다
+        return list(dict.fromkeys(term.strip() for term in terms or () if term and term.strip()))
+
+    def _term_mask(self, column, term):
+        # 음식/기피 특성 부분 문자열 검색 결과는 용어별로 캐시 (오래 안 쓴 용어부터 밀어낸다)
+        key = (column, term)
+        with self._term_masks_lock:
+            mask = self._term_masks.get(key)
+            if mask is not None:
+                self._term_masks.move_to_end(key)
+                return mask
+        values = getattr(self, column)
+        mask = np.char.find(values, term) >= 0 if values.size else np.zeros(0, dtype=bool)
+        with self._term_masks_lock:
+            self._term_masks[key] = mask
+            while len(self._term_masks) > self.TERM_MASK_CACHE_SIZE:
+                self._term_masks.popitem(last=False)
+        return mask
+
+    def _any_term_mask(self, column, terms):
+        mask = np.zeros(len(self.wine_data), dtype=bool)
+        for term in self._clean_terms(terms):
+            mask |= self._term_mask(column, term)
+        return mask
+
+    def candidate_mask(self, taste_profile: TasteProfile):
+        # 기본 필터링: 종류, 가격, 기피 특성
+        mask = np.zeros(len(self.wine_data), dtype=bool)
+        for wine_type in taste_profile.preferred_types:
+            if wine_type in self._type_masks:
+                mask |= self._type_masks[wine_type]
+        min_price, max_price = taste_profile.price_range
+        mask &= (self.prices >= min_price) & (self.prices <= max_price)
+        mask &= ~self._any_term_mask("characteristics", taste_profile.disliked_characteristics)
+        return mask
+
+    def _score(self, user_vectors, masks, food_masks):
+        # (프로필, 와인) 점수를 한 번의 배열 연산으로 계산
+        distance = np.abs(user_vectors[:, None, :] - self.features[None, :, :]) / self.FEATURE_RANGES
+        similarity = np.clip(1.0 - distance, 0.0, 1.0)
+        weighted = similarity @ self.FEATURE_WEIGHTS / self.FEATURE_WEIGHTS.sum()
+        scores = weighted * (1.0 + self.FOOD_BONUS * food_masks)
+        return np.where(masks, scores, -np.inf)
+
+    def _top_k(self, scores, n_recommendations):
+        valid = int(np.isfinite(scores).sum())
+        k = min(n_recommendations, valid)
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def get_recommendations(self, taste_profile: TasteProfile, n_recommendations=2):
+        return self.get_batch_recommendations([taste_profile], n_recommendations)[0]
+
+    def get_batch_recommendations(self, taste_profiles, n_recommendations=2):
+        return [
+            [(self.wine_data[i], score) for i, score in rows]
+            for rows in self.get_batch_recommendation_rows(taste_profiles, n_recommendations)
+        ]
+
+    def get_batch_recommendation_rows(self, taste_profiles, n_recommendations=2):
+        # 여러 취향 프로필을 청크 단위로 한꺼번에 점수 계산 - 프로필마다 (행 번호, 점수) 목록
+        taste_profiles = list(taste_profiles)
+        results = []
+        for start in range(0, len(taste_profiles), self.BATCH_CHUNK_SIZE):
+            chunk = taste_profiles[start:start + self.BATCH_CHUNK_SIZE]
+            user_vectors = np.stack([self.create_user_vector(p) for p in chunk])
+            masks = np.stack([self.candidate_mask(p) for p in chunk])
+            food_masks = np.stack([
+                self._any_term_mask("food_matching", p.preferred_foods) for p in chunk
+            ]).astype(np.float32)
+
+            scores = self._score(user_vectors, masks, food_masks)
+            results.extend(self._top_k(row, n_recommendations) for row in scores)
+        return results
+
+_wine_recommender = None
+_wine_recommender_lock = threading.Lock()
+
+def get_wine_recommender():
+    # 카탈로그가 다시 로드되면 특성 행렬도 새로 만든다 (동시에 호출돼도 한 번만)
+    global _wine_recommender
+    catalog = get_wine_catalog()
+    recommender = _wine_recommender
+    if recommender is not None and recommender.version == catalog.version:
+        return recommender
+    with _wine_recommender_lock:
+        if _wine_recommender is None or _wine_recommender.version != catalog.version:
+            _wine_recommender = WineRecommender.from_catalog(catalog)
+            logger.info(f"Built taste profile recommender over {len(_wine_recommender.wine_data)} wines")
+        return _wine_recommender
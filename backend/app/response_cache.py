@@ -0,0 +1,161 @@
+# backend/app/response_cache.py
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from app.config import get_settings
+from app.retrieval import run_blocking
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent / "data" / "response_cache.sqlite3"
+
+def make_cache_key(namespace, message, taste_profile, index_version):
+    # 공백/대소문자 차이는 같은 요청으로 취급하고, 인덱스 버전이 바뀌면 키도 바뀐다
+    normalized = re.sub(r"\s+", " ", message).strip().lower()
+    payload = json.dumps(
+        [namespace, normalized, taste_profile or {}, index_version],
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class MemoryBackend:
+    # 딕셔너리 연산뿐이라 이벤트 루프에서 바로 호출한다
+    blocking = False
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class SqliteBackend:
+    # 같은 호스트의 여러 uvicorn 워커가 공유하는 캐시 (조회/커밋이 블로킹이라 async 경로에서는 스레드에서 호출)
+    blocking = True
+
+    def __init__(self, max_entries, db_path):
+        self.max_entries = max_entries
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key, now):
+        row = self._conn.execute(
+            "SELECT value FROM responses WHERE key = ? AND expires_at >= ?", (key, now)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, expires_at):
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, expires_at, stored_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), expires_at, now)
+        )
+        # 만료 항목과 최대 개수를 넘는 오래된 항목 정리
+        self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+            "ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        self._conn.commit()
+
+    def clear(self):
+        self._conn.execute("DELETE FROM responses")
+        self._conn.commit()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+class ResponseCache:
+    def __init__(self, backend, ttl_seconds):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0}
+
+    def get(self, key):
+        with self._lock:
+            value = self.backend.get(key, time.time())
+            self.stats["hits" if value is not None else "misses"] += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self.backend.set(key, value, time.time() + self.ttl_seconds)
+            self.stats["stores"] += 1
+
+    async def aget(self, key):
+        if self.backend.blocking:
+            return await run_blocking(self.get, key)
+        return self.get(key)
+
+    async def aset(self, key, value):
+        if self.backend.blocking:
+            return await run_blocking(self.set, key, value)
+        return self.set(key, value)
+
+    def clear(self):
+        with self._lock:
+            self.backend.clear()
+
+    def get_stats(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": self.stats["hits"] / lookups if lookups else None,
+            "entries": len(self.backend),
+            "backend": type(self.backend).__name__,
+        }
+
+_response_cache = None
+
+def get_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        if settings.response_cache_backend == "sqlite":
+            backend = SqliteBackend(
+                settings.response_cache_max_entries,
+                settings.response_cache_path or DEFAULT_CACHE_PATH
+            )
+        else:
+            backend = MemoryBackend(settings.response_cache_max_entries)
+        _response_cache = ResponseCache(backend, settings.response_cache_ttl_seconds)
+    return _response_cache
+
+def get_response_cache_stats():
+    return _response_cache.get_stats() if _response_cache is not None else None
@@ -0,0 +1,165 @@
+# backend/app/retrieval.py
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from app.config import get_settings
+from app.telemetry import span
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 동기 Chroma 쿼리는 전용 스레드 풀에서만 실행해 이벤트 루프를 막지 않는다
+_executor = None
+_semaphore = asyncio.Semaphore(settings.retrieval_max_concurrency)
+
+class ClientDisconnectedError(Exception):
+    pass
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.retrieval_max_concurrency,
+            thread_name_prefix="retrieval"
+        )
+    return _executor
+
+async def run_blocking(func, *args, **kwargs):
+    # 동시 실행 수를 제한하고, 대기 중 취소되면 작업을 시작하지 않는다
+    async with _semaphore:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), partial(func, *args, **kwargs))
+
+async def similarity_search(vector_store, query, k=4, filter=None):
+    # 임베딩은 네이티브 async HTTP 호출, 벡터 검색은 제한된 스레드 풀에서 수행
+    with span("embed_query"):
+        embedding = await vector_store.embeddings.aembed_query(query)
+    with span("chroma_search"):
+        return await run_blocking(
+            vector_store.similarity_search_by_vector,
+            embedding,
+            k=k,
+            filter=filter
+        )
+
+# 어떤 문서와도 맞지 않는 조건 (Chroma는 빈 $in 목록을 받지 않으므로 없는 wine_id로 표현)
+NO_MATCH_FILTER = {"wine_id": {"$in": [""]}}
+
+def build_metadata_filter(wine_types=None, price_range=None):
+    # 취향 조건을 Chroma where 조건으로 변환 - 검색 안에서 필터링된다
+    # wine_types가 빈 목록이면(일치하는 종류 없음) 조건 없음이 아니라 결과 없음
+    if wine_types is not None and not wine_types:
+        return NO_MATCH_FILTER
+    conditions = []
+    if wine_types is not None:
+        conditions.append({"wine_type": {"$in": list(wine_types)}})
+    if price_range is not None:
+        min_price, max_price = price_range
+        conditions.append({"price": {"$gte": min_price}})
+        conditions.append({"price": {"$lte": max_price}})
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+async def filtered_similarity_search(
+    vector_store, query, k, filter=None, candidate_count=None, unique_key="name_ko", embedding=None
+):
+    # 조건에 맞는 문서만 검색하므로 over-fetch는 중복 제거분만큼만 필요하다.
+    # 중복 제거 후 k개가 안 되면 같은 임베딩으로 fetch_k를 늘려, 요청보다 적은 문서가 나올 때까지 다시 검색
+    # (candidate_count는 중복 제거된 카탈로그 기준이라 0인지 확인하는 데만 쓴다 - 스토어에는 와인당 문서가 여럿일 수 있다)
+    # (embedding을 넘기면 query는 임베딩하지 않는다)
+    if candidate_count == 0 or filter == NO_MATCH_FILTER:
+        return []
+
+    if embedding is None:
+        with span("embed_query"):
+            embedding = await vector_store.embeddings.aembed_query(query)
+    fetch_k = k * settings.retrieval_overfetch_factor
+    while True:
+        with span("chroma_search"):
+            docs = await run_blocking(
+                vector_store.similarity_search_by_vector,
+                embedding,
+                k=fetch_k,
+                filter=filter
+            )
+
+        with span("dedupe"):
+            unique_docs = []
+            seen = set()
+            for doc in docs:
+                key = doc.metadata.get(unique_key)
+                if key and key not in seen:
+                    seen.add(key)
+                    unique_docs.append(doc)
+
+        if len(unique_docs) >= k or len(docs) < fetch_k:
+            return unique_docs[:k]
+        fetch_k *= 2
+
+async def matrix_similarity_search(matrix, catalog, query, k, mask=None, embedding=None):
+    # 공유 임베딩 행렬에서 내적 검색 - Chroma 대신 카탈로그 행 번호를 반환
+    from app.embedding_cache import get_embeddings
+
+    if mask is not None and not mask.any():
+        return []
+    if embedding is None:
+        with span("embed_query"):
+            embedding = await get_embeddings().aembed_query(query)
+    with span("matrix_search"):
+        return await run_blocking(matrix.search, embedding, k, catalog, mask)
+
+async def cancel_on_disconnect(request, coro):
+    # 클라이언트가 연결을 끊으면 진행 중인 검색을 취소 (request가 None이면 그냥 기다린다)
+    if request is None:
+        return await coro
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.disconnect_poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info("Client disconnected, cancelling retrieval")
+                task.cancel()
+                raise ClientDisconnectedError()
+    finally:
+        if not task.done():
+            task.cancel()
+
+class SingleFlight:
+    # 같은 키로 동시에 들어온 요청은 먼저 시작된 계산 하나의 결과를 함께 기다린다.
+    # 기다리던 요청 하나가 취소돼도(연결 끊김) 공유 계산은 계속 진행된다.
+    def __init__(self):
+        self._inflight = {}
+        self.stats = {"leaders": 0, "followers": 0}
+
+    async def run(self, key, factory):
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["followers"] += 1
+        return await asyncio.shield(future)
+
+    def _finish(self, key, future):
+        self._inflight.pop(key, None)
+        # 기다리던 요청이 모두 끊기면 아무도 결과를 꺼내지 않으므로 예외는 여기서 꺼내 기록한다
+        # (꺼내지 않으면 asyncio가 "Future exception was never retrieved"를 남긴다)
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"Shared computation for {key!r} failed: {future.exception()!r}")
+
+    def __len__(self):
+        return len(self._inflight)
+
+def shutdown_retrieval():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -1,16 +1,39 @@
 # backend/app/routers/chat.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from langchain_openai import ChatOpenAI
-from langchain.schema import SystemMessage, HumanMessage
-import json
 import logging
+import re
 from app.vector_store import get_vector_store
+from app.retrieval import (
+    filtered_similarity_search,
+    matrix_similarity_search,
+    build_metadata_filter,
+    cancel_on_disconnect,
+    ClientDisconnectedError,
+    SingleFlight,
+)
+from app.catalog import get_wine_catalog
+from app.facet_index import get_facet_index
+from app.embedding_matrix import get_embedding_matrix
 import traceback
 from app.config import get_settings
+from app.response_cache import get_response_cache, make_cache_key
+from app.indexing import get_index_version
+from app.llm import get_chat_model, CHAT_MODEL
+from app.answer_cache import get_answer_cache, prompt_key
+from app.prompt_builder import PromptBuilder
+from app.user_profiles import get_user_profile, personalize_query
+from app.telemetry import span, log_event
+from app.serialization import FragmentJSONResponse, encode
+
+settings = get_settings()
 
 logger = logging.getLogger(__name__)
 
+# 캐시에 아직 없는 같은 추천 요청이 동시에 들어오면 검색은 한 번만 실행
+recommendation_flight = SingleFlight()
+
 SYSTEM_TEMPLATE = """당신은 와인 전문가입니다. 다음과 같은 역할을 수행할 수 있습니다:
 
 1. 와인 추천: 사용자가 와인 추천을 요청하면 구체적인 와인을 추천해주세요.
@@ -25,195 +48,278 @@ class ChatRequest(BaseModel):
     message: str
     taste_profile: dict | None = None
     last_recommendations: list | None = None  # 마지막 추천 와인 목록 추가
+    user_id: str | None = None  # 저장된 사용자 프로필 (taste_profile이 없으면 프로필의 취향 사용)
 
 class ChatResponse(BaseModel):
-    response: str
+    response: dict
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
-def process_wine_data(docs):
-    wines = []
-    for doc in docs:
-        try:
-            wine = {
-                "name_ko": doc.metadata.get("name_ko", ""),
-                "name_en": doc.metadata.get("name_en", ""),
-                "wine_type": doc.metadata.get("wine_type", ""),
-                "winery": doc.metadata.get("winery", ""),
-                "country": doc.metadata.get("country", ""),
-                "region": doc.metadata.get("region", ""),
-                "price": doc.metadata.get("price"),
-                "sweetness": int(doc.metadata.get("sweetness", 1)),
-                "acidity": int(doc.metadata.get("acidity", 1)),
-                "body": int(doc.metadata.get("body", 1)),
-                "tannin": int(doc.metadata.get("tannin", 1)),
-                "aroma": doc.metadata.get("aroma", ""),
-                "food_matching": doc.metadata.get("food_matching", ""),
-                "image_url": doc.metadata.get("image_url", ""),
-                "detail_url": doc.metadata.get("detail_url", "")
-            }
-            wines.append(wine)
-            logger.info(f"Processed wine: {wine['name_ko']}")
-        except Exception as e:
-            logger.error(f"Error processing wine: {e}")
-    return wines
+async def find_recommended_wines(request: ChatRequest, http_request: Request, taste_profile=None, user_profile=None):
+    # 추천 와인의 카탈로그 행 번호 목록
+    catalog = get_wine_catalog()
+
+    # 저장된 선호 벡터가 있으면 메시지 임베딩에 더하기만 하고,
+    # 없으면 취향 프로필을 검색 쿼리 문장에 추가
+    search_query = request.message
+    personalized = user_profile is not None and user_profile["preference_vector"] is not None
+    if taste_profile and not personalized:
+        min_price, max_price = taste_profile.get('price_range', (0, 1000000))
+        search_query += f"""
+        당도: {taste_profile.get('preferred_sweetness', 3)}
+        산도: {taste_profile.get('preferred_acidity', 3)}
+        바디: {taste_profile.get('preferred_body', 3)}
+        타닌: {taste_profile.get('preferred_tannin', 3)}
+        선호 종류: {', '.join(taste_profile.get('preferred_types', []))}
+        가격대: {min_price}원 ~ {max_price}원
+        """
+
+    # 취향 조건(종류, 가격 ±20%)은 검색 안에서 메타데이터 조건으로 적용
+    wine_types = None
+    price_range = None
+    if taste_profile and taste_profile.get('preferred_types'):
+        wine_types = catalog.match_wine_types(taste_profile['preferred_types'])
+    if taste_profile and 'price_range' in taste_profile:
+        min_price, max_price = taste_profile['price_range']
+        price_range = (min_price * 0.8, max_price * 1.2)
+
+    # 음식 페어링/국가/지역이 메시지에 있으면 패싯 색인에서 바로 후보를 골라 임베딩 호출 생략
+    # (패싯 값 외의 조건이 메시지에 있거나 저장된 선호 벡터가 있으면 의미 검색으로 간다)
+    facets = get_facet_index()
+    with span("facet_extract"):
+        facet_filters = facets.extract(request.message)
+        facet_only = bool(facet_filters) and is_facet_only_query(facets.strip_values(request.message))
+    if facet_only and not personalized:
+        profile = taste_profile or {}
+        with span("facet_search"):
+            rows = catalog.nearest_rows(
+                (
+                    profile.get('preferred_sweetness') or 3,
+                    profile.get('preferred_acidity') or 3,
+                    profile.get('preferred_body') or 3,
+                    profile.get('preferred_tannin') or 3,
+                ),
+                wine_types=wine_types,
+                price_range=price_range,
+                k=2,  # 최대 2개 추천
+                mask=facets.mask(facets.select(facet_filters)),
+                boost=facets.match_count(facet_filters)
+            )
+        if rows:
+            log_event(logger, "facet_recommendation", filters=facet_filters, found=len(rows))
+            return rows
+
+    # 조건에 맞는 와인 수를 먼저 세어 없으면 임베딩 호출 없이 종료
+    candidate_count = catalog.count(wine_types, price_range) if wine_types is not None or price_range else None
+
+    # 공유 임베딩 행렬이 있으면 Chroma를 열지 않고 카탈로그 조건 마스크로 바로 검색
+    embedding = None
+    if personalized:
+        from app.embedding_cache import get_embeddings
+
+        with span("embed_query"):
+            embedding = personalize_query(await get_embeddings().aembed_query(search_query), user_profile)
+
+    matrix = get_embedding_matrix()
+    if matrix is not None:
+        rows = await cancel_on_disconnect(
+            http_request,
+            matrix_similarity_search(
+                matrix,
+                catalog,
+                search_query,
+                k=2,  # 최대 2개 추천
+                mask=catalog.filter_mask(wine_types, price_range),
+                embedding=embedding
+            )
+        )
+        log_event(logger, "matrix_recommendation", query=search_query, found=len(rows), candidates=candidate_count)
+        return rows
+
+    with span("vector_store"):
+        vector_store = await get_vector_store()
+    unique_docs = await cancel_on_disconnect(
+        http_request,
+        filtered_similarity_search(
+            vector_store,
+            search_query,
+            k=2,  # 최대 2개 추천
+            filter=build_metadata_filter(wine_types, catalog.effective_price_range(price_range)),
+            candidate_count=candidate_count,
+            embedding=embedding
+        )
+    )
+
+    rows = catalog.rows_of(unique_docs)
+    log_event(logger, "vector_recommendation", query=search_query, found=len(rows), candidates=candidate_count)
+    return rows
+
+# 추천 관련 키워드
+RECOMMENDATION_KEYWORDS = ["추천", "찾아", "알려줘", "뭐가 좋을까", "어떤 와인"]
+
+def is_recommendation_request(message):
+    return any(keyword in message for keyword in RECOMMENDATION_KEYWORDS)
+
+# 패싯 값을 지운 메시지에 이런 요청 표현/조사만 남으면 패싯 값이 조건의 전부 (긴 표현부터 비교)
+FACET_QUERY_FILLER = re.compile(
+    r"추천해\s*주세요|추천해\s*줘|추천|찾아\s*줘|알려\s*줘|어울리는|어울릴|어울려|잘\s*맞는|맞는|"
+    r"좋은|좋을까|먹을|마실|같이|함께|뭐가|어떤|와인|wine|이랑|랑|하고|과|와|에|의|좀|[^\w]"
+)
+
+def is_facet_only_query(stripped_message):
+    return not FACET_QUERY_FILLER.sub("", stripped_message)
+
+async def build_recommendation_response(request: ChatRequest, http_request: Request):
+    # user_id가 있으면 저장된 프로필을 읽기만 한다 (요청에 취향 프로필이 있으면 그쪽이 우선)
+    user_profile = await get_user_profile(request.user_id) if request.user_id else None
+    taste_profile = request.taste_profile or (user_profile["taste_profile"] if user_profile else None)
+    cache_profile = taste_profile
+    if user_profile is not None:
+        cache_profile = {
+            "taste_profile": taste_profile,
+            "user_id": request.user_id,
+            "updated_at": user_profile["updated_at"]
+        }
+
+    # 같은 메시지 + 취향 프로필이면 결과가 같으므로 캐시에서 바로 응답
+    # (캐시에는 wine_id만 저장하고 응답은 카탈로그의 JSON 조각으로 만든다)
+    catalog = get_wine_catalog()
+    cache = get_response_cache() if settings.response_cache_enabled else None
+    cache_key = make_cache_key("chat_wine_ids", request.message, cache_profile, get_index_version())
+    with span("response_cache"):
+        wine_ids = await cache.aget(cache_key) if cache else None
+    if wine_ids is None:
+        # 공유 계산에는 요청 객체를 넘기지 않고, 연결 끊김은 기다리는 요청마다 따로 처리
+        rows = await cancel_on_disconnect(
+            http_request,
+            recommendation_flight.run(
+                cache_key,
+                lambda: find_recommended_wines(request, None, taste_profile, user_profile)
+            )
+        )
+        if cache:
+            await cache.aset(cache_key, catalog.wine_ids(rows))
+    else:
+        rows = catalog.rows_of_wine_ids(wine_ids)
+    
+    if not rows:
+        return {
+            "type": "text",
+            "text": "죄송합니다. 조건에 맞는 와인을 찾지 못했습니다."
+        }
+    
+    # 특성 분석
+    avg_sweetness, avg_acidity, avg_body, avg_tannin = catalog.taste[rows].mean(axis=0).tolist()
+    
+    characteristics = {
+        "당도": f"{'높음' if avg_sweetness > 3 else '중간' if avg_sweetness > 2 else '낮음'} (평균 {avg_sweetness:.1f}/5)",
+        "산도": f"{'높음' if avg_acidity > 3 else '중간' if avg_acidity > 2 else '낮음'} (평균 {avg_acidity:.1f}/5)",
+        "바디": f"{'무거움' if avg_body > 3 else '중간' if avg_body > 2 else '가벼움'} (평균 {avg_body:.1f}/5)",
+        "타닌": f"{'강함' if avg_tannin > 3 else '중간' if avg_tannin > 2 else '약함'} (균 {avg_tannin:.1f}/5)"
+    }
+    
+    # 취향 프로필 기반 응답 메시지 생성 (저장된 프로필에서 설정하지 않은 항목은 문장에서 뺀다)
+    taste_labels = [
+        f"{label}: {taste_profile[key]}/5"
+        for label, key in (
+            ("당도", "preferred_sweetness"),
+            ("산도", "preferred_acidity"),
+            ("바디", "preferred_body"),
+            ("타닌", "preferred_tannin"),
+        )
+        if taste_profile and taste_profile.get(key) is not None
+    ]
+    if taste_labels:
+        response_text = f"고객님의 취향 프로필({', '.join(taste_labels)})을 반영하여 "
+        response_text += f"'{request.message}'에 맞는 와인을 추천해드립니다."
+    else:
+        response_text = f"'{request.message}'에 맞는 와인을 추천해드립니다."
+    
+    return {
+        "type": "recommendation",
+        "text": response_text,
+        "characteristics": characteristics,
+        "wines": catalog.fragments_of(rows)
+    }
+
+# 시스템 프롬프트는 매 요청 같은 첫 메시지로 두고, 직전 추천 와인 정보는 토큰 예산 안에서 별도 메시지로 붙인다
+prompt_builder = PromptBuilder(SYSTEM_TEMPLATE, CHAT_MODEL, settings.chat_prompt_max_tokens)
+
+def build_chat_messages(request: ChatRequest):
+    with span("prompt_build"):
+        messages, report = prompt_builder.build(request.message, request.last_recommendations)
+    log_event(logger, "prompt_built", **report)
+    return messages
+
+async def lookup_cached_answer(request: ChatRequest):
+    # 반환: (질문 임베딩, (저장된 답, 유사도) 또는 None)
+    # 직전 추천 와인을 참고하는 질문은 같은 문장이라도 답이 달라지므로 캐시를 쓰지 않는다
+    if not settings.answer_cache_enabled or request.last_recommendations:
+        return None, None
+    from app.embedding_cache import get_embeddings
+
+    try:
+        with span("embed_query"):
+            embeddings = get_embeddings()
+            embedding = await embeddings.aembed_query(request.message)
+    except Exception as e:
+        # 임베딩 실패로 답변까지 막지 않는다
+        logger.warning(f"Answer cache lookup skipped: {e}")
+        return None, None
+    with span("answer_cache"):
+        key = prompt_key(SYSTEM_TEMPLATE, CHAT_MODEL, embeddings.model_name)
+        return embedding, get_answer_cache().get(key, embedding)
+
+def store_cached_answer(request: ChatRequest, embedding, answer):
+    from app.embedding_cache import get_embeddings
+
+    key = prompt_key(SYSTEM_TEMPLATE, CHAT_MODEL, get_embeddings().model_name)
+    get_answer_cache().set(key, embedding, request.message, answer)
+
+MISSING_API_KEY_RESPONSE = {
+    "type": "text",
+    "text": "OpenAI API 키가 설정되지 않았습니다."
+}
+
+def chat_response(data):
+    # 응답 객체를 문자열로 한 번 더 감싸지 않고, 와인 목록은 카탈로그의 JSON 조각을 그대로 이어 붙인다
+    return FragmentJSONResponse({"response": data})
 
 @router.post("/ask", response_model=ChatResponse)
-async def chat_with_wine_expert(request: ChatRequest):
+async def chat_with_wine_expert(request: ChatRequest, http_request: Request):
     try:
-        # 추천 관련 키워드 확인
-        recommendation_keywords = ["추천", "찾아", "알려줘", "뭐가 좋을까", "어떤 와인"]
-        is_recommendation = any(keyword in request.message for keyword in recommendation_keywords)
-        
-        if is_recommendation:
-            vector_store = await get_vector_store()
-            
-            # 취향 프로필이 있는 경우, 검색 쿼리에 취향 정보 추가
-            search_query = request.message
-            if request.taste_profile:
-                min_price, max_price = request.taste_profile.get('price_range', (0, 1000000))
-                search_query += f"""
-                당도: {request.taste_profile.get('preferred_sweetness', 3)}
-                산도: {request.taste_profile.get('preferred_acidity', 3)}
-                바디: {request.taste_profile.get('preferred_body', 3)}
-                타닌: {request.taste_profile.get('preferred_tannin', 3)}
-                선호 종류: {', '.join(request.taste_profile.get('preferred_types', []))}
-                가격대: {min_price}원 ~ {max_price}원
-                """
-            
-            docs = vector_store.similarity_search(search_query, k=10)
-            
-            # 중복 제거 및 취향 필터링
-            unique_docs = []
-            seen_names = set()
-            
-            for doc in docs:
-                name_ko = doc.metadata.get("name_ko", "")
-                
-                # 취향 프로필 기반 필터링
-                if request.taste_profile and request.taste_profile.get('preferred_types'):
-                    wine_type = doc.metadata.get("wine_type", "")
-                    if not any(pref_type in wine_type for pref_type in request.taste_profile['preferred_types']):
-                        continue
-                
-                if name_ko and name_ko not in seen_names:
-                    # 가격 범위 확인
-                    if request.taste_profile and 'price_range' in request.taste_profile:
-                        price = doc.metadata.get("price", 0)
-                        if price is None:  # None 값 처리
-                            continue
-                        min_price, max_price = request.taste_profile['price_range']
-                        # 가격이 범위를 벗어나면 건너뛰기 (20% 여유 추가)
-                        if not (min_price * 0.8 <= price <= max_price * 1.2):
-                            logger.info(f"Skipping wine {name_ko} due to price: {price} (range: {min_price}-{max_price})")
-                            continue
-                    
-                    seen_names.add(name_ko)
-                    unique_docs.append(doc)
-                    if len(unique_docs) >= 2:  # 최대 2개 추천
-                        break
-            
-            wines = process_wine_data(unique_docs)
-            
-            if not wines:
-                return ChatResponse(response=json.dumps({
-                    "type": "text",
-                    "text": "죄송합니다. 조건에 맞는 와인을 찾지 못했습니다."
-                }, ensure_ascii=False))
-            
-            # 특성 분석
-            avg_sweetness = sum(w["sweetness"] for w in wines) / len(wines)
-            avg_acidity = sum(w["acidity"] for w in wines) / len(wines)
-            avg_body = sum(w["body"] for w in wines) / len(wines)
-            avg_tannin = sum(w["tannin"] for w in wines) / len(wines)
-            
-            characteristics = {
-                "당도": f"{'높음' if avg_sweetness > 3 else '중간' if avg_sweetness > 2 else '낮음'} (평균 {avg_sweetness:.1f}/5)",
-                "산도": f"{'높음' if avg_acidity > 3 else '중간' if avg_acidity > 2 else '낮음'} (평균 {avg_acidity:.1f}/5)",
-                "바디": f"{'무거움' if avg_body > 3 else '중간' if avg_body > 2 else '가벼움'} (평균 {avg_body:.1f}/5)",
-                "타닌": f"{'강함' if avg_tannin > 3 else '중간' if avg_tannin > 2 else '약함'} (균 {avg_tannin:.1f}/5)"
-            }
-            
-            # 취향 프로필 기반 응답 메시지 생성
-            if request.taste_profile:
-                response_text = f"고객님의 취향 프로필(당도: {request.taste_profile.get('preferred_sweetness')}/5, "
-                response_text += f"산도: {request.taste_profile.get('preferred_acidity')}/5, "
-                response_text += f"바디: {request.taste_profile.get('preferred_body')}/5, "
-                response_text += f"타닌: {request.taste_profile.get('preferred_tannin')}/5)을 반영하여 "
-                response_text += f"'{request.message}'에 맞는 와인을 추천해드립니다."
-            else:
-                response_text = f"'{request.message}'에 맞는 와인을 추천해드립니다."
-            
-            response_data = {
-                "type": "recommendation",
-                "text": response_text,
-                "characteristics": characteristics,
-                "wines": wines
-            }
-            
-            logger.info(f"Search query: {search_query}")
-            logger.info(f"Found {len(docs)} initial matches")
-            logger.info(f"Filtered to {len(unique_docs)} unique recommendations")
-            
-            return ChatResponse(response=json.dumps(response_data, ensure_ascii=False))
+        if is_recommendation_request(request.message):
+            response_data = await build_recommendation_response(request, http_request)
+            with span("json_encode"):
+                return chat_response(response_data)
                 
         else:
             # 일반 대화 처리
-            settings = get_settings()
             if not settings.openai_api_key:
                 logger.error("OpenAI API key is missing")
-                return ChatResponse(response=json.dumps({
-                    "type": "text",
-                    "text": "OpenAI API 키가 설정되지 않았습니다."
-                }, ensure_ascii=False))
-
-            logger.info("Initializing ChatOpenAI...")
-            chat = ChatOpenAI(
-                temperature=0.7,
-                openai_api_key=settings.openai_api_key,
-                model="gpt-3.5-turbo"
-            )
-            
-            # 시스템 메시지에 이전 추천 와인 정보 포함
-            system_message = SYSTEM_TEMPLATE
-            if request.last_recommendations:
-                wines_context = []
-                for wine in request.last_recommendations:
-                    wine_context = (
-                        f"와인 이름: {wine['name_ko']}\n"
-                        f"특징:\n"
-                        f"- 당도: {wine['sweetness']}/5\n"
-                        f"- 산도: {wine['acidity']}/5\n"
-                        f"- 바디: {wine['body']}/5\n"
-                        f"- 타닌: {wine['tannin']}/5\n"
-                        f"음식 페어링: {wine['food_matching']}"
-                    )
-                    wines_context.append(wine_context)
-                
-                context = (
-                    "\n\n직전에 추천한 와인 정보:\n"
-                    f"{chr(10).join(wines_context)}\n\n"
-                    "사용자의 질문이 이전에 추천한 와인에 대한 것이라면, "
-                    "해당 와인의 특성을 고려하여 구체적으로 답변해주세요."
-                )
-                
-                system_message += context
-            
-            messages = [
-                SystemMessage(content=system_message),
-                HumanMessage(content=request.message)
-            ]
+                return chat_response(MISSING_API_KEY_RESPONSE)
+
+            embedding, cached = await lookup_cached_answer(request)
+            if cached is not None:
+                answer, similarity = cached
+                log_event(logger, "answer_cache_hit", similarity=round(similarity, 4))
+                return chat_response({"type": "text", "text": answer})
+
+            messages = build_chat_messages(request)
             
             try:
-                response = chat(messages)
-                logger.info(f"ChatGPT Response: {response.content}")
+                with span("llm"):
+                    response = await get_chat_model().ainvoke(messages)
+                log_event(logger, "llm_response", chars=len(response.content))
+                if embedding is not None and response.content:
+                    store_cached_answer(request, embedding, response.content)
                 
                 response_data = {
                     "type": "text",
                     "text": response.content
                 }
                 
-                return ChatResponse(response=json.dumps(response_data, ensure_ascii=False))
+                return chat_response(response_data)
                 
             except Exception as e:
                 logger.error(f"ChatOpenAI error: {str(e)}")
@@ -222,8 +328,10 @@ async def chat_with_wine_expert(request: ChatRequest):
                     "type": "error",
                     "text": f"죄송합니다. 오류가 발생했습니다: {str(e)}"
                 }
-                return ChatResponse(response=json.dumps(error_response, ensure_ascii=False))
+                return chat_response(error_response)
                 
+    except ClientDisconnectedError:
+        raise
     except Exception as e:
         logger.error(f"General error: {str(e)}")
         logger.error(f"Full traceback: {traceback.format_exc()}")
@@ -231,4 +339,62 @@ async def chat_with_wine_expert(request: ChatRequest):
             "type": "error",
             "text": "죄송합니다. 시스템 오류가 발생했습니다."
         }
-        return ChatResponse(response=json.dumps(error_response, ensure_ascii=False))
\ No newline at end of file
+        return chat_response(error_response)
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {encode(data).decode('utf-8')}\n\n"
+
+@router.post("/stream")
+async def stream_chat_with_wine_expert(request: ChatRequest, http_request: Request):
+    # Server-Sent Events: 일반 대화는 token 이벤트로 토큰을 바로 전달하고,
+    # 마지막 done 이벤트에 /chat/ask와 같은 형태의 구조화된 응답을 담는다
+    async def event_stream():
+        try:
+            if is_recommendation_request(request.message):
+                response_data = await build_recommendation_response(request, http_request)
+                yield sse_event("done", response_data)
+                return
+
+            if not settings.openai_api_key:
+                logger.error("OpenAI API key is missing")
+                yield sse_event("done", MISSING_API_KEY_RESPONSE)
+                return
+
+            embedding, cached = await lookup_cached_answer(request)
+            if cached is not None:
+                answer, similarity = cached
+                log_event(logger, "answer_cache_hit", similarity=round(similarity, 4))
+                yield sse_event("done", {"type": "text", "text": answer})
+                return
+
+            chunks = []
+            # 헤더는 이미 나갔으므로 스트리밍 구간은 히스토그램에만 남는다
+            with span("llm_stream"):
+                async for chunk in get_chat_model().astream(build_chat_messages(request)):
+                    if not chunk.content:
+                        continue
+                    if await http_request.is_disconnected():
+                        logger.info("Client disconnected, stopping chat stream")
+                        return
+                    chunks.append(chunk.content)
+                    yield sse_event("token", {"text": chunk.content})
+
+            answer = "".join(chunks)
+            if embedding is not None and answer:
+                store_cached_answer(request, embedding, answer)
+            yield sse_event("done", {"type": "text", "text": answer})
+        except ClientDisconnectedError:
+            return
+        except Exception as e:
+            logger.error(f"Chat stream error: {str(e)}")
+            logger.error(f"Full traceback: {traceback.format_exc()}")
+            yield sse_event("error", {
+                "type": "error",
+                "text": f"죄송합니다. 오류가 발생했습니다: {str(e)}"
+            })
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,46 @@
+# backend/app/routers/index.py
+import asyncio
+import logging
+from fastapi import APIRouter, HTTPException
+from app.vector_store import get_vector_store
+from app.indexing import sync_vector_store, read_manifest
+from app.catalog import reload_wine_catalog
+from app.lexical_index import get_lexical_index
+from app.facet_index import get_facet_index
+from app.recommendation.engine import get_wine_recommender
+from app.response_cache import get_response_cache
+from app.config import get_settings
+from app.embedding_matrix import export_embedding_matrix
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+router = APIRouter(prefix="/index", tags=["index"])
+
+@router.post("/sync")
+async def sync_index():
+    try:
+        vector_store = await get_vector_store()
+        # 바뀐 와인만 임베딩/업서트하므로 변경량에 비례한 시간만 걸린다
+        summary = await asyncio.to_thread(sync_vector_store, vector_store)
+        if settings.embedding_matrix_enabled:
+            # 새 행렬 파일을 쓴 뒤 포인터만 교체 - 다른 워커는 다음 요청에서 새 파일을 연다
+            await asyncio.to_thread(export_embedding_matrix, vector_store)
+        # 카탈로그와 색인은 다음 요청이 이벤트 루프에서 만들지 않도록 여기서 미리 다시 만든다
+        await asyncio.to_thread(reload_wine_catalog)
+        await asyncio.to_thread(get_lexical_index)
+        await asyncio.to_thread(get_facet_index)
+        await asyncio.to_thread(get_wine_recommender)
+        # 다른 워커는 캐시 키에 들어간 인덱스 버전으로 자동 무효화된다
+        await asyncio.to_thread(get_response_cache().clear)
+        return summary
+    except Exception as e:
+        logger.error(f"Error syncing vector store: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/manifest")
+async def get_manifest():
+    manifest = read_manifest()
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Index manifest not found")
+    return manifest
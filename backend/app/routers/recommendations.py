@@ -1,12 +1,46 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from app.vector_store import get_vector_store
+from app.catalog import get_wine_catalog
+from app.retrieval import (
+    filtered_similarity_search,
+    matrix_similarity_search,
+    build_metadata_filter,
+    cancel_on_disconnect,
+    ClientDisconnectedError,
+    SingleFlight,
+)
+from app.embedding_matrix import get_embedding_matrix
+from app.models.user_preferences import TasteProfile
+from app.recommendation.engine import get_wine_recommender
+from app.batch_recommendations import (
+    preferences_search_query,
+    structured_recommendation_rows,
+    iter_batch_recommendations,
+)
+from app.indexing import get_index_version
+from app.response_cache import make_cache_key
+from app.config import get_settings
+from app.telemetry import span, log_event
+from app.serialization import FragmentJSONResponse, encode
 import logging
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 동시에 들어온 같은 추천 요청은 검색 한 번의 결과를 함께 쓴다
+recommendation_flight = SingleFlight()
 
 router = APIRouter(prefix="/recommendations", tags=["recommendations"])
 
+def recommendations_response(preferences, catalog, rows):
+    return FragmentJSONResponse({
+        "status": "success",
+        "preferences": preferences.dict(),
+        "recommendations": catalog.fragments_of(rows)
+    })
+
 class PreferencesRequest(BaseModel):
     preferred_sweetness: int = Field(..., ge=1, le=5, description="선호하는 당도 (1-5)")
     preferred_acidity: int = Field(..., ge=1, le=5, description="선호하는 산도 (1-5)")
@@ -21,46 +55,104 @@ class PreferencesRequest(BaseModel):
         default=(0, 1000000),
         description="가격 범위 (최소, 최대)"
     )
+    query: str | None = Field(
+        default=None,
+        description="자유 텍스트 요청 (있을 때만 의미 검색 사용)"
+    )
+
+class BatchPreferencesItem(PreferencesRequest):
+    id: str | None = Field(default=None, description="응답 줄에 그대로 돌려줄 클라이언트 식별자")
+
+class BatchRecommendationsRequest(BaseModel):
+    items: list[BatchPreferencesItem]
+    k: int = Field(default=4, ge=1, le=50)
+
+async def semantic_recommendation_rows(catalog, preferences):
+    # 연결 끊김 처리는 호출하는 쪽에서 - 이 계산은 같은 요청을 기다리는 여러 클라이언트가 공유한다
+    search_query = preferences_search_query(preferences)
+    matrix = get_embedding_matrix()
+    if matrix is not None:
+        # 공유 임베딩 행렬에서 가격 조건 마스크를 적용해 바로 검색
+        return await matrix_similarity_search(
+            matrix,
+            catalog,
+            search_query,
+            k=4,  # 4개로 제한
+            mask=catalog.filter_mask(price_range=preferences.price_range)
+        )
+
+    with span("vector_store"):
+        vector_store = await get_vector_store()
+
+    # 가격 조건은 검색 안에서 적용하고, 중복 제거 후 4개가 되도록 필요한 만큼만 더 가져온다
+    docs = await filtered_similarity_search(
+        vector_store,
+        search_query,
+        k=4,  # 4개로 제한
+        filter=build_metadata_filter(price_range=catalog.effective_price_range(preferences.price_range)),
+        candidate_count=catalog.count(price_range=preferences.price_range)
+    )
+    return catalog.rows_of(docs)
 
 @router.post("/test")
-async def test_recommendations(preferences: PreferencesRequest):
+async def test_recommendations(preferences: PreferencesRequest, http_request: Request):
     try:
-        vector_store = await get_vector_store()
-        
-        search_query = f"""
-        당도: {preferences.preferred_sweetness}
-        산도: {preferences.preferred_acidity}
-        바디: {preferences.preferred_body}
-        타닌: {preferences.preferred_tannin}
-        종류: {', '.join(preferences.preferred_types)}
-        """
-        
-        # similarity_search를 비동기로 호출
-        docs = vector_store.similarity_search(search_query, k=10)
-        
-        # 중복 제거 (name_ko 기준)
-        from app.routers.chat import process_wine_data
-        wines = process_wine_data(docs)
-        
-        # 중복 제거 및 가격 필터링
-        unique_wines = []
-        seen_names = set()
-        
-        for wine in wines:
-            name = wine['name_ko']
-            if name not in seen_names:
-                if preferences.price_range[0] <= (wine['price'] or 0) <= preferences.price_range[1]:
-                    seen_names.add(name)
-                    unique_wines.append(wine)
-        
-        logger.info(f"Found {len(unique_wines)} unique matching wines")
-        
-        return {
-            "status": "success",
-            "preferences": preferences.dict(),
-            "recommendations": unique_wines[:4]  # 4개로 제한
-        }
+        if not preferences.query:
+            # 자유 텍스트가 없으면 임베딩 호출 없이 구조화 인덱스에서 바로 검색
+            catalog = get_wine_catalog()
+            with span("catalog_nearest"):
+                rows = structured_recommendation_rows(catalog, preferences, k=4)
+            return recommendations_response(preferences, catalog, rows)
+
+        catalog = get_wine_catalog()
+        flight_key = make_cache_key("recommendations", preferences.query, preferences.dict(), get_index_version())
+        rows = await cancel_on_disconnect(
+            http_request,
+            recommendation_flight.run(flight_key, lambda: semantic_recommendation_rows(catalog, preferences))
+        )
+        log_event(logger, "semantic_recommendation", query=preferences.query, found=len(rows))
+        return recommendations_response(preferences, catalog, rows)
         
+    except ClientDisconnectedError:
+        raise
     except Exception as e:
         logger.error(f"Error in test recommendations: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/profile")
+async def profile_recommendations(taste_profile: TasteProfile, n: int = Query(4, ge=1, le=50)):
+    # 선호 음식 가산점과 기피 특성 제외까지 반영해 카탈로그 전체를 점수로 채점 (임베딩 호출 없음)
+    catalog = get_wine_catalog()
+    with span("profile_score"):
+        scored = get_wine_recommender().get_batch_recommendation_rows([taste_profile], n)[0]
+    return FragmentJSONResponse({
+        "status": "success",
+        "preferences": taste_profile.dict(),
+        "recommendations": catalog.fragments_of([row for row, _ in scored]),
+        "scores": [round(score, 4) for _, score in scored]
+    })
+
+@router.post("/batch")
+async def batch_recommendations(batch: BatchRecommendationsRequest, http_request: Request):
+    # 항목마다 한 줄씩 NDJSON으로 응답 (청크 단위로 계산되는 대로 흘려보낸다)
+    if len(batch.items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"한 번에 최대 {settings.batch_max_items}개까지 요청할 수 있습니다."
+        )
+
+    catalog = get_wine_catalog()
+
+    async def lines():
+        async for index, result in iter_batch_recommendations(batch.items, batch.k):
+            if index % settings.batch_chunk_size == 0 and await http_request.is_disconnected():
+                log_event(logger, "batch_disconnected", sent=index, items=len(batch.items))
+                return
+            line = {"index": index, "id": batch.items[index].id}
+            if isinstance(result, Exception):
+                line["error"] = str(result)
+            else:
+                line["recommendations"] = catalog.fragments_of(result)
+            yield encode(line) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
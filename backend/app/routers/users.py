@@ -0,0 +1,121 @@
+# backend/app/routers/users.py
+import logging
+from fastapi import APIRouter, HTTPException, Request, Query
+from pydantic import BaseModel
+from typing import List
+from app.models.user_preferences import TasteProfile
+from app.catalog import get_wine_catalog
+from app.embedding_matrix import get_embedding_matrix
+from app.retrieval import (
+    filtered_similarity_search,
+    matrix_similarity_search,
+    build_metadata_filter,
+    cancel_on_disconnect,
+    run_blocking,
+)
+from app.vector_store import get_vector_store
+from app.serialization import FragmentJSONResponse
+from app.telemetry import span
+from app.user_profiles import get_user_profile_store, get_user_profile, update_taste_profile, add_tasting_history
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/users", tags=["users"])
+
+class TastingHistoryRequest(BaseModel):
+    wine_ids: List[str]
+
+def profile_summary(profile):
+    # 벡터 자체는 돌려주지 않고 상태만 보여준다
+    return {
+        "user_id": profile["user_id"],
+        "taste_profile": profile["taste_profile"],
+        "tasting_history": profile["tasting_history"],
+        "history_vectors": profile["history_count"],
+        "has_preference_vector": profile["preference_vector"] is not None,
+        "model": profile["model"],
+        "updated_at": profile["updated_at"],
+    }
+
+async def get_profile_or_404(user_id):
+    profile = await get_user_profile(user_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="User profile not found")
+    return profile
+
+def profile_filters(catalog, taste_profile):
+    # 저장된 프로필의 종류/가격 조건 (채팅 추천과 같은 가격 ±20% 여유)
+    wine_types = None
+    if taste_profile.get("preferred_types"):
+        wine_types = catalog.match_wine_types(taste_profile["preferred_types"])
+    min_price, max_price = taste_profile.get("price_range") or (0, 1000000)
+    return wine_types, (min_price * 0.8, max_price * 1.2)
+
+@router.get("/{user_id}")
+async def read_user_profile(user_id: str):
+    return profile_summary(await get_profile_or_404(user_id))
+
+@router.put("/{user_id}/profile")
+async def put_user_profile(user_id: str, taste_profile: TasteProfile):
+    try:
+        profile = await update_taste_profile(user_id, taste_profile.dict())
+    except Exception as e:
+        logger.error(f"Error updating user profile: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return profile_summary(profile)
+
+@router.post("/{user_id}/history")
+async def post_tasting_history(user_id: str, request: TastingHistoryRequest):
+    try:
+        profile = await add_tasting_history(user_id, request.wine_ids)
+    except Exception as e:
+        logger.error(f"Error updating tasting history: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return profile_summary(profile)
+
+@router.delete("/{user_id}")
+async def delete_user_profile(user_id: str):
+    if not await run_blocking(get_user_profile_store().delete, user_id):
+        raise HTTPException(status_code=404, detail="User profile not found")
+    return {"deleted": user_id}
+
+@router.get("/{user_id}/recommendations")
+async def get_user_recommendations(
+    user_id: str,
+    http_request: Request,
+    k: int = Query(4, ge=1, le=50),
+):
+    # 미리 계산한 선호 벡터로 바로 검색 - 프로필 문장을 만들거나 임베딩하지 않는다
+    profile = await get_profile_or_404(user_id)
+    if profile["preference_vector"] is None:
+        raise HTTPException(status_code=409, detail="User profile has no preference vector yet")
+    catalog = get_wine_catalog()
+    wine_types, price_range = profile_filters(catalog, profile["taste_profile"])
+    embedding = profile["preference_vector"].tolist()
+    # 이미 마신 와인은 제외
+    tasted = catalog.rows_of_wine_ids(profile["tasting_history"])
+
+    matrix = get_embedding_matrix()
+    if matrix is not None:
+        mask = catalog.filter_mask(wine_types, price_range)
+        mask[tasted] = False
+        rows = await cancel_on_disconnect(
+            http_request,
+            matrix_similarity_search(matrix, catalog, None, k=k, mask=mask, embedding=embedding)
+        )
+    else:
+        with span("vector_store"):
+            vector_store = await get_vector_store()
+        docs = await cancel_on_disconnect(
+            http_request,
+            filtered_similarity_search(
+                vector_store, None, k=k + len(tasted),
+                filter=build_metadata_filter(wine_types, catalog.effective_price_range(price_range)),
+                candidate_count=catalog.count(wine_types, price_range),
+                embedding=embedding
+            )
+        )
+        tasted = set(tasted)
+        rows = [i for i in catalog.rows_of(docs) if i not in tasted][:k]
+
+    return FragmentJSONResponse({"user_id": user_id, "recommendations": catalog.fragments_of(rows)})
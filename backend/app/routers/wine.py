@@ -1,37 +1,152 @@
 # backend/app/routers/wine.py
-from fastapi import APIRouter, HTTPException
-from typing import List
+import base64
+import hashlib
+import json
+from fastapi import APIRouter, HTTPException, Request, Query, Response
+from typing import List, Literal
 from app.models import Wine
 from app.vector_store import get_vector_store
+from app.retrieval import similarity_search, matrix_similarity_search, cancel_on_disconnect
+from app.catalog import get_wine_catalog, RECORD_COLUMNS, SORTABLE_COLUMNS
+from app.lexical_index import get_lexical_index, reciprocal_rank_fusion
+from app.facet_index import get_facet_index
+from app.embedding_matrix import get_embedding_matrix
+from app.telemetry import span
+from app.serialization import FragmentJSONResponse
 
 router = APIRouter(prefix="/api/wines", tags=["wines"])
 
-@router.get("/", response_model=List[Wine])
-async def get_wines():
-    vector_store = await get_vector_store()
-    docs = vector_store.similarity_search("", k=100)  # 전체 와인 가져오기
-    wines = []
-    for doc in docs:
-        try:
-            wine_data = doc.metadata
-            wine = Wine(**wine_data)
-            wines.append(wine)
-        except Exception as e:
-            continue
-    return wines
+SEARCH_LIMIT = 10
+
+def encode_cursor(offset, catalog_version):
+    payload = json.dumps({"o": offset, "v": catalog_version}).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+def decode_cursor(cursor, catalog_version):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        offset = int(payload["o"])
+        # 음수 위치는 파이썬 음수 인덱스로 잘려 뒤쪽 페이지를 돌려주므로 잘못된 커서로 본다
+        if offset < 0:
+            raise ValueError(offset)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # 카탈로그가 다시 로드되면 이전 커서의 위치는 의미가 없다
+    if payload.get("v") != catalog_version:
+        raise HTTPException(status_code=410, detail="Catalog changed, restart pagination")
+    return offset
+
+@router.get("/")
+async def get_wines(
+    request: Request,
+    limit: int = Query(20, ge=1, le=200, description="페이지 크기"),
+    cursor: str | None = Query(None, description="이전 응답의 next_cursor"),
+    sort: str | None = Query(None, description=f"정렬 기준: {', '.join(SORTABLE_COLUMNS)}"),
+    order: Literal["asc", "desc"] = Query("asc", description="정렬 방향"),
+    fields: str | None = Query(None, description="응답에 포함할 필드 (쉼표 구분)"),
+):
+    # 임베딩/벡터 검색 없이 한 번 로드한 메모리 카탈로그에서 바로 페이지를 잘라 응답
+    catalog = get_wine_catalog()
+
+    if sort is not None and sort not in SORTABLE_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Unsupported sort field: {sort}")
+    selected_fields = None
+    if fields:
+        selected_fields = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in selected_fields if field not in RECORD_COLUMNS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    # 같은 카탈로그 + 같은 쿼리면 응답이 같으므로 ETag로 조건부 요청 처리
+    query_key = hashlib.sha1(str(sorted(request.query_params.multi_items())).encode("utf-8")).hexdigest()[:12]
+    etag = f'W/"{catalog.version}-{query_key}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+
+    offset = decode_cursor(cursor, catalog.version) if cursor else 0
+    items = catalog.page(offset, limit, sort=sort, descending=order == "desc", fields=selected_fields)
+    next_offset = offset + len(items)
+
+    # 맛 수치가 비어 있는 와인은 검색처럼 목록에서도 빠지므로 전체 개수도 유효한 와인 기준
+    return FragmentJSONResponse(
+        content={
+            "items": items,
+            "total": catalog.valid_count,
+            "next_cursor": encode_cursor(next_offset, catalog.version) if next_offset < catalog.valid_count else None,
+        },
+        headers=headers
+    )
+
+@router.get("/facets")
+async def get_wine_facets(
+    food_matching: List[str] = Query([], description="음식 페어링 (여러 개 지정 가능)"),
+    aroma: List[str] = Query([], description="아로마"),
+    country: List[str] = Query([], description="생산국"),
+    region: List[str] = Query([], description="생산 지역"),
+    match: Literal["any", "all"] = Query("any", description="같은 필드 안의 값을 OR(any)/AND(all)로 결합"),
+    facet_limit: int = Query(20, ge=1, le=500, description="필드별 최대 패싯 값 수"),
+    limit: int = Query(20, ge=0, le=200, description="함께 돌려줄 와인 수"),
+):
+    # 선택한 값으로 좁힌 와인 수와 필드별 패싯 개수 (필드 사이는 AND)
+    catalog = get_wine_catalog()
+    facets = get_facet_index()
+    filters = {
+        "food_matching": food_matching,
+        "aroma": aroma,
+        "country": country,
+        "region": region,
+    }
+    ids = facets.select(filters, match_all=match == "all")
+    return FragmentJSONResponse({
+        "total": int(ids.size),
+        "facets": facets.facet_counts(ids, limit=facet_limit),
+        "items": catalog.fragments_of(ids[:limit]),
+    })
+
+@router.get("/autocomplete")
+async def autocomplete_wines(
+    q: str = Query(..., min_length=1, description="입력 중인 와인/와이너리 이름"),
+    limit: int = Query(10, ge=1, le=20),
+):
+    # 접두사 트라이만 조회하므로 임베딩/벡터 검색 없이 바로 응답
+    catalog = get_wine_catalog()
+    lexical = get_lexical_index()
+    return [
+        {field: catalog.records[i][field] for field in ("wine_id", "name_ko", "name_en", "winery")}
+        for i in lexical.prefix_match(q, limit=limit)
+    ]
 
 @router.get("/search/{query}", response_model=List[Wine])
-async def search_wines(query: str):
-    vector_store = await get_vector_store()
-    docs = vector_store.similarity_search(query, k=10)
-    wines = []
-    for doc in docs:
-        try:
-            wine_data = doc.metadata
-            wine = Wine(**wine_data)
-            wines.append(wine)
-        except Exception as e:
-            continue
-    if not wines:
+async def search_wines(query: str, http_request: Request):
+    catalog = get_wine_catalog()
+    lexical = get_lexical_index()
+
+    # 이름이 정확히 일치하거나 접두사로 찾히면 임베딩 호출 없이 바로 응답
+    with span("lexical_lookup"):
+        doc_ids = list(dict.fromkeys(lexical.exact_match(query) + lexical.prefix_match(query)))[:SEARCH_LIMIT]
+    if not doc_ids:
+        # 그 외에는 n-gram 결과와 벡터 검색 결과를 RRF로 합친다
+        matrix = get_embedding_matrix()
+        if matrix is not None:
+            dense_ids = await cancel_on_disconnect(
+                http_request,
+                matrix_similarity_search(matrix, catalog, query, k=SEARCH_LIMIT)
+            )
+        else:
+            with span("vector_store"):
+                vector_store = await get_vector_store()
+            docs = await cancel_on_disconnect(
+                http_request,
+                similarity_search(vector_store, query, k=SEARCH_LIMIT)
+            )
+            dense_ids = [i for i in (catalog.index_of(doc.metadata) for doc in docs) if i is not None]
+        with span("rank_fusion"):
+            doc_ids = reciprocal_rank_fusion(lexical.search(query, limit=SEARCH_LIMIT), dense_ids)[:SEARCH_LIMIT]
+
+    # Wine 모델 조건은 카탈로그 로드 때 한 번 확인해 두었으므로 인코딩된 조각을 그대로 응답
+    doc_ids = [i for i in doc_ids if catalog.valid[i]]
+    if not doc_ids:
         raise HTTPException(status_code=404, detail="No wines found")
-    return wines
\ No newline at end of file
+    return FragmentJSONResponse(catalog.fragments_of(doc_ids))
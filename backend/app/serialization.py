@@ -0,0 +1,35 @@
+# backend/app/serialization.py
+# 응답 JSON 인코딩 - orjson이 설치돼 있으면 사용하고,
+# 미리 인코딩해 둔 조각(JSONFragment, 예: 카탈로그 와인 레코드)은 다시 인코딩하지 않고 이어 붙인다.
+import json
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class JSONFragment(bytes):
+    # 이미 인코딩된 JSON 값
+    __slots__ = ()
+
+def dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+def encode(value):
+    # dict/list는 조각을 찾아 내려가며 이어 붙이고, 나머지 값은 한 번에 인코딩
+    if isinstance(value, JSONFragment):
+        return value
+    if isinstance(value, dict):
+        return b"{" + b",".join(dumps(str(key)) + b":" + encode(item) for key, item in value.items()) + b"}"
+    if isinstance(value, (list, tuple)):
+        return b"[" + b",".join(encode(item) for item in value) + b"]"
+    return dumps(value)
+
+class FragmentJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content):
+        return encode(content)
@@ -0,0 +1,225 @@
+# backend/app/snapshot.py
+# 인덱스 스냅샷 - 빌드 단계에서 벡터 스토어, 임베딩 행렬, 카탈로그 레코드를 체크섬과 함께 묶어 두고,
+# 워커는 스냅샷을 읽기만 해서 pandas 파싱이나 문서 임베딩 없이 바로 준비 상태가 된다.
+#
+# 사용법 (backend 디렉터리에서):
+#   python -m app.snapshot build [--output DIR]
+#   python -m app.snapshot verify [--snapshot DIR]
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from app.config import get_settings
+from app.vector_store import VECTOR_STORE_DIR, resolve_wine_csv_path
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_DIR = Path(settings.snapshot_dir) if settings.snapshot_dir else VECTOR_STORE_DIR.parent / "snapshot"
+MANIFEST_FILE = "snapshot.json"
+CATALOG_FILE = "catalog.json"
+STORE_DIR = "vector_store"
+MATRIX_DIR = "embedding_matrix"
+
+class SnapshotError(Exception):
+    pass
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def read_snapshot_manifest(snapshot_dir=SNAPSHOT_DIR):
+    try:
+        with open(Path(snapshot_dir) / MANIFEST_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+# 프로세스 안에서 이미 검증한 스냅샷 (카탈로그/스토어 로드 때 두 번 해시하지 않도록)
+_verified = set()
+
+def verify_snapshot(snapshot_dir=SNAPSHOT_DIR, manifest=None):
+    snapshot_dir = Path(snapshot_dir)
+    manifest = manifest or read_snapshot_manifest(snapshot_dir)
+    if manifest is None:
+        raise SnapshotError(f"No snapshot at {snapshot_dir}")
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise SnapshotError(f"Unsupported snapshot format {manifest.get('format')}")
+
+    key = (str(snapshot_dir.resolve()), manifest["snapshot_id"])
+    if key in _verified:
+        return manifest
+    for name, expected in manifest["files"].items():
+        path = snapshot_dir / name
+        if not path.is_file() or path.stat().st_size != expected["size"]:
+            raise SnapshotError(f"Snapshot file {name} is missing or truncated")
+        if file_sha256(path) != expected["sha256"]:
+            raise SnapshotError(f"Snapshot file {name} does not match its checksum")
+    _verified.add(key)
+    return manifest
+
+def load_snapshot_catalog(snapshot_dir=SNAPSHOT_DIR):
+    # 스냅샷 이후 CSV가 바뀌었거나 스냅샷이 손상됐으면 None (CSV에서 다시 만든다)
+    manifest = read_snapshot_manifest(snapshot_dir)
+    if manifest is None:
+        return None
+    try:
+        csv_path = resolve_wine_csv_path()
+    except FileNotFoundError:
+        csv_path = None
+    if csv_path is not None and file_sha256(csv_path) != manifest["source_sha256"]:
+        logger.warning("Wine CSV changed since the snapshot was built, loading catalog from CSV")
+        return None
+    try:
+        verify_snapshot(snapshot_dir, manifest)
+    except SnapshotError as e:
+        logger.error(f"Ignoring invalid snapshot: {e}")
+        return None
+
+    with open(Path(snapshot_dir) / CATALOG_FILE, encoding="utf-8") as f:
+        catalog = json.load(f)
+    logger.info(f"Loaded catalog from snapshot {manifest['snapshot_id']}")
+    return catalog
+
+def install_snapshot(target_dir=VECTOR_STORE_DIR, snapshot_dir=SNAPSHOT_DIR):
+    # 스냅샷의 벡터 스토어를 임시 디렉터리에 복사한 뒤 이름만 바꿔 설치
+    # (여러 워커가 동시에 시작해도 먼저 끝난 하나만 설치된다)
+    target_dir = Path(target_dir)
+    manifest = read_snapshot_manifest(snapshot_dir)
+    if manifest is None:
+        return False
+    try:
+        verify_snapshot(snapshot_dir, manifest)
+    except SnapshotError as e:
+        logger.error(f"Ignoring invalid snapshot: {e}")
+        return False
+
+    start = time.perf_counter()
+    tmp_dir = target_dir.with_name(f"{target_dir.name}.installing-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    shutil.copytree(Path(snapshot_dir) / STORE_DIR, tmp_dir)
+    try:
+        tmp_dir.rename(target_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not target_dir.exists():
+            raise
+        logger.info("Vector store was installed by another worker")
+        return True
+    logger.info(
+        f"Installed snapshot {manifest['snapshot_id']} (index v{manifest['index_version']}) "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    return True
+
+def install_snapshot_matrix(target_dir, snapshot_dir=SNAPSHOT_DIR):
+    # 스냅샷에 든 임베딩 행렬을 검증 후 설치 - 스냅샷이 없거나 행렬이 없으면 None
+    from app.embedding_matrix import copy_embedding_matrix
+
+    snapshot_dir = Path(snapshot_dir)
+    manifest = read_snapshot_manifest(snapshot_dir)
+    if manifest is None or not (snapshot_dir / MATRIX_DIR).is_dir():
+        return None
+    try:
+        verify_snapshot(snapshot_dir, manifest)
+    except SnapshotError as e:
+        logger.error(f"Ignoring invalid snapshot: {e}")
+        return None
+    pointer = copy_embedding_matrix(snapshot_dir / MATRIX_DIR, target_dir)
+    if pointer is not None:
+        logger.info(f"Installed embedding matrix {pointer['version']} from snapshot {manifest['snapshot_id']}")
+    return pointer
+
+def build_snapshot(output_dir=SNAPSHOT_DIR):
+    # 벡터 스토어를 CSV와 동기화한 다음 스토어 파일, 임베딩 행렬, 카탈로그 레코드를 새 스냅샷으로 묶는다
+    from app.vector_store import _open_vector_store, load_wine_data
+    from app.indexing import sync_vector_store
+    from app.catalog import WineCatalog
+
+    start = time.perf_counter()
+    output_dir = Path(output_dir)
+    csv_path = resolve_wine_csv_path()
+
+    vector_store = _open_vector_store()
+    index_manifest = sync_vector_store(vector_store)
+    model_name = getattr(vector_store.embeddings, "model_name", None)
+    if settings.embedding_matrix_enabled:
+        from app.embedding_matrix import export_embedding_matrix
+
+        export_embedding_matrix(vector_store)
+    # 복사 전에 Chroma를 닫아 파일이 모두 디스크에 기록되게 한다
+    vector_store._client.clear_system_cache()
+
+    catalog = WineCatalog.from_frame(load_wine_data())
+
+    tmp_dir = output_dir.with_name(f"{output_dir.name}.building-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    shutil.copytree(VECTOR_STORE_DIR, tmp_dir / STORE_DIR)
+    if settings.embedding_matrix_enabled:
+        # 방금 내보낸 행렬도 스냅샷 체크섬에 포함 - 스냅샷을 설치한 복제본은 Chroma를 열지 않는다
+        from app.embedding_matrix import EMBEDDING_MATRIX_DIR, copy_embedding_matrix
+
+        copy_embedding_matrix(EMBEDDING_MATRIX_DIR, tmp_dir / MATRIX_DIR)
+    with open(tmp_dir / CATALOG_FILE, "w", encoding="utf-8") as f:
+        json.dump({"version": catalog.version, "records": catalog.records}, f, ensure_ascii=False)
+
+    files = {}
+    for path in sorted(p for p in tmp_dir.rglob("*") if p.is_file()):
+        files[path.relative_to(tmp_dir).as_posix()] = {"sha256": file_sha256(path), "size": path.stat().st_size}
+    snapshot_id = hashlib.sha256(
+        json.dumps(files, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "snapshot_id": snapshot_id,
+        "created_at": time.time(),
+        "index_version": index_manifest["version"],
+        "catalog_version": catalog.version,
+        "count": index_manifest["count"],
+        "embedding_model": model_name,
+        "source_sha256": file_sha256(csv_path),
+        "files": files,
+    }
+    with open(tmp_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    # 기존 스냅샷은 새 스냅샷이 완성된 뒤에만 교체
+    old_dir = output_dir.with_name(f"{output_dir.name}.old-{os.getpid()}")
+    if output_dir.exists():
+        output_dir.rename(old_dir)
+    tmp_dir.rename(output_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    logger.info(
+        f"Built snapshot {snapshot_id} (index v{manifest['index_version']}, {manifest['count']} wines) "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    return manifest
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or verify the prebuilt index snapshot")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build")
+    build_parser.add_argument("--output", type=Path, default=SNAPSHOT_DIR)
+    verify_parser = subparsers.add_parser("verify")
+    verify_parser.add_argument("--snapshot", type=Path, default=SNAPSHOT_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "build":
+        result = build_snapshot(args.output)
+    else:
+        try:
+            result = verify_snapshot(args.snapshot)
+        except SnapshotError as e:
+            raise SystemExit(f"Snapshot verification failed: {e}")
+    print(json.dumps({key: value for key, value in result.items() if key != "files"}, ensure_ascii=False, indent=2))
@@ -0,0 +1,186 @@
+# backend/app/telemetry.py
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from starlette.datastructures import MutableHeaders
+from app.config import get_settings
+
+settings = get_settings()
+
+# 초 단위 히스토그램 버킷 (Prometheus 기본값과 같은 구간)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Histogram:
+    # 라벨 조합별 버킷 카운트/합계/개수 (여러 스레드에서 기록해도 안전)
+    def __init__(self, name, description, labelnames, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(float(b) for b in buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(counts), total, count) for key, (counts, total, count) in self._series.items())
+        for key, counts, total, count in series:
+            labels = [f'{name}="{_escape_label(value)}"' for name, value in zip(self.labelnames, key)]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = ",".join(labels + [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            bucket_labels = ",".join(labels + ['le="+Inf"'])
+            lines.append(f"{self.name}_bucket{{{bucket_labels}}} {count}")
+            suffix = f"{{{','.join(labels)}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return "\n".join(lines)
+
+REQUEST_DURATION = Histogram(
+    "wine_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"]
+)
+STAGE_DURATION = Histogram(
+    "wine_stage_duration_seconds",
+    "Latency of individual request stages",
+    ["stage"]
+)
+
+# 채팅 LLM에 보내는 프롬프트 토큰 수 (로컬 계산값)
+PROMPT_TOKENS = Histogram(
+    "wine_llm_prompt_tokens",
+    "Prompt tokens sent to the chat LLM",
+    ["model"],
+    buckets=(128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+)
+
+def render_metrics():
+    return "\n".join(h.render() for h in (REQUEST_DURATION, STAGE_DURATION, PROMPT_TOKENS)) + "\n"
+
+# 현재 요청의 단계별 소요 시간 (Server-Timing 헤더용)
+_request_timings = ContextVar("request_timings", default=None)
+
+@contextmanager
+def span(stage):
+    # with span("embed_query"): ... - 히스토그램과 현재 요청의 Server-Timing에 함께 기록
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.observe(elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+def format_server_timing(timings, total):
+    # 같은 단계가 여러 번 실행되면(예: 재검색) 합산한다
+    merged = {}
+    for stage, elapsed in timings:
+        merged[stage] = merged.get(stage, 0.0) + elapsed
+    merged["total"] = total
+    return ", ".join(f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in merged.items())
+
+class TimingMiddleware:
+    # 순수 ASGI 미들웨어 - 스트리밍 응답도 감싸며 응답 시작 시점에 Server-Timing 헤더를 붙인다
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = []
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", format_server_timing(timings, time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            # 라벨 수가 늘지 않도록 실제 경로 대신 라우트 템플릿을 쓴다
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=route,
+                status=status
+            )
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", None) or {})
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+_listener = None
+
+def configure_logging():
+    # 로그 출력은 별도 리스너 스레드에서 처리하고, 요청 경로는 큐에 넣기만 한다
+    global _listener
+    if _listener is not None:
+        return
+    handler = logging.StreamHandler()
+    if settings.log_json:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(settings.log_level.upper())
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+def shutdown_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def log_event(target_logger, event, **fields):
+    # 요청마다 남기는 로그는 log_sample_rate 비율로만 기록 (버려지는 경우 메시지도 만들지 않는다)
+    if random.random() >= settings.log_sample_rate or not target_logger.isEnabledFor(logging.INFO):
+        return
+    target_logger.info(event, extra={"fields": fields})
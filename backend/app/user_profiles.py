@@ -0,0 +1,264 @@
+# backend/app/user_profiles.py
+# 사용자 취향 프로필 저장소 - 프로필 문장 임베딩과 시음 기록 와인 임베딩으로 만든 선호 벡터를
+# SQLite에 미리 계산해 두고, 개인화 검색은 user_id로 벡터를 읽기만 한다.
+# 시음 기록은 벡터 합계/개수로 보관해 기록이 늘 때 새 와인만 더해 갱신한다.
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import weakref
+from pathlib import Path
+import numpy as np
+from app.config import get_settings
+from app.models.user_preferences import TasteProfile
+from app.retrieval import run_blocking
+from app.telemetry import span
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+DEFAULT_PROFILE_PATH = Path(__file__).parent.parent / "data" / "user_profiles.sqlite3"
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def _to_blob(vector):
+    return None if vector is None else np.asarray(vector, dtype=np.float32).tobytes()
+
+def _from_blob(blob):
+    return None if blob is None else np.frombuffer(blob, dtype=np.float32)
+
+def profile_text(taste_profile):
+    # 임베딩할 프로필 문장 (싫어하는 특징은 문장에 넣으면 오히려 가까워지므로 제외)
+    lines = []
+    if taste_profile.preferred_types:
+        lines.append(f"선호 종류: {', '.join(taste_profile.preferred_types)}")
+    for label, value in (
+        ("당도", taste_profile.preferred_sweetness),
+        ("산도", taste_profile.preferred_acidity),
+        ("바디", taste_profile.preferred_body),
+        ("타닌", taste_profile.preferred_tannin),
+    ):
+        if value is not None:
+            lines.append(f"{label}: {value}/5")
+    if taste_profile.preferred_foods:
+        lines.append(f"음식 페어링: {', '.join(taste_profile.preferred_foods)}")
+    return "\n".join(lines)
+
+def preference_vector(profile_vector, history_sum, history_count):
+    # 프로필 벡터와 시음 기록 평균 벡터를 user_profile_history_weight 비율로 섞은 단위 벡터
+    history_vector = _normalize(history_sum) if history_count else None
+    if profile_vector is None:
+        return history_vector
+    if history_vector is None:
+        return _normalize(profile_vector)
+    weight = settings.user_profile_history_weight
+    return _normalize((1 - weight) * profile_vector + weight * history_vector)
+
+def personalize_query(embedding, profile):
+    # 메시지 임베딩에 선호 벡터를 더한 검색 벡터
+    preference = profile["preference_vector"]
+    if preference is None or preference.size != len(embedding):
+        return embedding
+    return _normalize(_normalize(embedding) + settings.user_profile_query_weight * preference).tolist()
+
+class UserProfileStore:
+    def __init__(self, db_path=DEFAULT_PROFILE_PATH):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_profiles ("
+            "user_id TEXT PRIMARY KEY, taste_profile TEXT NOT NULL, tasting_history TEXT NOT NULL, "
+            "profile_vector BLOB, history_sum BLOB, history_count INTEGER NOT NULL, "
+            "preference_vector BLOB, model TEXT, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT taste_profile, tasting_history, profile_vector, history_sum, history_count, "
+                "preference_vector, model, updated_at FROM user_profiles WHERE user_id = ?",
+                (user_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "user_id": user_id,
+            "taste_profile": json.loads(row[0]),
+            "tasting_history": json.loads(row[1]),
+            "profile_vector": _from_blob(row[2]),
+            "history_sum": _from_blob(row[3]),
+            "history_count": row[4],
+            "preference_vector": _from_blob(row[5]),
+            "model": row[6],
+            "updated_at": row[7],
+        }
+
+    def put(self, user_id, taste_profile, tasting_history, profile_vector, history_sum, history_count, model):
+        preference = preference_vector(profile_vector, history_sum, history_count)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO user_profiles (user_id, taste_profile, tasting_history, profile_vector, "
+                "history_sum, history_count, preference_vector, model, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    user_id,
+                    json.dumps(taste_profile, ensure_ascii=False),
+                    json.dumps(tasting_history, ensure_ascii=False),
+                    _to_blob(profile_vector),
+                    _to_blob(history_sum),
+                    history_count,
+                    _to_blob(preference),
+                    model,
+                    time.time(),
+                )
+            )
+            self._conn.commit()
+        return self.get(user_id)
+
+    def delete(self, user_id):
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM user_profiles WHERE user_id = ?", (user_id,)).rowcount
+            self._conn.commit()
+        return deleted > 0
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM user_profiles").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+_store = None
+
+def get_user_profile_store():
+    global _store
+    if _store is None:
+        _store = UserProfileStore(settings.user_profile_path or DEFAULT_PROFILE_PATH)
+    return _store
+
+# 같은 사용자의 갱신은 읽기 -> 임베딩 -> 쓰기 전체를 한 번에 하나씩 (동시 요청이 서로의 기록을 덮어쓰지 않게)
+# 잠금을 쥐거나 기다리는 요청이 없으면 항목은 자동으로 사라진다
+_user_locks = weakref.WeakValueDictionary()
+
+def _user_lock(user_id):
+    lock = _user_locks.get(user_id)
+    if lock is None:
+        lock = _user_locks[user_id] = asyncio.Lock()
+    return lock
+
+async def get_user_profile(user_id):
+    # SQLite 조회는 이벤트 루프 밖에서
+    return await run_blocking(get_user_profile_store().get, user_id)
+
+async def wine_vectors(wine_ids):
+    # 시음 기록 와인 임베딩 - 공유 임베딩 행렬에서 읽고, 없으면 벡터 스토어에서 가져온다
+    from app.embedding_matrix import get_embedding_matrix
+
+    matrix = get_embedding_matrix()
+    if matrix is not None:
+        return matrix.vectors_of(wine_ids)
+
+    from app.vector_store import get_vector_store
+
+    vector_store = await get_vector_store()
+    result = await run_blocking(
+        vector_store._collection.get,
+        where={"wine_id": {"$in": list(wine_ids)}},
+        include=["embeddings", "metadatas"]
+    )
+    grouped = {}
+    for embedding, metadata in zip(result["embeddings"], result["metadatas"]):
+        grouped.setdefault(metadata["wine_id"], []).append(embedding)
+    return {wine_id: _normalize(np.mean(vectors, axis=0)) for wine_id, vectors in grouped.items()}
+
+async def _embed_profile(taste_profile, embeddings):
+    text = profile_text(TasteProfile(**taste_profile))
+    if not text:
+        return None
+    with span("embed_profile"):
+        return _normalize(await embeddings.aembed_query(text))
+
+async def _rebuild(user_id, taste_profile, tasting_history, embeddings):
+    # 프로필과 전체 시음 기록으로 벡터를 처음부터 다시 계산 (임베딩 모델이 바뀐 경우 등)
+    vectors = await wine_vectors(tasting_history) if tasting_history else {}
+    history_sum = np.sum(list(vectors.values()), axis=0) if vectors else None
+    return await run_blocking(
+        get_user_profile_store().put,
+        user_id,
+        taste_profile,
+        tasting_history,
+        await _embed_profile(taste_profile, embeddings),
+        history_sum,
+        len(vectors),
+        embeddings.model_name
+    )
+
+async def update_taste_profile(user_id, taste_profile):
+    # 프로필이 바뀌면 프로필 문장만 다시 임베딩하고 시음 기록 합계는 그대로 쓴다
+    from app.embedding_cache import get_embeddings
+
+    embeddings = get_embeddings()
+    store = get_user_profile_store()
+    async with _user_lock(user_id):
+        existing = await run_blocking(store.get, user_id)
+        if existing is None or existing["model"] != embeddings.model_name:
+            history = existing["tasting_history"] if existing else []
+            return await _rebuild(user_id, taste_profile, history, embeddings)
+        return await run_blocking(
+            store.put,
+            user_id,
+            taste_profile,
+            existing["tasting_history"],
+            await _embed_profile(taste_profile, embeddings),
+            existing["history_sum"],
+            existing["history_count"],
+            embeddings.model_name
+        )
+
+async def add_tasting_history(user_id, wine_ids):
+    # 새로 마신 와인 벡터만 기존 합계에 더한다 (이미 기록된 와인은 무시)
+    from app.embedding_cache import get_embeddings
+
+    embeddings = get_embeddings()
+    store = get_user_profile_store()
+    async with _user_lock(user_id):
+        existing = await run_blocking(store.get, user_id)
+        if existing is None:
+            existing = {
+                "taste_profile": TasteProfile().dict(),
+                "tasting_history": [],
+                "profile_vector": None,
+                "history_sum": None,
+                "history_count": 0,
+                "model": embeddings.model_name,
+            }
+        history = list(existing["tasting_history"])
+        known = set(history)
+        new_ids = [wine_id for wine_id in dict.fromkeys(wine_ids) if wine_id not in known]
+        history += new_ids
+        if existing["model"] != embeddings.model_name:
+            return await _rebuild(user_id, existing["taste_profile"], history, embeddings)
+
+        vectors = await wine_vectors(new_ids) if new_ids else {}
+        history_sum = existing["history_sum"]
+        if vectors:
+            added = np.sum(list(vectors.values()), axis=0)
+            history_sum = added if history_sum is None else history_sum + added
+        return await run_blocking(
+            store.put,
+            user_id,
+            existing["taste_profile"],
+            history,
+            existing["profile_vector"],
+            history_sum,
+            existing["history_count"] + len(vectors),
+            embeddings.model_name
+        )
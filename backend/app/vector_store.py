@@ -1,38 +1,59 @@
 # backend/app/vector_store.py
-import pandas as pd
+# pandas/langchain/chromadb는 무거워서 실제로 쓰는 함수 안에서만 import 한다
+# (스냅샷으로 시작하는 워커는 pandas를 전혀 불러오지 않는다)
 from pathlib import Path
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain.schema import Document
 import logging
 import os
+import asyncio
+import time
 from app.config import get_settings
 import json
-from chromadb.config import Settings
+import hashlib
+from urllib.parse import urlparse, parse_qs
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+VECTOR_STORE_DIR = (
+    Path(settings.vector_store_dir) if settings.vector_store_dir
+    else Path(__file__).parent.parent / "data" / "vector_store"
+)
+
+# 프로세스 전체에서 공유하는 벡터 스토어 (startup에서 한 번만 연다)
+_vector_store = None
+_vector_store_lock = asyncio.Lock()
+_vector_store_stats = {
+    "open_count": 0,
+    "open_seconds": None,
+    "opened_at": None,
+    "hit_count": 0,
+}
+
+def resolve_wine_csv_path():
+    # 절대 경로로 변경
+    current_dir = Path(__file__).parent.parent
+    csv_path = current_dir / "data" / "wine21_all_data.csv"
+    
+    # 파일 존재 여부 로깅
+    logger.info(f"Looking for CSV file at: {csv_path}")
+    logger.info(f"File exists: {csv_path.exists()}")
+    
+    if not csv_path.exists():
+        # 상위 디렉토리에서도 찾아보기
+        alternative_path = current_dir.parent / "data" / "wine21_all_data.csv"
+        logger.info(f"Trying alternative path: {alternative_path}")
+        
+        if alternative_path.exists():
+            csv_path = alternative_path
+        else:
+            raise FileNotFoundError(f"CSV file not found at: {csv_path} or {alternative_path}")
+    return csv_path
+
 def load_wine_data():
+    import pandas as pd
+
     try:
-        # 절대 경로로 변경
-        current_dir = Path(__file__).parent.parent
-        csv_path = current_dir / "data" / "wine21_all_data.csv"
-        
-        # 파일 존재 여부 로깅
-        logger.info(f"Looking for CSV file at: {csv_path}")
-        logger.info(f"File exists: {csv_path.exists()}")
-        
-        if not csv_path.exists():
-            # 상위 디렉토리에서도 찾아보기
-            alternative_path = current_dir.parent / "data" / "wine21_all_data.csv"
-            logger.info(f"Trying alternative path: {alternative_path}")
-            
-            if alternative_path.exists():
-                csv_path = alternative_path
-            else:
-                raise FileNotFoundError(f"CSV file not found at: {csv_path} or {alternative_path}")
-        
+        csv_path = resolve_wine_csv_path()
         df = pd.read_csv(csv_path)
         logger.info(f"Successfully loaded {len(df)} wine records from {csv_path}")
         return df
@@ -40,75 +61,118 @@ def load_wine_data():
         logger.error(f"Error loading wine data: {e}")
         raise
 
-def create_wine_documents(df):
-    documents = []
-    for idx, row in df.iterrows():
-        try:
-            # 결측치 처리 - None 대신 기본값 사용
-            sweetness = int(row['sweetness']) if pd.notna(row['sweetness']) else 1
-            acidity = int(row['acidity']) if pd.notna(row['acidity']) else 1
-            body = int(row['body']) if pd.notna(row['body']) else 1
-            tannin = int(row['tannin']) if pd.notna(row['tannin']) else 1
-            price = int(row['price']) if pd.notna(row['price']) else 0
-            
-            # 문자열 필드의 결측치 처리
-            name_ko = str(row['name_ko']) if pd.notna(row['name_ko']) else ""
-            name_en = str(row['name_en']) if pd.notna(row['name_en']) else ""
-            wine_type = str(row['wine_type']) if pd.notna(row['wine_type']) else ""
-            winery = str(row['winery']) if pd.notna(row['winery']) else ""
-            country = str(row['country']) if pd.notna(row['country']) else ""
-            region = str(row['region']) if pd.notna(row['region']) else ""
-            aroma = str(row['aroma']) if pd.notna(row['aroma']) else ""
-            food_matching = str(row['food_matching']) if pd.notna(row['food_matching']) else ""
-            image_url = str(row['image_url']) if pd.notna(row['image_url']) else ""
-            detail_url = str(row['detail_url']) if pd.notna(row['detail_url']) else ""
-            
-            content = f"""
-            와인 이름: {name_ko}
-            영문 이름: {name_en}
-            와이너리: {winery}
-            국가: {country}
-            지역: {region}
-            종류: {wine_type}
-            당도: {sweetness}
-            산도: {acidity}
-            바디: {body}
-            타닌: {tannin}
-            아로마: {aroma}
-            음식 페어링: {food_matching}
+def iter_wine_frames(chunk_size=None):
+    # 크롤러 덤프가 커져도 메모리가 일정하도록 CSV를 청크 단위로 읽는다
+    import pandas as pd
+
+    csv_path = resolve_wine_csv_path()
+    chunk_size = chunk_size or settings.ingest_chunk_size
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+        yield chunk
+
+# 컬럼별 결측치 기본값
+NUMERIC_DEFAULTS = {
+    "sweetness": 1,
+    "acidity": 1,
+    "body": 1,
+    "tannin": 1,
+    "price": 0,
+}
+TEXT_COLUMNS = [
+    "name_ko", "name_en", "wine_type", "winery", "country", "region",
+    "aroma", "food_matching", "image_url", "detail_url",
+]
+
+def normalize_wine_frame(df):
+    # 행 단위 pd.notna 대신 컬럼 단위로 결측치 채우기 및 타입 변환
+    import pandas as pd
+
+    df = df.copy()
+    for column, default in NUMERIC_DEFAULTS.items():
+        df[column] = pd.to_numeric(df[column], errors="coerce").fillna(default).astype("int64")
+    for column in TEXT_COLUMNS:
+        df[column] = df[column].fillna("").astype(str)
+    return df
+
+def make_wine_id(detail_url, name_ko, name_en):
+    # wine21 상세 URL의 Idx가 안정적인 ID, 없으면 이름 해시 사용
+    idx = parse_qs(urlparse(detail_url).query).get("Idx")
+    if idx and idx[0]:
+        return f"wine21-{idx[0]}"
+    return "name-" + hashlib.sha1(f"{name_ko}\0{name_en}".encode("utf-8")).hexdigest()[:16]
+
+def content_hash(content, metadata):
+    payload = json.dumps(metadata, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(f"{content}\0{payload}".encode("utf-8")).hexdigest()
+
+def iter_wine_documents(df):
+    # 결측치/타입 처리는 컬럼 단위로 한 번에 하고, 행 단위로는 문서만 조립
+    from langchain_core.documents import Document
+
+    df = normalize_wine_frame(df)
+    columns = TEXT_COLUMNS[:6] + ["price"] + list(NUMERIC_DEFAULTS)[:4] + TEXT_COLUMNS[6:]
+    for values in df[columns].itertuples(index=False, name=None):
+        metadata = dict(zip(columns, values))
+        content = f"""
+            와인 이름: {metadata['name_ko']}
+            영문 이름: {metadata['name_en']}
+            와이너리: {metadata['winery']}
+            국가: {metadata['country']}
+            지역: {metadata['region']}
+            종류: {metadata['wine_type']}
+            당도: {metadata['sweetness']}
+            산도: {metadata['acidity']}
+            바디: {metadata['body']}
+            타닌: {metadata['tannin']}
+            아로마: {metadata['aroma']}
+            음식 페어링: {metadata['food_matching']}
             """
-            metadata = {
-                "name_ko": name_ko,
-                "name_en": name_en,
-                "wine_type": wine_type,
-                "winery": winery,
-                "country": country,
-                "region": region,
-                "price": price,
-                "sweetness": sweetness,
-                "acidity": acidity,
-                "body": body,
-                "tannin": tannin,
-                "aroma": aroma,
-                "food_matching": food_matching,
-                "image_url": image_url,
-                "detail_url": detail_url
-            }
-            documents.append(Document(page_content=content, metadata=metadata))
-        except Exception as e:
-            logger.error(f"Error creating document for row {idx}: {e}")
-            continue
-    return documents
+        metadata["content_hash"] = content_hash(content, metadata)
+        metadata["wine_id"] = make_wine_id(metadata["detail_url"], metadata["name_ko"], metadata["name_en"])
+        yield Document(page_content=content, metadata=metadata)
+
+def create_wine_documents(df):
+    return list(iter_wine_documents(df))
+
+def stream_wine_documents(chunk_size=None):
+    for chunk in iter_wine_frames(chunk_size):
+        yield from iter_wine_documents(chunk)
+
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def upsert_embedded_documents(vector_store, documents, vectors):
+    # 미리 계산한 임베딩으로 문서를 업서트 (wine_id가 문서 ID)
+    # langchain Chroma는 임베딩을 받는 공개 업서트가 없어 컬렉션을 직접 쓰는 곳은 여기 한 곳뿐이다
+    vector_store._collection.upsert(
+        ids=[doc.metadata["wine_id"] for doc in documents],
+        embeddings=vectors,
+        metadatas=[doc.metadata for doc in documents],
+        documents=[doc.page_content for doc in documents]
+    )
+
+def _open_vector_store():
+    from langchain_community.vectorstores import Chroma
+    from app.embedding_cache import get_embeddings
+    from app.snapshot import install_snapshot
+    from app.embedding_matrix import ensure_embedding_matrix
 
-async def get_vector_store():
     try:
-        current_dir = Path(__file__).parent.parent
-        persist_directory = current_dir / "data" / "vector_store"
+        persist_directory = VECTOR_STORE_DIR
         
-        if not settings.openai_api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables")
-        
-        embeddings = OpenAIEmbeddings(openai_api_key=settings.openai_api_key)
+        # 임베딩은 콘텐츠 해시 캐시를 거쳐 변경되지 않은 문서는 다시 요청하지 않는다
+        embeddings = get_embeddings()
+
+        # 스토어가 없으면 빌드 때 만든 스냅샷을 먼저 설치 (CSV 전체 임베딩 생략)
+        if not persist_directory.exists():
+            install_snapshot(persist_directory)
         
         if persist_directory.exists():
             logger.info(f"Found existing vector store at {persist_directory}")
@@ -116,24 +180,65 @@ async def get_vector_store():
                 persist_directory=str(persist_directory), 
                 embedding_function=embeddings
             )
+            # 내보낸 행렬이 없으면 (스냅샷 설치, 행렬 도입 전 스토어) 여기서 설치/내보내기
+            ensure_embedding_matrix(vector_store)
             return vector_store
         
         logger.info("Creating new vector store...")
-        df = load_wine_data()
-        documents = create_wine_documents(df)
-        
-        if not documents:
-            raise ValueError("No documents created from wine data")
-        
-        vector_store = Chroma.from_documents(
-            documents=documents,
-            embedding=embeddings,
-            persist_directory=str(persist_directory)
+        vector_store = Chroma(
+            persist_directory=str(persist_directory),
+            embedding_function=embeddings
         )
+        # 새 스토어도 증분 동기화와 같은 경로로 채워 안정적인 wine_id를 문서 ID로 사용
+        from app.indexing import sync_vector_store
+        summary = sync_vector_store(vector_store)
+        if not summary["count"]:
+            raise ValueError("No documents created from wine data")
         
         logger.info(f"Created new vector store at {persist_directory}")
+        ensure_embedding_matrix(vector_store)
         return vector_store
         
     except Exception as e:
-        logger.error(f"Error in get_vector_store: {e}")
-        raise
\ No newline at end of file
+        logger.error(f"Error opening vector store: {e}")
+        raise
+
+async def open_vector_store():
+    global _vector_store
+    async with _vector_store_lock:
+        if _vector_store is not None:
+            return _vector_store
+
+        start = time.perf_counter()
+        # Chroma 열기/생성은 블로킹 작업이므로 이벤트 루프 밖에서 실행
+        vector_store = await asyncio.to_thread(_open_vector_store)
+        elapsed = time.perf_counter() - start
+
+        _vector_store_stats["open_count"] += 1
+        _vector_store_stats["open_seconds"] = elapsed
+        _vector_store_stats["opened_at"] = time.time()
+        _vector_store = vector_store
+        logger.info(f"Vector store opened in {elapsed:.3f}s")
+        return _vector_store
+
+async def get_vector_store():
+    # 요청마다 새로 열지 않고 공유 인스턴스를 반환
+    vector_store = _vector_store
+    if vector_store is None:
+        vector_store = await open_vector_store()
+    _vector_store_stats["hit_count"] += 1
+    return vector_store
+
+async def close_vector_store():
+    global _vector_store
+    async with _vector_store_lock:
+        if _vector_store is None:
+            return
+        client = getattr(_vector_store, "_client", None)
+        _vector_store = None
+        if client is not None and hasattr(client, "clear_system_cache"):
+            client.clear_system_cache()
+        logger.info("Vector store closed")
+
+def get_vector_store_stats():
+    return {**_vector_store_stats, "is_open": _vector_store is not None}
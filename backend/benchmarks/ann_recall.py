@@ -0,0 +1,161 @@
+# backend/benchmarks/ann_recall.py
+# ANN 인덱스 recall/지연 시간 벤치마크 - 정확한 float32 검색의 상위 k개를 정답으로 두고
+# 인덱스 종류(exact/ivf/ivf_pq), 양자화(float32/int8/PQ), nprobe/rerank 조합별로
+# recall@k, 질의당 p50/p95 지연 시간, 빌드 시간, 인덱스 크기를 측정한다.
+#
+# 사용법 (backend 디렉터리에서):
+#   python -m benchmarks.ann_recall                                  # 내보낸 와인 임베딩 행렬
+#   python -m benchmarks.ann_recall --synthetic 100000 1000000 --dim 256
+#   python -m benchmarks.ann_recall --synthetic 1000000 --nprobe 4 16 64 --output ann.json
+import argparse
+import json
+import time
+from pathlib import Path
+import numpy as np
+
+from app.ann import (
+    ExactIndex, IVFIndex, ProductQuantizer, PQScorer, VectorScorer, default_nlist, quantize_int8, train_ivf
+)
+
+def load_wine_matrix(directory=None):
+    from app.embedding_matrix import EMBEDDING_MATRIX_DIR, _read_pointer
+
+    directory = Path(directory or EMBEDDING_MATRIX_DIR)
+    pointer = _read_pointer(directory)
+    if pointer is None:
+        raise SystemExit(f"No embedding matrix in {directory}, run `python -m app.embedding_matrix export` first")
+    return np.load(directory / pointer["files"]["float32"])
+
+def normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def synthetic_vectors(count, dim, seed=0, chunk=100000):
+    # 실제 임베딩처럼 군집된 분포: 중심 주변의 가우시안 잡음을 정규화
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(16, count // 1000), dim)).astype(np.float32)
+    vectors = np.empty((count, dim), dtype=np.float32)
+    for start in range(0, count, chunk):
+        size = min(chunk, count - start)
+        labels = rng.integers(len(centers), size=size)
+        noise = rng.standard_normal((size, dim)).astype(np.float32) * 0.8
+        vectors[start:start + size] = normalize(centers[labels] + noise)
+    return vectors
+
+def make_queries(vectors, count, seed=1):
+    # 코퍼스 점을 흔든 질의 (임베딩 API 없이 실제 분포와 비슷한 질의를 만든다)
+    rng = np.random.default_rng(seed)
+    base = vectors[rng.choice(len(vectors), count, replace=False)]
+    noise = rng.standard_normal(base.shape).astype(np.float32) * 0.3 / np.sqrt(vectors.shape[1])
+    return normalize(base + noise).astype(np.float32)
+
+def ground_truth(vectors, queries, k, chunk=65536):
+    # 정확한 내적 상위 k (행렬을 나눠 곱하고 부분 결과를 합친다)
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_ids = np.zeros((len(queries), k), dtype=np.int64)
+    for start in range(0, len(vectors), chunk):
+        scores = queries @ vectors[start:start + chunk].T
+        merged_scores = np.concatenate([best_scores, scores], axis=1)
+        merged_ids = np.concatenate(
+            [best_ids, np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)], axis=1
+        )
+        order = np.argsort(-merged_scores, axis=1, kind="stable")[:, :k]
+        best_scores = np.take_along_axis(merged_scores, order, axis=1)
+        best_ids = np.take_along_axis(merged_ids, order, axis=1)
+    return best_ids
+
+def measure(search, queries, truth, k):
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(query)
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(found[:k].tolist()) & set(expected.tolist()))
+    latencies = np.array(latencies) * 1e6
+    return {
+        "recall": round(hits / (len(queries) * k), 4),
+        "p50_us": round(float(np.percentile(latencies, 50)), 1),
+        "p95_us": round(float(np.percentile(latencies, 95)), 1),
+        "qps": round(len(queries) / (latencies.sum() / 1e6), 1),
+    }
+
+def run_dataset(name, vectors, args):
+    queries = make_queries(vectors, min(args.queries, len(vectors)))
+    truth = ground_truth(vectors, queries, args.k)
+    f32 = VectorScorer(vectors)
+    quantized, scales = quantize_int8(vectors)
+    i8 = VectorScorer(quantized, scales)
+    results = []
+
+    def record(index, label, build_seconds=0.0, **params):
+        search_params = {key: value for key, value in params.items() if key in ("nprobe", "rerank")}
+        row = {
+            "dataset": name, "count": len(vectors), "dim": vectors.shape[1], "index": label,
+            **params, "build_s": round(build_seconds, 2), "mb": round(index.nbytes / 2**20, 1),
+            **measure(lambda q: index.search(q, args.k, **search_params), queries, truth, args.k),
+        }
+        results.append(row)
+        print_row(row)
+
+    record(ExactIndex(f32), "exact/float32")
+    record(ExactIndex(i8), "exact/int8")
+
+    nlist = args.nlist or default_nlist(len(vectors))
+    start = time.perf_counter()
+    centroids, offsets, list_ids = train_ivf(vectors, nlist, sample_size=args.train_sample)
+    ivf_seconds = time.perf_counter() - start
+    for scorer, label in ((f32, "ivf/float32"), (i8, "ivf/int8")):
+        index = IVFIndex(centroids, offsets, list_ids, scorer)
+        for nprobe in args.nprobe:
+            record(index, label, ivf_seconds, nlist=len(centroids), nprobe=nprobe)
+
+    for pq_m in args.pq_m:
+        if vectors.shape[1] % pq_m:
+            print(f"  skip pq_m={pq_m}: {vectors.shape[1]} dims not divisible")
+            continue
+        start = time.perf_counter()
+        quantizer = ProductQuantizer.train(vectors, pq_m, sample_size=args.train_sample)
+        pq_scorer = PQScorer(quantizer, quantizer.encode(vectors))
+        pq_seconds = ivf_seconds + time.perf_counter() - start
+        index = IVFIndex(centroids, offsets, list_ids, pq_scorer, rerank_scorer=f32)
+        for nprobe in args.nprobe:
+            for rerank in args.rerank:
+                record(index, "ivf_pq", pq_seconds, nlist=len(centroids), pq_m=pq_m, nprobe=nprobe, rerank=rerank)
+    return results
+
+COLUMNS = ["dataset", "count", "index", "nlist", "pq_m", "nprobe", "rerank", "recall", "p50_us", "p95_us", "qps", "build_s", "mb"]
+
+def print_row(row):
+    print("  ".join(f"{str(row.get(column, '-')):>13}" for column in COLUMNS), flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs latency of the ANN index options")
+    parser.add_argument("--matrix-dir", type=Path, default=None, help="exported wine embedding matrix")
+    parser.add_argument("--no-wine", action="store_true", help="skip the wine corpus")
+    parser.add_argument("--synthetic", type=int, nargs="*", default=[], help="synthetic corpus sizes (e.g. 100000 1000000)")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=0, help="0 = 4 * sqrt(N)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--pq-m", type=int, nargs="+", default=[16, 32])
+    parser.add_argument("--rerank", type=int, nargs="+", default=[0, 4])
+    parser.add_argument("--train-sample", type=int, default=65536)
+    parser.add_argument("--output", type=Path, default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    print("  ".join(f"{column:>13}" for column in COLUMNS))
+    results = []
+    if not args.no_wine:
+        results += run_dataset("wine", load_wine_matrix(args.matrix_dir), args)
+    for count in args.synthetic:
+        results += run_dataset("synthetic", synthetic_vectors(count, args.dim), args)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+        print(f"Saved {len(results)} results to {args.output}")
+
+if __name__ == "__main__":
+    main()
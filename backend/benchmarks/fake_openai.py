@@ -0,0 +1,157 @@
+# backend/benchmarks/fake_openai.py
+# 로컬 가짜 OpenAI 서버 - /v1/embeddings, /v1/chat/completions만 흉내 낸다.
+# 사용법: python -m benchmarks.fake_openai --port 8100 --latency-ms 80 --error-rate 0.01
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import time
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_ANSWER = (
+    "레드 와인은 16~18도, 화이트 와인은 8~12도 정도로 서빙하는 것이 좋습니다. "
+    "개봉 후에는 코르크로 막아 냉장 보관하고 2~3일 안에 드시는 것을 권합니다."
+)
+
+def fake_embedding(item, dimensions):
+    # 같은 입력이면 항상 같은 단위 벡터 (문자열 또는 토큰 배열 모두 허용)
+    key = item if isinstance(item, str) else json.dumps(item)
+    seed = int(hashlib.md5(key.encode("utf-8")).hexdigest()[:8], 16)
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+def create_app(latency_ms=50.0, jitter_ms=10.0, error_rate=0.0, dimensions=1536, answer=DEFAULT_ANSWER):
+    app = FastAPI(title="Fake OpenAI")
+    app.state.stats = {"embeddings": 0, "embedded_inputs": 0, "chat": 0, "errors": 0}
+
+    async def simulate():
+        # 설정한 지연 시간만큼 대기하고, error_rate 확률로 429/500 응답
+        await asyncio.sleep(max(0.0, random.gauss(latency_ms, jitter_ms)) / 1000)
+        if error_rate and random.random() < error_rate:
+            app.state.stats["errors"] += 1
+            if random.random() < 0.5:
+                return JSONResponse(
+                    status_code=429,
+                    content={"error": {"message": "Rate limit reached", "type": "requests"}},
+                    headers={"retry-after": "0"}
+                )
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "Internal error", "type": "server_error"}}
+            )
+        return None
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        error = await simulate()
+        if error is not None:
+            return error
+
+        inputs = body["input"]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        app.state.stats["embeddings"] += 1
+        app.state.stats["embedded_inputs"] += len(inputs)
+
+        data = []
+        for index, item in enumerate(inputs):
+            vector = fake_embedding(item, dimensions)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "text-embedding-ada-002"),
+            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        error = await simulate()
+        if error is not None:
+            return error
+        app.state.stats["chat"] += 1
+
+        completion_id = f"chatcmpl-fake-{random.getrandbits(32):08x}"
+        created = int(time.time())
+        model = body.get("model", "gpt-3.5-turbo")
+
+        if body.get("stream"):
+            async def stream():
+                # 단어 단위로 나눠 토큰 스트리밍 흉내
+                for i, word in enumerate(answer.split(" ")):
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{
+                            "index": 0,
+                            "delta": {"role": "assistant", "content": word if i == 0 else " " + word},
+                            "finish_reason": None,
+                        }],
+                    }
+                    yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                    await asyncio.sleep(jitter_ms / 1000 / 4)
+                done = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }
+                yield f"data: {json.dumps(done)}\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(stream(), media_type="text/event-stream")
+
+        prompt_tokens = sum(len(m.get("content") or "") for m in body.get("messages", []))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(answer),
+                "total_tokens": prompt_tokens + len(answer),
+            },
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return app.state.stats
+
+    return app
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI embeddings/chat API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.dimensions),
+        host=args.host,
+        port=args.port,
+        log_level="warning"
+    )
@@ -0,0 +1,295 @@
+# backend/benchmarks/load_test.py
+# 엔드포인트 부하 테스트 - 가짜 OpenAI 서버를 띄우고 앱을 실제 HTTP로 호출해
+# 엔드포인트별 p50/p95/p99 지연 시간과 초당 요청 수를 측정한다.
+#
+# 사용법 (backend 디렉터리에서):
+#   python -m benchmarks.load_test --concurrency 16 --requests 200
+#   python -m benchmarks.load_test --save-baseline        # 기준값 저장 (baselines.json)
+#   python -m benchmarks.load_test --compare              # 기준 대비 회귀 시 종료 코드 1
+# 커밋된 baselines.json은 기본 옵션(가짜 OpenAI 서버)으로 공유 임베딩 행렬 경로에서 만든 값이다. 기준과 다른 옵션이나 검색 인덱스로 비교하면 종료 코드 2
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+import httpx
+import numpy as np
+import uvicorn
+
+BASELINE_PATH = Path(__file__).parent / "baselines.json"
+
+RECOMMEND_MESSAGES = [
+    "스테이크에 어울리는 와인 추천해줘",
+    "가볍게 마실 화이트 와인 추천해줘",
+    "선물용으로 좋은 레드 와인 찾아줘",
+    "프랑스 보르도 레드 와인 추천해줘",
+    "해산물이랑 먹을 와인 뭐가 좋을까",
+    "달콤한 디저트 와인 알려줘",
+    "파티에 어울리는 스파클링 추천해줘",
+    "어떤 와인이 치즈와 잘 맞을까 추천해줘",
+]
+GENERAL_MESSAGES = [
+    "레드 와인 서빙 온도는 몇 도가 좋아?",
+    "와인을 개봉한 뒤 얼마나 보관할 수 있어?",
+    "디캔팅은 왜 하는 거야?",
+    "타닌이 뭐야?",
+]
+SEARCH_QUERIES = ["샤또", "Chianti Classico", "피노 누아", "스테이크와 어울리는 풀바디", "Barolo", "상큼한 화이트"]
+TASTE_PROFILES = [
+    {"preferred_sweetness": 2, "preferred_acidity": 3, "preferred_body": 4, "preferred_tannin": 4,
+     "preferred_types": ["레드"], "price_range": [30000, 150000]},
+    {"preferred_sweetness": 3, "preferred_acidity": 4, "preferred_body": 2, "preferred_tannin": 1,
+     "preferred_types": ["화이트", "스파클링"], "price_range": [0, 80000]},
+    {"preferred_sweetness": 1, "preferred_acidity": 3, "preferred_body": 5, "preferred_tannin": 5,
+     "preferred_types": ["레드"], "price_range": [0, 1000000]},
+]
+
+# 시나리오 이름 -> (메서드, i번째 요청의 경로, i번째 요청의 본문)
+SCENARIOS = {
+    "chat_recommend": (
+        "POST", lambda i: "/chat/ask",
+        lambda i: {"message": RECOMMEND_MESSAGES[i % len(RECOMMEND_MESSAGES)],
+                   "taste_profile": TASTE_PROFILES[i % len(TASTE_PROFILES)]},
+    ),
+    "chat_general": (
+        "POST", lambda i: "/chat/ask",
+        lambda i: {"message": GENERAL_MESSAGES[i % len(GENERAL_MESSAGES)]},
+    ),
+    "recommendations_test": (
+        "POST", lambda i: "/recommendations/test",
+        lambda i: TASTE_PROFILES[i % len(TASTE_PROFILES)],
+    ),
+    "recommendations_semantic": (
+        "POST", lambda i: "/recommendations/test",
+        lambda i: {**TASTE_PROFILES[i % len(TASTE_PROFILES)], "query": RECOMMEND_MESSAGES[i % len(RECOMMEND_MESSAGES)]},
+    ),
+    "wines_list": (
+        "GET", lambda i: f"/api/wines/?limit=20&sort=price&order={'asc' if i % 2 else 'desc'}",
+        lambda i: None,
+    ),
+    "wines_search": (
+        "GET", lambda i: f"/api/wines/search/{SEARCH_QUERIES[i % len(SEARCH_QUERIES)]}",
+        lambda i: None,
+    ),
+}
+
+class ServerThread:
+    # uvicorn 서버를 백그라운드 스레드에서 실행
+    def __init__(self, app, port):
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("Server failed to start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+def wait_until_ready(base_url, timeout=600):
+    # 앱은 인덱스를 백그라운드에서 불러오므로 /health/ready가 200이 될 때까지 기다린다
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = httpx.get(f"{base_url}/health/ready")
+        if response.status_code == 200:
+            return response.json()
+        if response.json().get("status") == "failed":
+            raise RuntimeError(f"App failed to start: {response.json().get('error')}")
+        time.sleep(0.2)
+    raise RuntimeError("App did not become ready in time")
+
+async def run_scenario(client, name, total, concurrency, warmup):
+    method, path_for, body_for = SCENARIOS[name]
+
+    async def call(i):
+        start = time.perf_counter()
+        response = await client.request(method, path_for(i), json=body_for(i))
+        return time.perf_counter() - start, response.status_code
+
+    for i in range(warmup):
+        await call(i)
+
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < total:
+            i = next_index
+            next_index += 1
+            elapsed, status = await call(i)
+            latencies.append(elapsed)
+            if status >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "rps": total / wall if wall else 0.0,
+        "latencies_ms": np.array(latencies) * 1000,
+    }
+
+def summarize_runs(runs):
+    # 한 번의 실행은 p95/rps가 흔들려 기준값으로 쓰기 어렵다.
+    # 지연 백분위는 모든 반복의 지연을 합쳐서 (p95 표본이 반복 횟수만큼 늘어난다), rps는 반복별 값의 중앙값
+    values = np.concatenate([run["latencies_ms"] for run in runs])
+    return {
+        "requests": runs[0]["requests"],
+        "concurrency": runs[0]["concurrency"],
+        "errors": sum(run["errors"] for run in runs),
+        "repeat": len(runs),
+        "rps": float(np.median([run["rps"] for run in runs])),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+    }
+
+async def run_all(base_url, scenarios, total, concurrency, warmup, repeat=1):
+    results = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        for name in scenarios:
+            runs = [await run_scenario(client, name, total, concurrency, warmup) for _ in range(repeat)]
+            results[name] = summarize_runs(runs)
+            print_row(name, results[name])
+    return results
+
+def print_row(name, result):
+    print(
+        f"{name:<26} {result['rps']:>9.1f} rps  p50 {result['p50_ms']:>8.1f}ms  "
+        f"p95 {result['p95_ms']:>8.1f}ms  p99 {result['p99_ms']:>8.1f}ms  errors {result['errors']}"
+    )
+
+def config_mismatch(config, baseline):
+    # 부하 조건이 다르면 수치를 비교할 수 없다
+    reference = baseline.get("config", {})
+    return [
+        f"{key}: {config[key]} != baseline {reference[key]}"
+        for key in config if key in reference and reference[key] != config[key]
+    ]
+
+def compare_with_baseline(results, baseline, p95_tolerance, rps_tolerance):
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        if result["p95_ms"] > reference["p95_ms"] * (1 + p95_tolerance):
+            regressions.append(f"{name}: p95 {result['p95_ms']:.1f}ms > baseline {reference['p95_ms']:.1f}ms")
+        if result["rps"] < reference["rps"] * (1 - rps_tolerance):
+            regressions.append(f"{name}: {result['rps']:.1f} rps < baseline {reference['rps']:.1f} rps")
+        if result["errors"] > reference["errors"]:
+            regressions.append(f"{name}: {result['errors']} errors > baseline {reference['errors']}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Wine LLM API against a fake OpenAI server")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="시나리오별 요청 수")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5, help="시나리오별 반복 횟수 (중앙값 사용)")
+    parser.add_argument("--target", default=None, help="이미 실행 중인 앱 주소 (지정하지 않으면 앱을 직접 띄운다)")
+    parser.add_argument("--app-port", type=int, default=8181)
+    parser.add_argument("--fake-port", type=int, default=8182)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="가짜 OpenAI 응답 지연")
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="가짜 OpenAI 오류 비율")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    # 앱/가짜 서버/부하 클라이언트가 한 프로세스라 p95가 rps보다 더 흔들린다 (유휴 상태에서도 반복 간 ±35%)
+    parser.add_argument("--p95-tolerance", type=float, default=0.5, help="p95 지연 허용 증가 비율")
+    parser.add_argument("--rps-tolerance", type=float, default=0.3, help="초당 요청 수 허용 감소 비율")
+    args = parser.parse_args()
+
+    from benchmarks.fake_openai import create_app
+
+    fake_app = create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.dimensions)
+    with ServerThread(fake_app, args.fake_port):
+        if args.target:
+            readiness = wait_until_ready(args.target)
+            results = asyncio.run(run_all(
+                args.target, args.scenarios, args.requests, args.concurrency, args.warmup, args.repeat
+            ))
+        else:
+            # 실제 데이터 디렉터리를 건드리지 않도록 임시 디렉터리에 인덱스/캐시를 만든다
+            workdir = Path(tempfile.mkdtemp(prefix="wine-bench-"))
+            os.environ.update({
+                "OPENAI_API_KEY": "sk-fake",
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{args.fake_port}/v1",
+                "VECTOR_STORE_DIR": str(workdir / "vector_store"),
+                "EMBEDDING_CACHE_PATH": str(workdir / "embedding_cache.sqlite3"),
+                "RESPONSE_CACHE_PATH": str(workdir / "response_cache.sqlite3"),
+                # 가짜 서버는 토큰 길이를 보지 않으므로 tiktoken 인코딩을 내려받지 않는다
+                "OPENAI_EMBEDDING_CHECK_CTX_LENGTH": "false",
+            })
+            from app.main import app
+
+            with ServerThread(app, args.app_port):
+                base_url = f"http://127.0.0.1:{args.app_port}"
+                readiness = wait_until_ready(base_url)
+                print(f"app ready in {readiness['seconds']:.2f}s")
+                results = asyncio.run(run_all(
+                    base_url, args.scenarios, args.requests, args.concurrency, args.warmup, args.repeat
+                ))
+        print(f"fake openai: {json.dumps(fake_app.state.stats)}")
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "repeat": args.repeat,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+            "dimensions": args.dimensions,
+            # Chroma와 공유 임베딩 행렬은 의미 검색 수치가 크게 달라 같은 기준으로 비교할 수 없다
+            "dense_index": readiness["dense_index"],
+        },
+        "results": results,
+    }
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Saved baseline to {args.baseline}")
+
+    if args.compare:
+        if not args.baseline.exists():
+            print(f"No baseline at {args.baseline}")
+            sys.exit(2)
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        mismatched = config_mismatch(report["config"], baseline)
+        if mismatched:
+            print("Run config differs from baseline:")
+            for line in mismatched:
+                print(f"  {line}")
+            sys.exit(2)
+        regressions = compare_with_baseline(results, baseline, args.p95_tolerance, args.rps_tolerance)
+        if regressions:
+            print("Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
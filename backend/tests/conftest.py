@@ -0,0 +1,5 @@
+# backend/tests/conftest.py
+# backend 디렉터리에서 python -m pytest 로 실행 (외부 API 없이 스텁 임베딩만 사용)
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
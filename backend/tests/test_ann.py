@@ -0,0 +1,139 @@
+# backend/tests/test_ann.py
+# ANN 검색 엔진 - 정확 검색 대비 IVF/IVF-PQ 재현율, 조건(mask)이 까다로울 때 nprobe 확장, int8/PQ 양자화
+import numpy as np
+import pytest
+from app.ann import (
+    ExactIndex,
+    PQScorer,
+    ProductQuantizer,
+    VectorScorer,
+    build_ann_arrays,
+    load_ann_index,
+    quantize_int8,
+    top_k,
+)
+
+def unit_rows(vectors):
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+def clustered_vectors(count=2000, dimensions=32, clusters=20, seed=0):
+    # 임베딩처럼 군집이 있는 단위 벡터
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimensions))
+    labels = rng.integers(clusters, size=count)
+    return unit_rows(centers[labels] + rng.normal(scale=0.3, size=(count, dimensions)))
+
+@pytest.fixture(scope="module")
+def vectors():
+    return clustered_vectors()
+
+@pytest.fixture(scope="module")
+def queries(vectors):
+    rng = np.random.default_rng(1)
+    return unit_rows(vectors[rng.choice(len(vectors), 20, replace=False)] + rng.normal(scale=0.1, size=(20, 32)))
+
+def recall(index, exact, queries, k=10, **kwargs):
+    hits = 0
+    for query in queries:
+        expected = set(exact.search(query, k).tolist())
+        hits += len(expected & set(index.search(query, k, **kwargs).tolist()))
+    return hits / (k * len(queries))
+
+def test_top_k_orders_by_score_and_keeps_ties_in_position_order():
+    scores = np.array([0.5, 0.9, 0.5, 0.1, 0.9], dtype=np.float32)
+
+    assert top_k(scores, 3).tolist() == [1, 4, 0]
+    assert top_k(scores, 10).tolist() == [1, 4, 0, 2, 3]
+
+def test_ivf_recall_against_exact(vectors, queries):
+    scorer = VectorScorer(vectors)
+    exact = ExactIndex(scorer)
+    ivf = load_ann_index("ivf", build_ann_arrays("ivf", vectors, nlist=16), scorer, nprobe=4)
+
+    assert ivf.kind == "ivf"
+    assert recall(ivf, exact, queries) >= 0.9
+    # 모든 리스트를 보면 정확 검색과 같다
+    assert recall(ivf, exact, queries, nprobe=16) == 1.0
+
+def test_ivf_pq_recall_with_rerank(vectors, queries):
+    scorer = VectorScorer(vectors)
+    exact = ExactIndex(scorer)
+    index = load_ann_index("ivf_pq", build_ann_arrays("ivf_pq", vectors, nlist=16, pq_m=8), scorer, nprobe=4, rerank=4)
+
+    assert index.kind == "ivf_pq"
+    assert recall(index, exact, queries) >= 0.85
+    # 원본 벡터로 다시 정렬하지 않으면 PQ 근사 점수만으로 순위를 정한다
+    assert recall(index, exact, queries, rerank=0) <= recall(index, exact, queries)
+
+def test_exact_search_respects_mask(vectors, queries):
+    mask = np.zeros(len(vectors), dtype=bool)
+    mask[::7] = True
+    index = ExactIndex(VectorScorer(vectors))
+
+    rows = index.search(queries[0], 10, mask=mask)
+
+    assert len(rows) == 10
+    assert mask[rows].all()
+    scores = vectors @ queries[0]
+    assert scores[rows].min() >= np.sort(scores[mask])[-10]
+
+def test_ivf_widens_nprobe_when_mask_leaves_too_few_candidates(vectors, queries):
+    scorer = VectorScorer(vectors)
+    ivf = load_ann_index("ivf", build_ann_arrays("ivf", vectors, nlist=16), scorer, nprobe=1)
+    # 질의와 가장 먼 행들만 허용 - 처음 보는 리스트에는 후보가 거의 없다
+    allowed = np.argsort(vectors @ queries[0])[:12]
+    mask = np.zeros(len(vectors), dtype=bool)
+    mask[allowed] = True
+
+    rows = ivf.search(queries[0], 10, mask=mask)
+
+    assert len(rows) == 10
+    assert mask[rows].all()
+    # 허용된 행보다 많이 요청하면 허용된 행 전부, 아무것도 허용하지 않으면 빈 결과
+    assert sorted(ivf.search(queries[0], 50, mask=mask).tolist()) == sorted(allowed.tolist())
+    assert ivf.search(queries[0], 10, mask=np.zeros(len(vectors), dtype=bool)).size == 0
+
+def test_int8_quantization_round_trip(vectors):
+    quantized, scales = quantize_int8(vectors)
+
+    assert quantized.dtype == np.int8 and scales.dtype == np.float32
+    # 반올림 오차는 행 스케일의 절반 이내
+    error = np.abs(quantized.astype(np.float32) * scales[:, None] - vectors)
+    assert (error <= scales[:, None] / 2 + 1e-6).all()
+
+    query = vectors[0]
+    approximate = VectorScorer(quantized, scales)
+    np.testing.assert_allclose(approximate.score_all(query), vectors @ query, atol=0.02)
+    np.testing.assert_allclose(approximate.score_rows(query, np.array([3, 5])), vectors[[3, 5]] @ query, atol=0.02)
+
+def test_int8_quantization_keeps_zero_rows():
+    quantized, scales = quantize_int8(np.zeros((2, 4), dtype=np.float32))
+
+    assert not quantized.any()
+    assert scales.tolist() == [1.0, 1.0]
+
+def test_pq_scores_match_reconstructed_vectors(vectors, queries):
+    quantizer = ProductQuantizer.train(vectors, m=8, ksub=64)
+    codes = quantizer.encode(vectors)
+    reconstructed = np.concatenate(
+        [quantizer.codebooks[j][codes[:, j]] for j in range(quantizer.m)], axis=1
+    )
+    scorer = PQScorer(quantizer, codes)
+
+    # 표 조회로 더한 점수 = 코드워드로 복원한 벡터와의 내적
+    np.testing.assert_allclose(scorer.score_all(queries[0]), reconstructed @ queries[0], rtol=1e-4, atol=1e-5)
+    np.testing.assert_allclose(
+        scorer.score_rows(queries[0], np.array([0, 9])), reconstructed[[0, 9]] @ queries[0], rtol=1e-4, atol=1e-5
+    )
+    # 복원한 벡터를 다시 인코딩하면 같은 코드
+    assert (quantizer.encode(reconstructed) == codes).all()
+
+def test_pq_rejects_indivisible_dimensions(vectors):
+    with pytest.raises(ValueError):
+        ProductQuantizer.train(vectors, m=5)
+
+def test_unknown_ann_kind_is_rejected(vectors):
+    with pytest.raises(ValueError):
+        build_ann_arrays("hnsw", vectors)
+    with pytest.raises(ValueError):
+        load_ann_index("hnsw", {}, VectorScorer(vectors))
@@ -0,0 +1,91 @@
+# backend/tests/test_catalog.py
+# 와인 카탈로그 - 유효한 행만 정렬/목록에 노출, 조건 마스크, 목록 커서 인코딩/검증
+import base64
+import json
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from app.catalog import RECORD_COLUMNS, WineCatalog
+from app.routers.wine import decode_cursor, encode_cursor
+
+def make_record(i, wine_type="레드 와인", price=10000, sweetness=2):
+    record = {column: "" for column in RECORD_COLUMNS}
+    record.update(
+        wine_id=f"w{i}",
+        name_ko=f"와인 {i}",
+        name_en=f"Wine {i}",
+        wine_type=wine_type,
+        price=price,
+        sweetness=sweetness,
+        acidity=3,
+        body=3,
+        tannin=3,
+    )
+    return record
+
+@pytest.fixture
+def catalog():
+    return WineCatalog([
+        make_record(0, price=30000),
+        make_record(1, wine_type="화이트 와인", price=10000, sweetness=4),
+        # 맛 값이 범위 밖(0), 가격이 음수 - 검색과 목록에서 빠져야 한다
+        make_record(2, price=5000, sweetness=0),
+        make_record(3, wine_type="스파클링 와인", price=-1),
+        make_record(4, wine_type="로제 와인", price=20000, sweetness=1),
+    ], version="c1")
+
+def test_valid_rows_follow_wine_model_bounds(catalog):
+    assert catalog.valid.tolist() == [True, True, False, False, True]
+    assert catalog.valid_count == 3
+
+def test_sort_order_lists_only_valid_rows(catalog):
+    assert catalog.sort_order().tolist() == [0, 1, 4]
+    assert catalog.sort_order("price").tolist() == [1, 4, 0]
+    assert catalog.sort_order("price", descending=True).tolist() == [0, 4, 1]
+    assert catalog.page(1, 5, sort="price", fields=["wine_id"]) == [{"wine_id": "w4"}, {"wine_id": "w0"}]
+
+def test_match_wine_types_is_substring_match(catalog):
+    assert catalog.match_wine_types(["레드"]) == ["레드 와인"]
+    assert catalog.match_wine_types(["와인"]) == ["레드 와인", "화이트 와인", "스파클링 와인", "로제 와인"]
+    assert catalog.match_wine_types(["오렌지"]) == []
+
+def test_filter_mask_combines_type_and_price(catalog):
+    mask = catalog.filter_mask(["레드 와인", "로제 와인"], (15000, 40000))
+
+    assert mask.tolist() == [True, False, False, False, True]
+    assert catalog.count(["없는 종류"]) == 0
+
+def test_effective_price_range_drops_ranges_covering_every_price(catalog):
+    assert catalog.effective_price_range(None) is None
+    assert catalog.effective_price_range((-1, 30000)) is None
+    assert catalog.effective_price_range((0, 30000)) == (0, 30000)
+
+def test_nearest_rows_prefers_boost_over_distance(catalog):
+    assert catalog.nearest_rows((4, 3, 3, 3), k=2, mask=catalog.valid) == [1, 0]
+    boost = np.array([0, 0, 0, 0, 1])
+    assert catalog.nearest_rows((4, 3, 3, 3), k=2, mask=catalog.valid, boost=boost) == [4, 1]
+
+def test_records_are_read_only(catalog):
+    with pytest.raises(TypeError):
+        catalog.records[0]["price"] = 0
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(40, "c1"), "c1") == 40
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    encode_cursor(-10, "c1"),
+    encode_cursor("x", "c1"),
+    base64.urlsafe_b64encode(json.dumps({"v": "c1"}).encode()).decode(),
+])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, "c1")
+
+    assert error.value.status_code == 400
+
+def test_cursor_from_previous_catalog_is_gone():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(encode_cursor(20, "c1"), "c2")
+
+    assert error.value.status_code == 410
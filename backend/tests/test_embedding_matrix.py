@@ -0,0 +1,118 @@
+# backend/tests/test_embedding_matrix.py
+# 임베딩 행렬 내보내기/mmap - current.json이 바뀔 때만 다시 열기, 카탈로그 행 대응과 조건 검색
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from app import embedding_matrix, snapshot
+from app.embedding_matrix import (
+    POINTER_FILE,
+    ensure_embedding_matrix,
+    export_embedding_matrix,
+    get_embedding_matrix,
+)
+
+class FakeCollection:
+    # Chroma 컬렉션의 count/get(offset, limit)만 흉내
+    def __init__(self, vectors, wine_ids):
+        self.vectors = vectors
+        self.wine_ids = wine_ids
+
+    def count(self):
+        return len(self.wine_ids)
+
+    def get(self, include, limit, offset):
+        ids = self.wine_ids[offset:offset + limit]
+        return {
+            "ids": [f"doc-{i}" for i in range(offset, offset + len(ids))],
+            "embeddings": self.vectors[offset:offset + limit].tolist(),
+            "metadatas": [{"wine_id": wine_id, "name_ko": f"와인 {wine_id}"} for wine_id in ids],
+        }
+
+def fake_store(vectors, wine_ids=None):
+    wine_ids = wine_ids or [f"w{i}" for i in range(len(vectors))]
+    return SimpleNamespace(_collection=FakeCollection(np.asarray(vectors, dtype=np.float32), wine_ids))
+
+class FakeCatalog:
+    # 행렬 행 -> 카탈로그 행 대응에 필요한 version/index_of만
+    def __init__(self, wine_ids, version="c1"):
+        self.version = version
+        self.rows = {wine_id: i for i, wine_id in enumerate(wine_ids)}
+
+    def index_of(self, metadata):
+        return self.rows.get(metadata["wine_id"])
+
+@pytest.fixture
+def matrix_dir(tmp_path, monkeypatch):
+    # 모듈 전역 행렬 상태도 테스트마다 초기화
+    monkeypatch.setattr(embedding_matrix, "EMBEDDING_MATRIX_DIR", tmp_path)
+    monkeypatch.setattr(embedding_matrix, "_matrix", None)
+    monkeypatch.setattr(embedding_matrix, "_pointer_mtime", None)
+    monkeypatch.setattr(embedding_matrix, "EXPORT_BATCH_SIZE", 3)
+    return tmp_path
+
+def random_vectors(count=8, dimensions=6, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, dimensions))
+
+def test_export_normalizes_vectors_across_batches(matrix_dir):
+    vectors = random_vectors()
+
+    pointer = export_embedding_matrix(fake_store(vectors), matrix_dir)
+
+    assert pointer["count"] == 8 and pointer["dimensions"] == 6
+    saved = np.load(matrix_dir / pointer["files"]["float32"])
+    np.testing.assert_allclose(saved, vectors / np.linalg.norm(vectors, axis=1, keepdims=True), rtol=1e-5)
+
+def test_matrix_is_remapped_only_when_pointer_changes(matrix_dir, monkeypatch):
+    assert get_embedding_matrix() is None
+
+    clock = iter(range(1_000, 10_000, 1_000))
+    monkeypatch.setattr(embedding_matrix.time, "time", lambda: next(clock))
+    first = export_embedding_matrix(fake_store(random_vectors(seed=0)), matrix_dir)
+    matrix = get_embedding_matrix()
+    assert matrix.version == first["version"]
+    assert get_embedding_matrix() is matrix
+
+    second = export_embedding_matrix(fake_store(random_vectors(seed=1)), matrix_dir)
+    remapped = get_embedding_matrix()
+    assert remapped is not matrix
+    assert remapped.version == second["version"] != first["version"]
+    # 직전 버전 파일은 아직 교체 전인 워커를 위해 남는다
+    assert all((matrix_dir / name).exists() for name in first["files"].values())
+
+    third = export_embedding_matrix(fake_store(random_vectors(seed=2)), matrix_dir)
+    assert get_embedding_matrix().version == third["version"]
+    assert not any((matrix_dir / name).exists() for name in first["files"].values())
+    assert (matrix_dir / POINTER_FILE).exists()
+
+def test_partial_export_keeps_current_matrix(matrix_dir):
+    export_embedding_matrix(fake_store(random_vectors()), matrix_dir)
+    matrix = get_embedding_matrix()
+    # 새 current.json이 가리키는 파일이 아직 없으면 기존 행렬을 계속 쓴다
+    (matrix_dir / POINTER_FILE).write_text('{"version": "v-next", "files": {"float32": "missing.npy"}}')
+
+    assert get_embedding_matrix() is matrix
+
+def test_search_maps_rows_to_catalog_and_applies_mask(matrix_dir):
+    vectors = np.eye(4, dtype=np.float32)[[0, 1, 1, 2, 3]]
+    # 같은 와인의 문서가 두 개(w1), 카탈로그에 없는 와인 하나(gone)
+    export_embedding_matrix(fake_store(vectors, ["w0", "w1", "w1", "gone", "w3"]), matrix_dir)
+    matrix = get_embedding_matrix()
+    catalog = FakeCatalog(["w3", "w1", "w0"])
+    query = np.array([0.1, 1.0, 0.5, 0.3])
+
+    assert matrix.catalog_rows(catalog).tolist() == [2, 1, 1, -1, 0]
+    assert matrix.search(query, 3, catalog) == [1, 0, 2]
+    assert matrix.search(query, 3, catalog, mask=np.array([True, False, True])) == [0, 2]
+    assert matrix.search_many([query, query], 1, catalog, masks=[None, np.array([True, False, False])]) == [[1], [0]]
+
+def test_ensure_exports_only_without_matrix(matrix_dir, monkeypatch):
+    monkeypatch.setattr(snapshot, "install_snapshot_matrix", lambda target_dir: None)
+
+    # 스토어 없이 부르면 스냅샷 설치만 시도
+    assert ensure_embedding_matrix(None, matrix_dir) is None
+    assert not (matrix_dir / POINTER_FILE).exists()
+
+    pointer = ensure_embedding_matrix(fake_store(random_vectors()), matrix_dir)
+    assert pointer["count"] == 8
+    assert ensure_embedding_matrix(fake_store(random_vectors(seed=1)), matrix_dir) is None
+    assert get_embedding_matrix().version == pointer["version"]
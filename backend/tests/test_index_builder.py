@@ -0,0 +1,180 @@
+# backend/tests/test_index_builder.py
+# IndexBuilder를 스텁 임베딩으로 구동 - 재시도/Retry-After, 분당 토큰 예산, 중단 후 재실행
+import threading
+import time
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+from langchain_core.embeddings import Embeddings
+from app import index_builder, indexing
+from app.index_builder import IndexBuilder, TokenBudget
+from app.vector_store import iter_wine_documents
+
+class StubEmbeddings(Embeddings):
+    # 입력 길이로 만든 고정 벡터, fail_on에 든 호출 번호에서는 지정한 예외를 던진다
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on or {}
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            call = len(self.calls)
+            self.calls.append(list(texts))
+        if call in self.fail_on:
+            raise self.fail_on[call]
+        return [[float(len(text)), 1.0, 0.0] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0, 0.0]
+
+class RateLimitError(Exception):
+    def __init__(self, retry_after=None):
+        super().__init__("429 Too Many Requests")
+        headers = {"retry-after": retry_after} if retry_after is not None else {}
+        self.response = SimpleNamespace(headers=headers)
+
+class FakeClock:
+    # time.monotonic/time.sleep 대체 - sleep은 기다리지 않고 시계만 앞으로 돌린다
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    # index_builder 모듈이 보는 time만 바꾼다
+    fake = FakeClock()
+    monkeypatch.setattr(
+        index_builder, "time",
+        SimpleNamespace(monotonic=fake.monotonic, sleep=fake.sleep, perf_counter=time.perf_counter)
+    )
+    return fake
+
+def make_frame(count):
+    return pd.DataFrame([
+        {
+            "name_ko": f"테스트 와인 {i}",
+            "name_en": f"Test Wine {i}",
+            "image_url": "",
+            "winery": "와이너리",
+            "country": "프랑스",
+            "region": "보르도",
+            "wine_type": "레드",
+            "price": 10000 + i,
+            "sweetness": 1 + i % 5,
+            "acidity": 3,
+            "body": 3,
+            "tannin": 3,
+            "aroma": "체리",
+            "food_matching": "스테이크",
+            "detail_url": f"https://www.wine21.com/13_search/wine_view.html?Idx={i}",
+        }
+        for i in range(count)
+    ])
+
+class RecordingStore:
+    # 업서트만 기록하는 벡터 스토어 대역
+    def __init__(self):
+        self.upserts = []
+        self._collection = SimpleNamespace(upsert=lambda **kwargs: self.upserts.append(kwargs))
+
+def test_retry_after_header_is_honored(clock):
+    embeddings = StubEmbeddings(fail_on={0: RateLimitError("7"), 1: RateLimitError("3")})
+    builder = IndexBuilder(RecordingStore(), embeddings=embeddings, workers=1, batch_size=10, max_retries=3)
+
+    vectors = builder._embed_batch(list(iter_wine_documents(make_frame(2))))
+
+    assert len(vectors) == 2
+    assert clock.sleeps == [7.0, 3.0]
+    assert builder.stats["retries"] == 2
+    assert len(embeddings.calls) == 3
+
+def test_retries_from_concurrent_workers_are_all_counted(clock):
+    embeddings = StubEmbeddings(fail_on={n: RateLimitError("0") for n in range(8)})
+    builder = IndexBuilder(RecordingStore(), embeddings=embeddings, workers=4, batch_size=1, max_retries=8)
+
+    stats = builder.build(iter_wine_documents(make_frame(8)))
+
+    assert stats["documents"] == 8
+    assert stats["retries"] == 8
+    assert len(embeddings.calls) == 16
+
+def test_retry_without_header_backs_off_and_gives_up(clock):
+    embeddings = StubEmbeddings(fail_on={n: RateLimitError() for n in range(3)})
+    builder = IndexBuilder(RecordingStore(), embeddings=embeddings, workers=1, batch_size=10, max_retries=2)
+
+    with pytest.raises(RateLimitError):
+        builder._embed_batch(list(iter_wine_documents(make_frame(1))))
+
+    # 지수 백오프 (2^attempt초에 0.5~1배 지터), 마지막 실패 뒤에는 기다리지 않는다
+    assert len(clock.sleeps) == 2
+    assert 0.5 <= clock.sleeps[0] <= 1.0
+    assert 1.0 <= clock.sleeps[1] <= 2.0
+
+def test_token_budget_waits_for_refill(clock):
+    budget = TokenBudget(tokens_per_minute=600)  # 초당 10토큰
+
+    budget.acquire(600)
+    assert clock.sleeps == []
+    budget.acquire(100)
+    assert clock.sleeps == [pytest.approx(10.0)]
+    # 예산보다 큰 요청은 버킷이 가득 찰 때까지만 기다린다
+    budget.acquire(5000)
+    assert sum(clock.sleeps) == pytest.approx(70.0)
+
+def test_build_spends_tokens_within_budget(clock):
+    documents = list(iter_wine_documents(make_frame(8)))
+    batch_tokens = index_builder.estimate_tokens([doc.page_content for doc in documents[:2]])
+    store = RecordingStore()
+    builder = IndexBuilder(
+        store,
+        embeddings=StubEmbeddings(),
+        workers=1,
+        batch_size=2,
+        tokens_per_minute=batch_tokens * 2
+    )
+
+    stats = builder.build(documents)
+
+    assert stats["documents"] == 8 and stats["batches"] == 4
+    # 처음 두 배치는 가득 찬 버킷으로, 나머지 두 배치는 배치당 30초씩 기다린 뒤 보낸다
+    assert clock.now == pytest.approx(60.0, rel=0.05)
+    assert [len(upsert["ids"]) for upsert in store.upserts] == [2, 2, 2, 2]
+
+def test_sync_resumes_after_interrupted_build(tmp_path, monkeypatch):
+    from langchain_community.vectorstores import Chroma
+
+    monkeypatch.setattr(indexing, "MANIFEST_PATH", tmp_path / "manifest.json")
+    frame = make_frame(10)
+    vector_store = Chroma(
+        collection_name="index_builder_test",
+        persist_directory=str(tmp_path / "store"),
+        embedding_function=StubEmbeddings()
+    )
+
+    # 세 번째 배치에서 복구할 수 없는 오류로 중단
+    failing = StubEmbeddings(fail_on={2: RuntimeError("embedding server down")})
+    with pytest.raises(RuntimeError):
+        indexing.sync_vector_store(
+            vector_store, frame,
+            builder=IndexBuilder(vector_store, embeddings=failing, workers=1, batch_size=3, max_retries=0)
+        )
+    assert len(vector_store.get()["ids"]) == 6
+    assert indexing.read_manifest() is None
+
+    # 다시 실행하면 이미 업서트된 문서는 content_hash가 같아 임베딩하지 않는다
+    resumed = StubEmbeddings()
+    summary = indexing.sync_vector_store(
+        vector_store, frame,
+        builder=IndexBuilder(vector_store, embeddings=resumed, workers=1, batch_size=3, max_retries=0)
+    )
+    assert sum(len(texts) for texts in resumed.calls) == 4
+    assert summary["added"] == 4 and summary["unchanged"] == 6
+    assert len(vector_store.get()["ids"]) == 10
@@ -0,0 +1,52 @@
+# backend/tests/test_recommendation_engine.py
+# 취향 프로필 점수 추천 - 기피 특성/선호 음식 용어 처리와 용어 캐시 크기 제한
+from types import SimpleNamespace
+from app.models.user_preferences import TasteProfile
+from app.recommendation.engine import WineRecommender
+
+def make_wine(wine_id, wine_type="레드", characteristics="", food_matching="", price=30000):
+    return SimpleNamespace(
+        wine_id=wine_id,
+        wine_type=wine_type,
+        sweetness=2,
+        acidity=3,
+        body=4,
+        tannin=4,
+        price=price,
+        characteristics=characteristics,
+        food_matching=food_matching,
+    )
+
+def make_recommender():
+    return WineRecommender([
+        make_wine("a", characteristics="오크, 바닐라", food_matching="스테이크"),
+        make_wine("b", characteristics="체리, 자두", food_matching="파스타"),
+        make_wine("c", wine_type="화이트", characteristics="시트러스"),
+    ])
+
+def recommended_ids(recommender, profile, n=10):
+    return [wine.wine_id for wine, _ in recommender.get_recommendations(profile, n)]
+
+def test_blank_disliked_terms_are_ignored():
+    recommender = make_recommender()
+    profile = TasteProfile(preferred_types=["레드"], disliked_characteristics=["", "  ", " 오크 "])
+
+    assert recommended_ids(recommender, profile) == ["b"]
+
+def test_preferred_food_breaks_ties():
+    recommender = make_recommender()
+    profile = TasteProfile(preferred_types=["레드"], preferred_foods=["파스타", " "])
+
+    assert recommended_ids(recommender, profile) == ["b", "a"]
+
+def test_term_mask_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(WineRecommender, "TERM_MASK_CACHE_SIZE", 3)
+    recommender = make_recommender()
+    for term in ["오크", "체리", "자두", "바닐라", "체리"]:
+        recommender._term_mask("characteristics", term)
+
+    assert list(recommender._term_masks) == [
+        ("characteristics", "자두"),
+        ("characteristics", "바닐라"),
+        ("characteristics", "체리"),
+    ]
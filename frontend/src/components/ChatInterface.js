@@ -119,7 +119,10 @@ ${wineTypes}를 선호하시는군요!
 
       let parsedResponse;
       try {
-        parsedResponse = JSON.parse(response.response);
+        // 응답 객체를 그대로 받고, 예전 서버처럼 문자열이면 한 번 더 파싱
+        parsedResponse = typeof response.response === 'string'
+          ? JSON.parse(response.response)
+          : response.response;
       } catch (e) {
         console.error('Error parsing response:', e);
         parsedResponse = {